@@ -0,0 +1,70 @@
+import csv
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+
+DEFAULT_ABBREVIATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                          'data', 'label_abbreviations.csv')
+
+
+def load_abbreviations(path: str = None) -> List[Tuple[str, str]]:
+    """(full, abbreviation) pairs from a CSV with 'full' and 'abbreviation' columns, in file order"""
+    path = path or DEFAULT_ABBREVIATIONS_PATH
+    pairs = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            full = (row.get('full') or '').strip()
+            if full:
+                pairs.append((full, (row.get('abbreviation') or '').strip()))
+    return pairs
+
+
+class AbbreviationEngine:
+    """Rewrites every table entry in a title in a single regex pass.
+
+    All entries are compiled once into one case-insensitive alternation
+    (longest first, so 'Fibra de Vidrio' wins over a shorter entry at the
+    same position) and each match is looked up in a case-folded dict.
+    Matches are whole words, as with the per-entry \\b...\\b substitutions
+    this replaces.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.table: Dict[str, str] = {}
+        for full, abbreviation in pairs:
+            # First entry wins, like the sequential substitutions did
+            self.table.setdefault(full.casefold(), abbreviation)
+
+        alternatives = sorted({full for full, _ in pairs}, key=len, reverse=True)
+        self.pattern = re.compile(r'\b(?:' + '|'.join(re.escape(full) for full in alternatives) + r')\b',
+                                  re.IGNORECASE) if alternatives else None
+
+    def _replace(self, match: re.Match) -> str:
+        return self.table.get(match.group(0).casefold(), match.group(0))
+
+    def abbreviate(self, text: str) -> str:
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+
+_engines: Dict[str, AbbreviationEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_abbreviation_engine(path: str = None) -> AbbreviationEngine:
+    """Process-wide engine per abbreviation file, compiled on first use"""
+    path = path or DEFAULT_ABBREVIATIONS_PATH
+    engine = _engines.get(path)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(path)
+            if engine is None:
+                engine = AbbreviationEngine(load_abbreviations(path))
+                _engines[path] = engine
+    return engine
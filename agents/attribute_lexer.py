@@ -0,0 +1,169 @@
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from agents.title_scanner import COLORS
+
+
+# Unit as written (case-folded) -> what it measures
+UNIT_MEASURES = {
+    'cm': 'length', 'mm': 'length', 'mts': 'length', 'm': 'length', 'pulg': 'length', 'plg': 'length',
+    'in': 'length', '"': 'length', "'": 'length',
+    'kg': 'weight', 'lbs': 'weight', 'lb': 'weight', 'gr': 'weight', 'g': 'weight',
+    'lts': 'volume', 'lt': 'volume', 'l': 'volume', 'ml': 'volume', 'oz': 'volume', 'gal': 'volume',
+    'galon': 'volume', 'galón': 'volume', 'galones': 'volume', 'm3': 'volume',
+    'v': 'voltage', 'w': 'watts', 'amp': 'amperage', 'am': 'amperage',
+}
+
+QUANTITY_UNITS = ['pzas', 'pzs', 'pza', 'pz', 'piezas', 'unidades', 'un']
+
+# A mixed number (1 1/2, 1-1/2), a fraction (3/8) or a decimal (3.5, 2,5)
+_VALUE = r'(?:\d+[\s-]+\d+/\d+|\d+/\d+|\d+(?:[.,]\d+)?)'
+# A unit must not run into another word (other than the next x), so
+# 10X10MATERIALES (messy exports glue the taxonomy path on) has no unit
+_LENGTH_UNIT = r'(?:\s*(?:cm|mm|mts|m|pulg|plg|in|"|\')(?![^\W\d_xX]))?'
+_START = r'(?<![\w/.,])'
+
+# One alternation, tried in this order at each position, so the more specific
+# reading wins (a dimension over the measure it starts with, a quantity over a
+# bare number). Group names are the token kinds.
+_ALTERNATIVES = [
+    r'(?P<r_value>\bR-?\s*\d+\b)',
+    r'(?P<gauge>\bcal(?:ibre)?\.?\s*\d+\b)',
+    rf'(?P<dimension>{_START}{_VALUE}{_LENGTH_UNIT}(?:\s*[xX×]\s*{_VALUE}{_LENGTH_UNIT})+(?![\d/]))',
+    rf'(?P<quantity>{_START}\d+\s*(?:{"|".join(QUANTITY_UNITS)})\b)',
+    rf'(?P<unit>{_START}{_VALUE}\s*(?P<unit_name>m[³3]|cm|mm|mts|m|pulg|plg|in|"|\'|kg|lbs|lb|gr|g|lts|lt|l|ml|oz'
+    r'|gal(?:[oó]n(?:es)?)?|v|w|amp?)(?!\w)|\bm[³3](?!\w))',
+    rf'(?P<fraction>{_START}(?:\d+[\s-]+)?\d+/\d+(?![\w/]))',
+    r'(?P<color>\b(?:' + '|'.join(sorted(COLORS, key=len, reverse=True)) + r')\b)',
+]
+# Every token starts a word with a digit, R (R-13), C (cal 12), M (m³) or a
+# color's first letter; checking that first skips most positions cheaply
+_FIRST_CHARS = ''.join(sorted({color[0] for color in COLORS} | set('RCM')))
+_TOKEN_PATTERN = re.compile(rf'(?<![^\W\d_])(?=[\d{_FIRST_CHARS}])(?:' + '|'.join(_ALTERNATIVES) + ')',
+                            re.IGNORECASE)
+
+_NUMBER = re.compile(r'(\d+)[\s-]+(\d+)/(\d+)|(\d+)/(\d+)|(\d+(?:[.,]\d+)?)')
+
+
+class Token(NamedTuple):
+    """One typed attribute found in a title"""
+    kind: str
+    text: str
+    start: int
+    end: int
+    unit: str = ''
+
+    @property
+    def measure(self) -> str:
+        """length, weight, volume, voltage, watts or amperage, for unit tokens"""
+        return UNIT_MEASURES.get(self.unit, '')
+
+    @property
+    def parts(self) -> int:
+        """Number of measurements in a dimension (2 for 60x60, 3 for 15x93x3.5)"""
+        return 1 + sum(ch in 'xX×' for ch in self.text) if self.kind == 'dimension' else 1
+
+    def numbers(self) -> List[float]:
+        """Numeric values in the token, with fractions and mixed numbers resolved (1 1/2 -> 1.5)"""
+        values = []
+        for whole, numerator, denominator, num, den, plain in _NUMBER.findall(self.text):
+            if whole:
+                values.append(int(whole) + int(numerator) / int(denominator))
+            elif num:
+                values.append(int(num) / int(den) if int(den) else 0.0)
+            else:
+                values.append(float(plain.replace(',', '.')))
+        return values
+
+
+class TokenStream:
+    """Every token found in one title, in title order"""
+
+    def __init__(self, text: str, tokens: List[Token]):
+        self.text = text
+        self.tokens = tokens
+
+    def find(self, kind: str) -> Optional[Token]:
+        """First token of a kind, in title order"""
+        for token in self.tokens:
+            if token.kind == kind:
+                return token
+        return None
+
+    def find_all(self, kind: str) -> List[Token]:
+        return [token for token in self.tokens if token.kind == kind]
+
+    def terms(self, kind: str) -> Set[str]:
+        """Distinct upper-cased texts of one kind"""
+        return {token.text.upper() for token in self.tokens if token.kind == kind}
+
+    def first(self, kind: str, candidates: Iterable[str]) -> Optional[str]:
+        """First candidate (in the caller's priority order) that was found"""
+        found = self.terms(kind)
+        for candidate in candidates:
+            if candidate.upper() in found:
+                return candidate
+        return None
+
+    def overlapping(self, start: int, end: int) -> List[Token]:
+        """Tokens that share at least one character with text[start:end]"""
+        return [token for token in self.tokens if token.start < end and token.end > start]
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+
+class AttributeLexer:
+    """Single-pass tokenizer for the measurable attributes of a title.
+
+    One precompiled alternation reports dimensions (60x60, 1/4 X 1 1/2,
+    4'x8'), fractions, measures with their unit (3.5", 19 LT, 127V),
+    quantities, R-values, gauges and colors as non-overlapping typed tokens.
+    Streams are cached per title, so the parsers, classifiers, label
+    formatter and templates that look at the same title share one pass.
+    """
+
+    MAX_CACHED_TITLES = 50000
+
+    def __init__(self):
+        self._cache: Dict[str, TokenStream] = {}
+
+    def tokenize(self, title: str) -> TokenStream:
+        if not title:
+            return TokenStream('', [])
+
+        cached = self._cache.get(title)
+        if cached is not None:
+            return cached
+
+        tokens = []
+        for match in _TOKEN_PATTERN.finditer(title):
+            kind = match.lastgroup
+            unit = ''
+            if kind == 'unit':
+                unit = (match.group('unit_name') or match.group(0)[-2:]).lower().replace('³', '3')
+            tokens.append(Token(kind, match.group(0), match.start(), match.end(), unit))
+
+        stream = TokenStream(title, tokens)
+        if len(self._cache) >= self.MAX_CACHED_TITLES:
+            self._cache.clear()
+        self._cache[title] = stream
+        return stream
+
+
+_lexer = None
+_lexer_lock = threading.Lock()
+
+
+def get_attribute_lexer() -> AttributeLexer:
+    """Process-wide lexer (the pattern is compiled at import)"""
+    global _lexer
+    if _lexer is None:
+        with _lexer_lock:
+            if _lexer is None:
+                _lexer = AttributeLexer()
+    return _lexer
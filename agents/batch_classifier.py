@@ -0,0 +1,57 @@
+import json
+import pandas as pd
+from typing import Dict, List, Optional, Union
+
+
+class BatchCategoryMatcher:
+    """Mixin giving classifiers a batch-first find_category_matches() API.
+
+    Accepts a list of product dicts or a DataFrame, collapses identical inputs
+    so each distinct product is classified once, and hands the unique products
+    to _match_batch(), which classifiers override to group items by match
+    strategy and score whole groups together against the taxonomy.
+    """
+
+    def find_category_matches(self, products: Union[List[Dict], pd.DataFrame]) -> List[Optional[Dict]]:
+        """Return one category match (or None) per product, in input order"""
+        records = self._as_records(products)
+
+        unique_products = []
+        positions = {}
+        slots = []
+        for product_data in records:
+            key = self._product_key(product_data)
+            if key not in positions:
+                positions[key] = len(unique_products)
+                unique_products.append(product_data)
+            slots.append(positions[key])
+
+        unique_matches = self._match_batch(unique_products) if unique_products else []
+
+        # Duplicates get their own copy so callers can annotate results independently
+        seen = set()
+        matches = []
+        for slot in slots:
+            match = unique_matches[slot]
+            if match is not None and slot in seen:
+                match = dict(match)
+            seen.add(slot)
+            matches.append(match)
+        return matches
+
+    def _match_batch(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Classify distinct products; default falls back to one at a time"""
+        return [self.find_category_match(product_data) for product_data in products]
+
+    @staticmethod
+    def _as_records(products: Union[List[Dict], pd.DataFrame]) -> List[Dict]:
+        if isinstance(products, pd.DataFrame):
+            return [
+                {key: value for key, value in record.items() if not (isinstance(value, float) and pd.isna(value))}
+                for record in products.to_dict('records')
+            ]
+        return list(products)
+
+    @staticmethod
+    def _product_key(product_data: Dict) -> str:
+        return json.dumps(product_data, sort_keys=True, default=str, ensure_ascii=False)
@@ -0,0 +1,121 @@
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Tuple, Union
+
+from agents.taxonomy_index import TaxonomyIndex
+
+
+STOPWORDS = {'DE', 'DEL', 'LA', 'LAS', 'EL', 'LOS', 'Y', 'O', 'PARA', 'CON', 'SIN', 'EN', 'A', 'AL', 'POR', 'E'}
+
+
+def tokenize(text) -> List[str]:
+    """Accent-free, upper-case word tokens with a light plural strip"""
+    if not text or not isinstance(text, str):
+        return []
+    text = unicodedata.normalize('NFKD', text.upper())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    tokens = []
+    for token in re.findall(r'[A-Z0-9]+', text):
+        if token in STOPWORDS:
+            continue
+        # PISOS -> PISO, BALDOSAS -> BALDOSA (applied to queries and documents alike)
+        if len(token) > 3 and token.endswith('S') and not token[-2].isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Ranker:
+    """BM25F ranking of taxonomy rows over several weighted text fields.
+
+    Each row is a document with categoria, familia, departamento and
+    ejemplo_aplicado fields. Per-field term frequencies are length-normalized,
+    combined with FIELD_BOOSTS, and saturated once (BM25F). The query-
+    independent weight of every (term, row) pair is computed at build time,
+    so ranking a query only sums a few posting lists.
+    """
+
+    FIELD_BOOSTS = {
+        'categoria': 3.0,
+        'familia': 1.5,
+        'ejemplo_aplicado': 1.0,
+        'departamento': 0.5,
+    }
+
+    def __init__(self, index: TaxonomyIndex, k1: float = 1.2, b: float = 0.75):
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        # term -> [(row id, precomputed BM25F weight)]
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._build()
+
+    def _build(self):
+        rows = self.index.rows
+        n_rows = len(rows)
+        if n_rows == 0:
+            return
+
+        field_tokens = {field: [tokenize(row[field]) for row in rows] for field in self.FIELD_BOOSTS}
+        avg_length = {
+            field: (sum(len(tokens) for tokens in token_lists) / n_rows) or 1.0
+            for field, token_lists in field_tokens.items()
+        }
+
+        # Boosted, length-normalized term frequency per row
+        row_tf: List[Dict[str, float]] = []
+        document_frequency: Dict[str, int] = {}
+        for row_id in range(n_rows):
+            tf: Dict[str, float] = {}
+            for field, boost in self.FIELD_BOOSTS.items():
+                tokens = field_tokens[field][row_id]
+                if not tokens:
+                    continue
+                norm = 1 - self.b + self.b * len(tokens) / avg_length[field]
+                for token in tokens:
+                    tf[token] = tf.get(token, 0.0) + boost / norm
+            row_tf.append(tf)
+            for token in tf:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        for row_id, tf in enumerate(row_tf):
+            for token, weight in tf.items():
+                df = document_frequency[token]
+                idf = math.log(1 + (n_rows - df + 0.5) / (df + 0.5))
+                self.postings.setdefault(token, []).append((row_id, idf * weight / (self.k1 + weight)))
+
+    def score(self, query: Union[str, Iterable[str]]) -> Dict[int, float]:
+        """BM25F score of every row sharing at least one term with the query"""
+        if isinstance(query, str):
+            terms = tokenize(query)
+        else:
+            terms = [token for term in query for token in tokenize(term)]
+
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            for row_id, weight in self.postings.get(term, ()):
+                scores[row_id] = scores.get(row_id, 0.0) + weight
+        return scores
+
+    def top_k(self, query: Union[str, Iterable[str]], k: int = 5) -> List[Dict]:
+        """Best k rows for the query as match dicts, highest score first (earliest row wins ties)"""
+        scores = self.score(query)
+        best = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            self.index.build_match(row_id, match_type='bm25', score=round(score, 4))
+            for row_id, score in best
+        ]
+
+    def candidates(self, query: Union[str, Iterable[str]], k: int = 5) -> List[Dict]:
+        """Compact top-k summaries to attach to a match for review"""
+        return [
+            {
+                'departamento': match['departamento'],
+                'familia': match['familia'],
+                'categoria': match['categoria'],
+                'score': match['score']
+            }
+            for match in self.top_k(query, k)
+        ]
@@ -1,8 +1,14 @@
 import pandas as pd
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
-class CategoryClassifier:
+from agents.batch_classifier import BatchCategoryMatcher
+from agents.taxonomy_registry import get_taxonomy
+
+class CategoryClassifier(BatchCategoryMatcher):
+    # Ranked BM25 alternatives attached to partial matches for review
+    CANDIDATES_K = 5
+    
     def __init__(self, csv_path: str = None):
         if csv_path is None:
             # Handle both running from root and from agents/ folder
@@ -13,9 +19,16 @@ class CategoryClassifier:
             else:
                 raise FileNotFoundError("Cannot find nomenclatura_gorila.csv in data/ folder")
         """Initialize with the category mapping CSV file"""
-        self.df = pd.read_csv(csv_path)
-        # Clean column names - remove extra spaces
-        self.df.columns = self.df.columns.str.strip()
+        # Shared, loaded-once taxonomy (column names already stripped)
+        taxonomy = get_taxonomy(csv_path)
+        self.df = taxonomy.df
+        self.index = taxonomy.index
+        self.ranker = taxonomy.ranker
+        
+        # (DEPARTAMENTO, FAMILIA, CATEGORIA) -> first matching row
+        self._exact_rows = {}
+        for row_id, (dept, fam, cat) in enumerate(zip(self.df['Departamento'], self.df['Familia'], self.df['Categoria'])):
+            self._exact_rows.setdefault((dept.upper(), fam.upper(), cat.strip().upper()), row_id)
         print(f"Loaded {len(self.df)} category mappings")
     
     def find_category_match(self, product_data: Dict) -> Optional[Dict]:
@@ -28,8 +41,43 @@ class CategoryClassifier:
         Returns:
             Dict with category info and naming rules, or None if no match
         """
+        return self._match_batch([product_data])[0]
+    
+    def _match_batch(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Exact lookups first, then one batched partial scoring pass over the rest"""
+        matches = [None] * len(products)
+        
+        # Try exact matches first
+        partial_items = []
+        for i, product_data in enumerate(products):
+            row_id = self._exact_rows.get((
+                product_data.get('departamento', '').upper(),
+                product_data.get('familia', '').upper(),
+                product_data.get('categoria', '').upper()
+            ))
+            if row_id is not None:
+                matches[i] = self.index.build_match(row_id, match_type='exact', confidence=1.0)
+            else:
+                partial_items.append(i)
         
-        # Extract search terms from product data
+        # Try partial matches on categoria; longer matches get higher scores
+        # and the earliest row wins ties
+        term_lists = [self._search_terms(products[i]) for i in partial_items]
+        partial_matches = self.index.best_keyword_matches(term_lists)
+        for i, search_terms, (row_id, score) in zip(partial_items, term_lists, partial_matches):
+            if row_id is not None:
+                matches[i] = self.index.build_match(
+                    row_id,
+                    match_type='partial',
+                    score=score,
+                    candidates=self.ranker.candidates(search_terms, self.CANDIDATES_K)
+                )
+        
+        return matches
+    
+    @staticmethod
+    def _search_terms(product_data: Dict) -> List[str]:
+        """Extract search terms from product data"""
         search_terms = []
         if 'departamento' in product_data:
             search_terms.append(product_data['departamento'].upper())
@@ -39,48 +87,7 @@ class CategoryClassifier:
             search_terms.append(product_data['categoria'].upper())
         if 'description' in product_data:
             search_terms.extend(product_data['description'].upper().split())
-            
-        # Try exact matches first
-        for _, row in self.df.iterrows():
-            if (product_data.get('departamento', '').upper() == row['Departamento'].upper() and
-                product_data.get('familia', '').upper() == row['Familia'].upper() and
-                product_data.get('categoria', '').upper() == row['Categoria'].strip().upper()):
-                
-                return {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'], 
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'exact'
-                }
-        
-        # Try partial matches on categoria
-        best_match = None
-        best_score = 0
-        
-        for _, row in self.df.iterrows():
-            score = 0
-            categoria = row['Categoria'].strip().upper()
-            
-            # Check if any search terms appear in the category
-            for term in search_terms:
-                if term in categoria:
-                    score += len(term)  # Longer matches get higher scores
-                    
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(), 
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'partial',
-                    'score': score
-                }
-        
-        return best_match
+        return search_terms
     
     def get_all_categories(self) -> pd.DataFrame:
         """Return all available categories for debugging"""
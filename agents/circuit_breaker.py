@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from agents.concurrency_controller import RATE_LIMITED, classify_api_error
+from agents.instrumentation import get_metrics
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around the LLM provider.
+
+    failure_threshold consecutive failures open the circuit; while open,
+    calls fail immediately with CircuitOpenError so callers take their local
+    fallback. After recovery_timeout seconds the breaker lets
+    half_open_max_calls probe requests through: a success closes it, a
+    failure opens it again. 429s are left to the concurrency controller and
+    do not count as failures.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def _transition(self, state: str):
+        # Caller holds the lock
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        self._half_open_in_flight = 0
+        metrics = get_metrics()
+        metrics.inc('llm_circuit_transitions_total', labels={'to': state})
+        metrics.set_gauge('llm_circuit_state', _STATE_VALUES[state])
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (no state change)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.recovery_timeout
+
+    def allow_request(self) -> bool:
+        """Admit one call, moving open -> half-open once the recovery timeout has passed"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self.short_circuited += 1
+        get_metrics().inc('llm_circuit_short_circuited_total')
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def record_neutral(self):
+        """A call that says nothing about provider health (e.g. a 429) frees its half-open probe"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """Guard one API call; raises CircuitOpenError without calling when the circuit is open"""
+        if not self.allow_request():
+            raise CircuitOpenError("LLM circuit open, using local fallback")
+        try:
+            yield
+        except Exception as e:
+            if classify_api_error(e) == RATE_LIMITED:
+                self.record_neutral()
+            else:
+                self.record_failure()
+            raise
+        self.record_success()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'circuit_state': self.state,
+                'circuit_consecutive_failures': self.consecutive_failures,
+                'circuit_times_opened': self.times_opened,
+                'circuit_short_circuited': self.short_circuited
+            }
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker shared by every LLM caller, configured from the environment"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+                    recovery_timeout=float(os.getenv('LLM_BREAKER_RECOVERY_SECONDS', '30'))
+                )
+    return _breaker
@@ -0,0 +1,203 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from agents.instrumentation import get_metrics
+
+
+SUCCESS = 'success'
+RATE_LIMITED = 'rate_limited'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+
+def classify_api_error(error: Exception) -> str:
+    """Map an API exception to an outcome: rate_limited, timeout or error"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    message = str(error).lower()
+    if status == 429 or 'rate limit' in message or 'too many requests' in message:
+        return RATE_LIMITED
+    if 'timeout' in type(error).__name__.lower() or 'timed out' in message or 'timeout' in message:
+        return TIMEOUT
+    return ERROR
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After / retry-after-ms header on the error's response, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get('retry-after-ms')
+        if retry_after_ms is not None:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get('retry-after')
+        if retry_after is not None:
+            return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        # HTTP-date form is not worth parsing for a short backoff
+        return None
+    return None
+
+
+class AIMDController:
+    """Process-wide limit on concurrent LLM requests, adapted with AIMD.
+
+    Every success adds increase / limit (about +increase per window of
+    requests); a 429 or a timeout multiplies the limit by decrease_factor,
+    at most once per cooldown window so a burst of concurrent 429s counts as
+    one congestion signal. A Retry-After pauses every new request until it
+    has passed. Successes slower than latency_target (when set) hold the
+    limit instead of raising it.
+    """
+
+    def __init__(self, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 64,
+                 increase: float = 1.0, decrease_factor: float = 0.5, latency_target: float = None):
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, float(initial_limit)))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self.latency_ewma = None
+
+        self.successes = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.decreases = 0
+        self.retry_after_pauses = 0
+        self.total_wait = 0.0
+
+    def acquire(self) -> float:
+        """Block until a request may start; returns the time spent waiting"""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._condition.wait(self._paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self._condition.wait(0.5)
+                else:
+                    self.in_flight += 1
+                    waited = time.monotonic() - start
+                    self.total_wait += waited
+                    return waited
+
+    def release(self, outcome: str, latency: float = None, retry_after: float = None):
+        """Finish a request and adapt the limit to its outcome"""
+        now = time.monotonic()
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+
+            if latency is not None:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+            if outcome == SUCCESS:
+                self.successes += 1
+                if self.latency_target is None or latency is None or latency <= self.latency_target:
+                    self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            elif outcome in (RATE_LIMITED, TIMEOUT):
+                if outcome == RATE_LIMITED:
+                    self.rate_limited += 1
+                else:
+                    self.timeouts += 1
+                # One decrease per window: requests already in flight carry stale news
+                window = max(retry_after or 0.0, self.latency_ewma or 0.0)
+                if now - self._last_decrease >= window:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.errors += 1
+
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                self.retry_after_pauses += 1
+
+            self._condition.notify_all()
+
+        metrics = get_metrics()
+        metrics.inc('llm_requests_total', labels={'outcome': outcome})
+        metrics.set_gauge('llm_concurrency_limit', round(self.limit, 2))
+
+    @contextmanager
+    def slot(self) -> Iterator[Dict]:
+        """Hold one request slot; set outcome/retry_after on the yielded dict (defaults to success)"""
+        self.acquire()
+        result = {'outcome': SUCCESS, 'retry_after': None}
+        start = time.monotonic()
+        try:
+            yield result
+        except Exception as e:
+            result['outcome'] = classify_api_error(e)
+            result['retry_after'] = retry_after_seconds(e)
+            raise
+        finally:
+            self.release(result['outcome'], time.monotonic() - start, result['retry_after'])
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return {
+                'concurrency_limit': round(self.limit, 2),
+                'concurrency_in_flight': self.in_flight,
+                'concurrency_successes': self.successes,
+                'concurrency_rate_limited': self.rate_limited,
+                'concurrency_timeouts': self.timeouts,
+                'concurrency_errors': self.errors,
+                'concurrency_decreases': self.decreases,
+                'concurrency_retry_after_pauses': self.retry_after_pauses,
+                'concurrency_latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma else None,
+                'concurrency_total_wait_s': round(self.total_wait, 3)
+            }
+
+
+def call_with_retries(func: Callable[[], Any], controller: AIMDController, breaker: Any = None,
+                      retries: int = 3, base_delay: float = 0.5) -> Any:
+    """Run func() in a controller slot (inside breaker.call() when given), retrying 429s and timeouts
+
+    For callers whose client has SDK retries turned off. By the time a retry
+    starts the controller has already cut its limit and applied any
+    Retry-After pause, so attempts are only spaced by a short jittered
+    backoff. Other errors, the last failure and an open circuit are raised.
+    """
+    for attempt in range(retries):
+        try:
+            with breaker.call() if breaker is not None else nullcontext(), controller.slot():
+                return func()
+        except Exception as e:
+            if (classify_api_error(e) == ERROR or attempt == retries - 1
+                    or (breaker is not None and breaker.is_open())):
+                raise
+            time.sleep(base_delay * (2 ** attempt) + random.uniform(0, base_delay))
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_concurrency_controller() -> AIMDController:
+    """Process-wide controller shared by every LLM caller, configured from the environment"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                latency_target = os.getenv('LLM_LATENCY_TARGET')
+                _controller = AIMDController(
+                    initial_limit=float(os.getenv('LLM_INITIAL_CONCURRENCY', '4')),
+                    min_limit=float(os.getenv('LLM_MIN_CONCURRENCY', '1')),
+                    max_limit=float(os.getenv('LLM_MAX_CONCURRENCY', '64')),
+                    latency_target=float(latency_target) if latency_target else None
+                )
+    return _controller
@@ -1,16 +1,40 @@
 # agents/enhanced_title_generator.py (ROBUST VERSION)
 import json
 import re
+import threading
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from openai import OpenAI
 import random
 
+from agents.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+from agents.concurrency_controller import RATE_LIMITED, AIMDController, classify_api_error, get_concurrency_controller
+from agents.instrumentation import get_metrics
+from agents.nomenclatura_template import NomenclaturaTemplates, get_nomenclatura_templates
+from agents.research_cache import ResearchCache
+from agents.research_engine import ResearchEngine
+from agents.research_policy import ResearchPolicy
+from agents.response_schema import RESEARCH_SCHEMA, SchemaStats
+from agents.single_flight import SingleFlight
+from agents.title_scanner import KNOWN_BRANDS, get_title_scanner
+
 class RobustEnhancedTitleGenerator:
-    def __init__(self, api_key: str = None):
+    # Bump whenever the research prompt changes so cached answers are not reused
+    # (packed prompts ask for the same per-item fields, so they share the version)
+    RESEARCH_PROMPT_VERSION = 'research-v1'
+    # Response budget per product in a packed research prompt
+    PACKED_TOKENS_PER_ITEM = 80
+    
+    def __init__(self, api_key: str = None, max_in_flight: int = 8, requests_per_second: float = None,
+                 cache: ResearchCache = None, research_policy: ResearchPolicy = None, pack_size: int = 1,
+                 concurrency: AIMDController = None, breaker: CircuitBreaker = None,
+                 template_min_coverage: Optional[float] = None, templates: NomenclaturaTemplates = None):
         """Initialize with OpenAI API key and robust settings"""
+        self.model = "gpt-4o-mini"
+        
         if api_key:
-            self.client = OpenAI(api_key=api_key)
+            # Retries are ours, so every 429 reaches the concurrency controller
+            self.client = OpenAI(api_key=api_key, max_retries=0)
             self.web_search_enabled = True
             print("✓ Robust Enhanced Title Generator with web search initialized")
         else:
@@ -22,45 +46,100 @@ class RobustEnhancedTitleGenerator:
         self.api_call_count = 0
         self.failed_requests = 0
         self.successful_requests = 0
+        self.packed_calls = 0
+        self.packed_items = 0
+        self.packed_items_retried = 0
+        self.packed_duplicates = 0
+        self.template_titles = 0
+        self._stats_lock = threading.Lock()
         
         # Rate limiting settings
-        self.base_delay = 0.5  # Base delay between requests
+        self.base_delay = 0.5  # Base delay between retries
         self.max_retries = 3
         self.backoff_multiplier = 2
+        
+        # Concurrent research: bounded in-flight calls + token bucket pacing
+        self.research_engine = ResearchEngine(max_in_flight, requests_per_second)
+        
+        # Process-wide AIMD limit on requests actually in flight (the engine's pool is the ceiling)
+        self.concurrency = concurrency if concurrency is not None else get_concurrency_controller()
+        
+        # Shared breaker: while the provider is down, items skip straight to the local fallback
+        self.breaker = breaker if breaker is not None else get_circuit_breaker()
+        # Items flagged needs_reenrichment; the flag in the results is the durable record
+        self.flagged_for_reenrichment = 0
+        self.short_circuited = 0
+        
+        # Optional persistent cache of parsed research responses
+        self.cache = cache
+        
+        # Coalesces identical research requests that are in flight at the same time
+        self.single_flight = SingleFlight()
+        
+        # Outcomes of schema validation and repair of research responses
+        self.schema_stats = SchemaStats(RESEARCH_SCHEMA.name)
+        
+        # Skips research for items the classifier already matched with high confidence
+        self.research_policy = research_policy if research_policy is not None else ResearchPolicy()
+        
+        # Titles researched per API call by generate_ecommerce_titles (1 = one call per title)
+        self.pack_size = max(1, int(pack_size))
+        
+        # Titles assembled from the category's nomenclatura rule skip research entirely when at
+        # least this share of the rule's attribute slots is filled (opt-in; None disables)
+        self.template_min_coverage = template_min_coverage
+        self.templates = templates if templates is not None else get_nomenclatura_templates()
     
-    def _safe_api_call(self, prompt: str, max_tokens: int = 300, retries: int = 3) -> Optional[str]:
+    def _count(self, **increments):
+        """Increment stats counters atomically (research runs on worker threads)"""
+        with self._stats_lock:
+            for name, amount in increments.items():
+                setattr(self, name, getattr(self, name) + amount)
+    
+    def _safe_api_call(self, prompt: str, max_tokens: int = 300, retries: int = 3,
+                       response_format: Dict = None) -> Optional[str]:
         """Make a safe API call with retries and exponential backoff"""
+        extra = {'response_format': response_format} if response_format else {}
         
         for attempt in range(retries):
             try:
                 # Progressive delay to avoid rate limits
                 delay = self.base_delay * (2 ** attempt) + random.uniform(0, 0.5)
                 if attempt > 0:
+                    if self.breaker.is_open():
+                        print(f"   ⚡ Circuit open, abandoning retries")
+                        return None
                     print(f"   🔄 Retry attempt {attempt + 1}/{retries} (waiting {delay:.1f}s)")
                     time.sleep(delay)
                 
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a product expert. Always respond with valid JSON only."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=max_tokens,
-                    timeout=15  # 15 second timeout
-                )
+                self.research_engine.throttle()
+                with self.breaker.call(), self.concurrency.slot():
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": "You are a product expert. Always respond with valid JSON only."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.1,
+                        max_tokens=max_tokens,
+                        timeout=15,  # 15 second timeout
+                        **extra
+                    )
                 
-                self.api_call_count += 1
-                self.successful_requests += 1
+                self._count(api_call_count=1, successful_requests=1)
                 return response.choices[0].message.content.strip()
                 
+            except CircuitOpenError:
+                self._count(short_circuited=1)
+                return None
+            
             except Exception as e:
-                self.failed_requests += 1
+                self._count(failed_requests=1)
                 error_msg = str(e).lower()
                 
-                if "rate limit" in error_msg:
-                    print(f"   ⚠️  Rate limit hit, waiting longer...")
-                    time.sleep(5 + (attempt * 2))  # Longer wait for rate limits
+                if classify_api_error(e) == RATE_LIMITED:
+                    # The controller already lowered the limit and honours any Retry-After
+                    print(f"   ⚠️  Rate limit hit (concurrency limit now {self.concurrency.limit:.1f})")
                 elif "timeout" in error_msg:
                     print(f"   ⚠️  Timeout on attempt {attempt + 1}")
                 else:
@@ -72,91 +151,73 @@ class RobustEnhancedTitleGenerator:
         
         return None
     
-    def _extract_json_safely(self, text: str) -> Optional[dict]:
-        """Extract JSON from text with multiple fallback strategies"""
+    def _validate_research(self, research_text: str) -> Tuple[Optional[Dict], List[str]]:
+        """Strictly validate a research response, with one targeted repair call if it fails"""
+        research_data, errors = RESEARCH_SCHEMA.parse(research_text)
+        if research_data is not None:
+            self.schema_stats.record('valid')
+            return research_data, []
         
-        if not text:
-            return None
+        print(f"   🔧 Repairing research response: {'; '.join(errors)[:60]}")
+        repaired_text = self._safe_api_call(RESEARCH_SCHEMA.repair_prompt(research_text, errors),
+                                            max_tokens=200, retries=1,
+                                            response_format=RESEARCH_SCHEMA.response_format())
+        research_data, repair_errors = RESEARCH_SCHEMA.parse(repaired_text)
+        if research_data is not None:
+            self.schema_stats.record('repaired', errors, wasted_text=research_text)
+            return research_data, []
         
-        # Strategy 1: Direct JSON parse
-        try:
-            return json.loads(text)
-        except:
-            pass
-        
-        # Strategy 2: Remove markdown formatting
-        try:
-            cleaned = text.strip()
-            if '```json' in cleaned:
-                start = cleaned.find('{')
-                end = cleaned.rfind('}') + 1
-                if start != -1 and end > start:
-                    cleaned = cleaned[start:end]
-            elif '```' in cleaned:
-                lines = cleaned.split('\n')
-                json_lines = [line for line in lines if not line.strip().startswith('```')]
-                cleaned = '\n'.join(json_lines)
-            
-            return json.loads(cleaned)
-        except:
-            pass
-        
-        # Strategy 3: Find JSON block in text
-        try:
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end > start:
-                json_block = text[start:end]
-                return json.loads(json_block)
-        except:
-            pass
-        
-        # Strategy 4: Try to fix common JSON issues
-        try:
-            # Fix common issues like trailing commas, single quotes, etc.
-            fixed = text.strip()
-            fixed = re.sub(r',\s*}', '}', fixed)  # Remove trailing commas
-            fixed = re.sub(r',\s*]', ']', fixed)  # Remove trailing commas in arrays
-            fixed = fixed.replace("'", '"')  # Replace single quotes
-            return json.loads(fixed)
-        except:
-            pass
-        
-        return None
+        self.schema_stats.record('failed', errors, wasted_text=research_text + (repaired_text or ''))
+        return None, repair_errors
+    
+    def _research_query(self, product_data: Dict) -> Tuple[str, str, str, str]:
+        """(title, brand, product_type, search_query) used to research a product"""
+        title = product_data.get('original_title', product_data.get('description', ''))
+        brand = product_data.get('brand', '')
+        product_type = product_data.get('producto_tipo', '')
+        return title, brand, product_type, f"{title} {brand} {product_type}".strip()
     
-    def _enhance_with_web_search(self, product_data: Dict) -> Dict:
-        """Enhanced web search with comprehensive error handling"""
+    def _research_key(self, title: str, brand: str, product_type: str) -> str:
+        """Normalized identity of a research request (cache and single-flight key)"""
+        return ResearchCache.make_key(title, brand, product_type, self.RESEARCH_PROMPT_VERSION, self.model)
+    
+    def _enhance_with_web_search(self, product_data: Dict, cache_checked: bool = False) -> Dict:
+        """Enhanced web search with comprehensive error handling
+
+        cache_checked: the caller already missed the cache for this product,
+        so it is not looked up (and counted as a miss) a second time.
+        """
         enhanced_data = product_data.copy()
         
         if not self.web_search_enabled:
             print("   ⚠️  Web search disabled (no API key)")
             return enhanced_data
         
+        if self.breaker.is_open():
+            print("   ⚡ LLM circuit open, using local fallback")
+            self._count(short_circuited=1)
+            enhanced_data['web_research'] = {
+                'error': 'circuit_open',
+                'fallback_used': True
+            }
+            enhanced_data['verified_product_type'] = product_data.get('original_title', product_data.get('description', ''))
+            enhanced_data['is_construction_hardware'] = True
+            self._mark_for_reenrichment(product_data)
+            return enhanced_data
+        
         try:
-            # Create search query
-            title = product_data.get('original_title', product_data.get('description', ''))
-            brand = product_data.get('brand', '')
-            product_type = product_data.get('producto_tipo', '')
-            
-            search_query = f"{title} {brand} {product_type}".strip()
+            title, brand, product_type, search_query = self._research_query(product_data)
+            research_key = self._research_key(title, brand, product_type)
             
-            print(f"   🔍 Researching: {search_query[:50]}...")
+            # Concurrent requests for the same normalized product share one lookup and API call
+            status, research_data, errors = self.single_flight.do(
+                research_key, lambda: self._fetch_research(research_key, search_query, cache_checked)
+            )
             
-            # Simplified, robust prompt
-            research_prompt = f"""Analyze this construction/hardware product: {search_query}
-
-Return ONLY this JSON (no other text):
-{{
-    "verified_product_type": "specific product type",
-    "product_category": "department category",
-    "is_construction_hardware": true,
-    "confidence": 0.8
-}}"""
-
-            # Make safe API call
-            research_text = self._safe_api_call(research_prompt, max_tokens=200, retries=3)
+            if status == 'ok':
+                return self._apply_research(enhanced_data, research_data, title)
             
-            if not research_text:
+            if status == 'api_failed':
                 print("   ⚠️  API call failed completely, using fallback")
                 enhanced_data['web_research'] = {
                     'error': 'api_failed',
@@ -164,53 +225,20 @@ Return ONLY this JSON (no other text):
                 }
                 enhanced_data['verified_product_type'] = title
                 enhanced_data['is_construction_hardware'] = True
+                self._mark_for_reenrichment(product_data)
                 return enhanced_data
             
-            # Extract JSON safely
-            research_data = self._extract_json_safely(research_text)
-            
-            if research_data and isinstance(research_data, dict):
-                # Validate required fields
-                required_fields = ['verified_product_type']
-                if all(field in research_data for field in required_fields):
-                    # Success!
-                    enhanced_data['web_research'] = research_data
-                    enhanced_data['verified_product_type'] = research_data.get('verified_product_type', title)
-                    enhanced_data['is_construction_hardware'] = research_data.get('is_construction_hardware', True)
-                    enhanced_data['research_confidence'] = research_data.get('confidence', 0.8)
-                    
-                    print(f"   ✓ Web research enhanced: {research_data.get('verified_product_type', 'Unknown')}")
-                    return enhanced_data
-            
-            # If we get here, JSON parsing failed
-            print("   ⚠️  JSON parsing failed, using intelligent fallback")
-            
-            # Intelligent fallback - extract what we can from the text
-            fallback_type = title
-            if research_text:
-                # Try to extract product type from text even if JSON failed
-                type_patterns = [
-                    r'"verified_product_type":\s*"([^"]+)"',
-                    r'product.type.*?:\s*"?([^",\n]+)',
-                    r'type.*?:\s*([A-Za-z\s]+)'
-                ]
-                for pattern in type_patterns:
-                    match = re.search(pattern, research_text, re.IGNORECASE)
-                    if match:
-                        fallback_type = match.group(1).strip()
-                        break
-            
+            # If we get here, even the repaired response did not match the schema
+            print(f"   ⚠️  Research response invalid ({'; '.join(errors)[:60]}), using fallback")
             enhanced_data['web_research'] = {
-                'error': 'json_parse_failed',
-                'raw_response': research_text[:100] if research_text else 'No response',
+                'error': 'schema_validation_failed',
+                'validation_errors': errors,
                 'fallback_used': True
             }
-            enhanced_data['verified_product_type'] = fallback_type
+            enhanced_data['verified_product_type'] = title
             enhanced_data['is_construction_hardware'] = True
             enhanced_data['research_confidence'] = 0.3  # Low confidence for fallback
             
-            print(f"   ⚠️  Using fallback type: {fallback_type}")
-            
         except Exception as e:
             print(f"   ❌ Web research failed completely: {str(e)[:50]}...")
             enhanced_data['web_research'] = {
@@ -223,68 +251,308 @@ Return ONLY this JSON (no other text):
         
         return enhanced_data
     
+    def _fetch_research(self, research_key: str, search_query: str,
+                        cache_checked: bool = False) -> Tuple[str, Optional[Dict], List[str]]:
+        """Cache lookup, API call and validation for one product: ('ok' | 'api_failed' | 'invalid', data, errors)"""
+        print(f"   🔍 Researching: {search_query[:50]}...")
+        
+        # Simplified, robust prompt
+        research_prompt = f"""Analyze this construction/hardware product: {search_query}
+
+Return ONLY this JSON (no other text):
+{{
+    "verified_product_type": "specific product type",
+    "product_category": "department category",
+    "is_construction_hardware": true,
+    "confidence": 0.8
+}}"""
+        
+        if self.cache is not None and not cache_checked:
+            cached_research = self.cache.get(research_key)
+            if cached_research is not None:
+                print(f"   ✓ Research cache hit: {cached_research.get('verified_product_type', 'Unknown')}")
+                return 'ok', cached_research, []
+        
+        # Make safe API call, declaring the response schema
+        research_text = self._safe_api_call(research_prompt, max_tokens=200, retries=3,
+                                            response_format=RESEARCH_SCHEMA.response_format())
+        if not research_text:
+            return 'api_failed', None, []
+        
+        research_data, errors = self._validate_research(research_text)
+        if research_data is None:
+            return 'invalid', None, errors
+        
+        if self.cache is not None:
+            self.cache.put(research_key, research_data)
+        print(f"   ✓ Web research enhanced: {research_data.get('verified_product_type', 'Unknown')}")
+        return 'ok', research_data, []
+    
+    def _mark_for_reenrichment(self, product_data: Dict):
+        """Flag an item whose research fell back because the API was unavailable"""
+        product_data['needs_reenrichment'] = True
+        self._count(flagged_for_reenrichment=1)
+    
+    def _apply_research(self, enhanced_data: Dict, research_data: Dict, title: str) -> Dict:
+        """Merge validated research fields into the product data"""
+        enhanced_data['web_research'] = research_data
+        enhanced_data['verified_product_type'] = research_data.get('verified_product_type', title)
+        enhanced_data['is_construction_hardware'] = research_data.get('is_construction_hardware', True)
+        enhanced_data['research_confidence'] = research_data.get('confidence', 0.8)
+        return enhanced_data
+    
     def generate_ecommerce_title(self, product_data: Dict, category_info: Dict) -> str:
         """Generate optimized ecommerce title with robust error handling"""
         
         try:
-            # Enhance with web search
-            enhanced_data = self._enhance_with_web_search(product_data)
+            template_title = self._template_title(product_data, category_info)
+            if template_title:
+                return template_title
             
-            # Extract key information with multiple fallbacks
-            brand = (enhanced_data.get('verified_brand') or 
-                    enhanced_data.get('brand', '') or 
-                    self._extract_brand_from_title(enhanced_data.get('original_title', '')))
-            
-            product_type = (enhanced_data.get('verified_product_type') or 
-                           enhanced_data.get('producto_tipo', '') or
-                           enhanced_data.get('original_title', ''))
-            
-            specifications = enhanced_data.get('specifications', enhanced_data.get('especificaciones', ''))
-            color = enhanced_data.get('color', '')
+            # Enhance with web search, unless the match is deterministic enough to stay local
+            if self.research_policy.needs_research(product_data, category_info):
+                with get_metrics().span('research', 'enhanced_title_generator'):
+                    enhanced_data = self._enhance_with_web_search(product_data)
+            else:
+                enhanced_data = product_data.copy()
             
-            # Build optimized title intelligently
-            title_parts = []
+            return self._compose_title(enhanced_data)
             
-            # Start with verified product type
-            if product_type and len(product_type.strip()) > 3:
-                # Clean and format product type
-                clean_type = product_type.strip().title()
-                # Remove redundant words
-                clean_type = re.sub(r'\b(Product|Item|Producto)\b', '', clean_type, flags=re.IGNORECASE).strip()
-                if clean_type:
-                    title_parts.append(clean_type)
+        except Exception as e:
+            print(f"   ❌ Title generation failed: {e}")
+            # Ultimate fallback
+            return product_data.get('original_title', product_data.get('description', 'Product'))
+    
+    def _template_title(self, product_data: Dict, category_info: Dict) -> Optional[str]:
+        """Title assembled from the nomenclatura rule, or None when it leaves too many slots empty
+        or would drop a measurement or number found in the original title"""
+        if self.template_min_coverage is None:
+            return None
+        rule = (category_info or {}).get('nomenclatura_sugerida')
+        if not isinstance(rule, str) or not rule.strip():
+            get_metrics().inc('title_template_total', labels={'outcome': 'no_rule'})
+            return None
+        
+        assembled = self.templates.assemble(rule, product_data, category_info)
+        if not assembled.title or assembled.coverage < self.template_min_coverage:
+            get_metrics().inc('title_template_total', labels={'outcome': 'incomplete'})
+            return None
+        if assembled.dropped:
+            get_metrics().inc('title_template_total', labels={'outcome': 'lossy'})
+            return None
+        
+        get_metrics().inc('title_template_total', labels={'outcome': 'assembled'})
+        self._count(template_titles=1)
+        print(f"   ✓ Generated title from template: {assembled.title}")
+        return assembled.title
+    
+    def _compose_title(self, enhanced_data: Dict) -> str:
+        """Build the ecommerce title from (possibly researched) product data"""
+        # Extract key information with multiple fallbacks
+        brand = (enhanced_data.get('verified_brand') or 
+                enhanced_data.get('brand', '') or 
+                self._extract_brand_from_title(enhanced_data.get('original_title', '')))
+        
+        product_type = (enhanced_data.get('verified_product_type') or 
+                       enhanced_data.get('producto_tipo', '') or
+                       enhanced_data.get('original_title', ''))
+        
+        specifications = enhanced_data.get('specifications', enhanced_data.get('especificaciones', ''))
+        color = enhanced_data.get('color', '')
+        
+        # Build optimized title intelligently
+        title_parts = []
+        
+        # Start with verified product type
+        if product_type and len(product_type.strip()) > 3:
+            # Clean and format product type
+            clean_type = product_type.strip().title()
+            # Remove redundant words
+            clean_type = re.sub(r'\b(Product|Item|Producto)\b', '', clean_type, flags=re.IGNORECASE).strip()
+            if clean_type:
+                title_parts.append(clean_type)
+        
+        # Add specifications if meaningful
+        if specifications and len(specifications.strip()) > 2:
+            specs = specifications.strip()
+            if not any(spec.lower() in product_type.lower() for spec in specs.split()):
+                title_parts.append(specs)
+        
+        # Add color if specific
+        if color and len(color.strip()) > 2 and color.lower() not in ['n/a', 'none', 'standard']:
+            title_parts.append(color.title())
+        
+        # Add brand if reliable
+        if brand and len(brand.strip()) > 2 and brand.lower() not in ['n/a', 'unknown', 'generic']:
+            title_parts.append(brand)
+        
+        # Construct final title
+        if title_parts:
+            optimized_title = ' '.join(title_parts)
+            # Clean up the title
+            optimized_title = re.sub(r'\s+', ' ', optimized_title).strip()
+            optimized_title = optimized_title[:60]  # Reasonable length limit
+        else:
+            # Ultimate fallback
+            optimized_title = enhanced_data.get('original_title', enhanced_data.get('description', 'Product'))
+        
+        print(f"   ✓ Generated title: {optimized_title}")
+        return optimized_title
+    
+    def generate_ecommerce_titles(self, batch: List[Tuple[Dict, Dict]]) -> List[str]:
+        """Generate titles for (product_data, category_info) pairs concurrently
+        
+        Research calls run with at most max_in_flight requests in flight and are
+        paced by the token bucket. Results come back in input order, and each item
+        keeps the same fallback behaviour as generate_ecommerce_title. With
+        pack_size > 1, up to pack_size titles are researched per API call.
+        """
+        batch = list(batch)
+        if self.pack_size > 1 and self.web_search_enabled and len(batch) > 1:
+            return self._generate_packed(batch)
+        
+        return self.research_engine.map(
+            lambda pair: self.generate_ecommerce_title(pair[0], pair[1]),
+            batch,
+            fallback=lambda pair, e: pair[0].get('original_title', pair[0].get('description', 'Product'))
+        )
+    
+    def _generate_packed(self, batch: List[Tuple[Dict, Dict]]) -> List[str]:
+        """Packed research: one prompt per pack_size titles, then per-item title composition"""
+        enhanced = [None] * len(batch)
+        template_titles = [self._template_title(product_data, category_info) for product_data, category_info in batch]
+        # research key -> indices of the items sharing it; only the first goes into a pack
+        pending: Dict[str, List[int]] = {}
+        for i, (product_data, category_info) in enumerate(batch):
+            if template_titles[i]:
+                continue
+            if not self.research_policy.needs_research(product_data, category_info):
+                enhanced[i] = product_data.copy()
+                continue
+            title, brand, product_type, _ = self._research_query(product_data)
+            research_key = self._research_key(title, brand, product_type)
+            try:
+                cached_research = self.cache.get(research_key) if self.cache is not None else None
+            except Exception as e:
+                print(f"   ⚠️  Research lookup failed: {str(e)[:50]}...")
+                cached_research = None
+            if cached_research is not None:
+                enhanced[i] = self._apply_research(product_data.copy(), cached_research, title)
+                continue
+            pending.setdefault(research_key, []).append(i)
+        
+        duplicates = len([i for indices in pending.values() for i in indices]) - len(pending)
+        if duplicates:
+            self._count(packed_duplicates=duplicates)
+        
+        keys = list(pending)
+        packs = [keys[start:start + self.pack_size] for start in range(0, len(keys), self.pack_size)]
+        pack_results = self.research_engine.map(
+            lambda pack: self._research_pack([batch[pending[key][0]][0] for key in pack]),
+            packs,
+            fallback=lambda pack, e: {}
+        )
+        
+        # Demultiplex by item id; anything missing or malformed is researched on its own
+        retry = []
+        for pack, results in zip(packs, pack_results):
+            for item_id, research_key in enumerate(pack, 1):
+                research_data = results.get(str(item_id))
+                if research_data is None:
+                    retry.extend(pending[research_key])
+                    continue
+                if self.cache is not None:
+                    self.cache.put(research_key, research_data)
+                for i in pending[research_key]:
+                    product_data = batch[i][0]
+                    enhanced[i] = self._apply_research(product_data.copy(), research_data, self._research_query(product_data)[0])
+        
+        if retry:
+            self._count(packed_items_retried=len(retry))
+            print(f"   🔄 Researching {len(retry)} unresolved packed items individually")
             
-            # Add specifications if meaningful
-            if specifications and len(specifications.strip()) > 2:
-                specs = specifications.strip()
-                if not any(spec.lower() in product_type.lower() for spec in specs.split()):
-                    title_parts.append(specs)
+            def research_one(i):
+                with get_metrics().span('research', 'enhanced_title_generator'):
+                    return self._enhance_with_web_search(batch[i][0], cache_checked=True)
             
-            # Add color if specific
-            if color and len(color.strip()) > 2 and color.lower() not in ['n/a', 'none', 'standard']:
-                title_parts.append(color.title())
+            # Duplicates retried together are coalesced by single-flight; these
+            # items already missed the cache above, so the lookup is not repeated
+            singles = self.research_engine.map(research_one, retry, fallback=lambda i, e: batch[i][0].copy())
+            for i, enhanced_data in zip(retry, singles):
+                enhanced[i] = enhanced_data
+        
+        titles = []
+        for (product_data, _), enhanced_data, template_title in zip(batch, enhanced, template_titles):
+            if template_title:
+                titles.append(template_title)
+                continue
+            try:
+                titles.append(self._compose_title(enhanced_data))
+            except Exception as e:
+                print(f"   ❌ Title generation failed: {e}")
+                titles.append(product_data.get('original_title', product_data.get('description', 'Product')))
+        return titles
+    
+    def _research_pack(self, products: List[Dict]) -> Dict[str, Dict]:
+        """Research several products in one call; returns validated research by item id ("1".."N")"""
+        with get_metrics().span('research', 'enhanced_title_generator', items=len(products)):
+            listing = '\n'.join(f"[{item_id}] {self._research_query(product_data)[3]}"
+                                 for item_id, product_data in enumerate(products, 1))
+            print(f"   🔍 Researching pack of {len(products)} products...")
             
-            # Add brand if reliable
-            if brand and len(brand.strip()) > 2 and brand.lower() not in ['n/a', 'unknown', 'generic']:
-                title_parts.append(brand)
+            research_prompt = f"""Analyze these {len(products)} construction/hardware products:
+{listing}
+
+Return ONLY a JSON array with one object per product, using its number as "id" (no other text):
+[
+    {{"id": "1", "verified_product_type": "specific product type", "product_category": "department category", "is_construction_hardware": true, "confidence": 0.8}}
+]"""
             
-            # Construct final title
-            if title_parts:
-                optimized_title = ' '.join(title_parts)
-                # Clean up the title
-                optimized_title = re.sub(r'\s+', ' ', optimized_title).strip()
-                optimized_title = optimized_title[:60]  # Reasonable length limit
-            else:
-                # Ultimate fallback
-                optimized_title = enhanced_data.get('original_title', enhanced_data.get('description', 'Product'))
+            research_text = self._safe_api_call(research_prompt,
+                                                max_tokens=self.PACKED_TOKENS_PER_ITEM * len(products), retries=3)
             
-            print(f"   ✓ Generated title: {optimized_title}")
-            return optimized_title
+            results = {}
+            for element in self._extract_json_array_safely(research_text):
+                if not isinstance(element, dict):
+                    continue
+                item_id = str(element.get('id', '')).strip().strip('[]')
+                if not item_id.isdigit() or not 1 <= int(item_id) <= len(products) or item_id in results:
+                    continue
+                research_data, _ = RESEARCH_SCHEMA.validate(element)
+                if research_data is not None:
+                    results[item_id] = research_data
             
-        except Exception as e:
-            print(f"   ❌ Title generation failed: {e}")
-            # Ultimate fallback
-            return product_data.get('original_title', product_data.get('description', 'Product'))
+            self._count(packed_calls=1, packed_items=len(products))
+            print(f"   ✓ Pack resolved {len(results)}/{len(products)} products")
+            return results
+    
+    def _extract_json_array_safely(self, text: str) -> List:
+        """Extract a JSON array (or an object wrapping one) from a packed response"""
+        if not text:
+            return []
+        
+        candidates = [text.strip()]
+        start = text.find('[')
+        end = text.rfind(']') + 1
+        if start != -1 and end > start:
+            block = text[start:end]
+            candidates.append(block)
+            candidates.append(re.sub(r',\s*([}\]])', r'\1', block))  # Trailing commas
+        
+        for candidate in candidates:
+            try:
+                parsed = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(parsed, list):
+                return parsed
+            if isinstance(parsed, dict):
+                # {"items": [...]} or a single object
+                for value in parsed.values():
+                    if isinstance(value, list):
+                        return value
+                return [parsed]
+        return []
     
     def _extract_brand_from_title(self, title: str) -> str:
         """Extract potential brand from title using common patterns"""
@@ -292,13 +560,9 @@ Return ONLY this JSON (no other text):
             return ""
         
         # Common brand patterns in construction/hardware
-        known_brands = ['BOSCH', 'MAKITA', 'DEWALT', 'MILWAUKEE', 'STANLEY', 'BLACK+DECKER', 
-                       'RYOBI', 'CRAFTSMAN', 'KOBALT', 'HUSKY', 'RIDGID', 'PORTER-CABLE']
-        
-        title_upper = title.upper()
-        for brand in known_brands:
-            if brand in title_upper:
-                return brand.title()
+        brand = get_title_scanner().scan(title).first('brand', KNOWN_BRANDS)
+        if brand:
+            return brand.title()
         
         # Look for brand-like patterns (capitalized words)
         words = title.split()
@@ -313,12 +577,37 @@ Return ONLY this JSON (no other text):
         total_requests = self.successful_requests + self.failed_requests
         success_rate = (self.successful_requests / total_requests * 100) if total_requests > 0 else 0
         
-        return {
+        stats = {
             'total_api_calls': self.api_call_count,
             'successful_requests': self.successful_requests,
             'failed_requests': self.failed_requests,
             'success_rate': f"{success_rate:.1f}%"
         }
+        
+        if self.pack_size > 1:
+            stats.update({
+                'pack_size': self.pack_size,
+                'packed_calls': self.packed_calls,
+                'packed_items': self.packed_items,
+                'packed_items_retried': self.packed_items_retried,
+                'packed_duplicates': self.packed_duplicates
+            })
+        
+        if self.template_min_coverage is not None:
+            stats['template_titles'] = self.template_titles
+        
+        stats.update(self.research_policy.get_stats())
+        stats.update(self.schema_stats.get_stats())
+        stats.update(self.concurrency.get_stats())
+        stats.update(self.breaker.get_stats())
+        stats.update(self.single_flight.get_stats())
+        stats['research_short_circuited'] = self.short_circuited
+        stats['flagged_for_reenrichment'] = self.flagged_for_reenrichment
+        
+        if self.cache is not None:
+            stats.update(self.cache.get_stats())
+        
+        return stats
 
 # Backward compatibility - keep the same class name
 EnhancedTitleGenerator = RobustEnhancedTitleGenerator
\ No newline at end of file
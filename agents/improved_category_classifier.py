@@ -2,7 +2,11 @@ import pandas as pd
 import os
 from typing import Dict, Optional, List
 
-class ImprovedCategoryClassifier:
+from agents.batch_classifier import BatchCategoryMatcher
+from agents.keyword_matrix import KeywordScoringMatrix
+from agents.taxonomy_registry import get_taxonomy
+
+class ImprovedCategoryClassifier(BatchCategoryMatcher):
     def __init__(self, csv_path: str = None):
         """Initialize with enhanced category matching logic"""
         if csv_path is None:
@@ -13,12 +17,25 @@ class ImprovedCategoryClassifier:
             else:
                 raise FileNotFoundError("Cannot find nomenclatura_gorila.csv in data/ folder")
                 
-        self.df = pd.read_csv(csv_path)
-        self.df.columns = self.df.columns.str.strip()
+        taxonomy = get_taxonomy(csv_path)
+        self.df = taxonomy.df
+        self.index = taxonomy.index
+        self.trigrams = taxonomy.trigrams
         
         # Create category keyword mappings for better matching
         self.category_keywords = self._build_category_keywords()
         
+        # Precomputed term x category scores for enhanced keyword matching
+        self.keyword_matrix = KeywordScoringMatrix(self.category_keywords)
+        self._category_rows = {}
+        for row_id, categoria in enumerate(self.index.categoria_upper):
+            self._category_rows.setdefault(categoria, row_id)
+        
+        # (DEPARTAMENTO, FAMILIA, CATEGORIA) -> first row, compared the way _try_exact_match always has
+        self._exact_rows = {}
+        for row_id, (dept, fam, cat) in enumerate(zip(self.df['Departamento'], self.df['Familia'], self.df['Categoria'])):
+            self._exact_rows.setdefault((dept.upper(), fam.upper(), cat.strip().upper()), row_id)
+        
         print(f"Loaded {len(self.df)} category mappings with enhanced matching")
     
     def _build_category_keywords(self) -> Dict:
@@ -62,50 +79,42 @@ class ImprovedCategoryClassifier:
         """
         Enhanced category matching with construction context awareness
         """
-        
-        # Get construction analysis if available
-        construction_analysis = product_data.get('construction_analysis', {})
-        likely_category = construction_analysis.get('likely_category')
+        return self._match_batch([product_data])[0]
+    
+    def _match_batch(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Apply each strategy in priority order, keyword-scoring the leftovers together"""
         
         # Try exact matches first (highest priority)
-        exact_match = self._try_exact_match(product_data)
-        if exact_match:
-            return exact_match
+        matches = [self._try_exact_match(product_data) for product_data in products]
         
         # Try construction-aware matching
-        construction_match = self._try_construction_aware_match(product_data, construction_analysis)
-        if construction_match:
-            return construction_match
-        
-        # Try enhanced keyword matching
-        keyword_match = self._try_enhanced_keyword_match(product_data)
-        if keyword_match:
-            return keyword_match
+        keyword_items = []
+        for i, product_data in enumerate(products):
+            if matches[i] is None:
+                construction_analysis = product_data.get('construction_analysis', {})
+                matches[i] = self._try_construction_aware_match(product_data, construction_analysis)
+                if matches[i] is None:
+                    keyword_items.append(i)
         
-        # Try fuzzy matching as last resort
-        fuzzy_match = self._try_fuzzy_match(product_data)
+        # Try enhanced keyword matching, then fuzzy matching as last resort
+        keyword_matches = self._try_enhanced_keyword_matches([products[i] for i in keyword_items])
+        for i, keyword_match in zip(keyword_items, keyword_matches):
+            matches[i] = keyword_match or self._try_fuzzy_match(products[i])
         
-        return fuzzy_match
+        return matches
     
     def _try_exact_match(self, product_data: Dict) -> Optional[Dict]:
         """Try exact departamento/familia/categoria match"""
         
-        for _, row in self.df.iterrows():
-            if (product_data.get('departamento', '').upper() == row['Departamento'].upper() and
-                product_data.get('familia', '').upper() == row['Familia'].upper() and
-                product_data.get('categoria', '').upper() == row['Categoria'].strip().upper()):
-                
-                return {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'], 
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'exact',
-                    'confidence': 1.0
-                }
+        row_id = self._exact_rows.get((
+            product_data.get('departamento', '').upper(),
+            product_data.get('familia', '').upper(),
+            product_data.get('categoria', '').upper()
+        ))
+        if row_id is None:
+            return None
         
-        return None
+        return self.index.build_match(row_id, match_type='exact', confidence=1.0)
     
     def _try_construction_aware_match(self, product_data: Dict, construction_analysis: Dict) -> Optional[Dict]:
         """Match using construction industry context"""
@@ -163,8 +172,30 @@ class ImprovedCategoryClassifier:
     
     def _try_enhanced_keyword_match(self, product_data: Dict) -> Optional[Dict]:
         """Enhanced keyword matching with better scoring"""
+        return self._try_enhanced_keyword_matches([product_data])[0]
+    
+    def _try_enhanced_keyword_matches(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Enhanced keyword matching for many products with one sparse matrix product"""
         
-        # Extract searchable terms from product data
+        term_lists = [self._enhanced_search_terms(product_data) for product_data in products]
+        
+        matches = []
+        for cat_id, best_score in self.keyword_matrix.best_matches(term_lists):
+            best_match = None
+            if best_score > 0:
+                categoria = self.keyword_matrix.categories[cat_id]
+                best_match = self.index.build_match(
+                    self._category_rows[categoria],
+                    match_type='enhanced_keyword',
+                    confidence=min(best_score / 50, 1.0),
+                    score=best_score
+                )
+            matches.append(best_match if best_match and best_match['confidence'] > 0.2 else None)
+        
+        return matches
+    
+    def _enhanced_search_terms(self, product_data: Dict) -> List[str]:
+        """Extract searchable terms from product data"""
         search_terms = []
         
         # Add various product data fields
@@ -173,78 +204,25 @@ class ImprovedCategoryClassifier:
                 search_terms.extend(product_data[field].upper().split())
         
         # Add construction keywords if available
-        construction_analysis = product_data.get('construction_analysis', {})
         if 'palabras_clave_categoria' in product_data:
             search_terms.extend([k.upper() for k in product_data['palabras_clave_categoria']])
         
-        best_match = None
-        best_score = 0
-        
-        for categoria, keywords in self.category_keywords.items():
-            score = 0
-            
-            # Calculate keyword overlap
-            categoria_upper = categoria.upper()
-            for term in search_terms:
-                if term in categoria_upper:
-                    score += len(term) * 2  # Longer matches get higher scores
-                
-                for keyword in keywords:
-                    if term in keyword.upper() or keyword.upper() in term:
-                        score += len(keyword)
-            
-            if score > best_score:
-                best_score = score
-                # Find the row for this category
-                row = self.df[self.df['Categoria'].str.strip().str.upper() == categoria].iloc[0]
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'enhanced_keyword',
-                    'confidence': min(score / 50, 1.0),
-                    'score': score
-                }
-        
-        return best_match if best_match and best_match['confidence'] > 0.2 else None
+        return search_terms
     
     def _try_fuzzy_match(self, product_data: Dict) -> Optional[Dict]:
-        """Fuzzy matching as last resort"""
+        """Fuzzy matching as last resort, through the taxonomy's trigram index"""
         
         search_text = product_data.get('description', '') + ' ' + product_data.get('original_title', '')
-        search_words = search_text.upper().split()
-        
-        best_match = None
-        best_score = 0
-        
-        for _, row in self.df.iterrows():
-            categoria = row['Categoria'].strip().upper()
-            score = 0
-            
-            for word in search_words:
-                if len(word) > 2:  # Only consider meaningful words
-                    if word in categoria:
-                        score += len(word)
-                    # Partial matches
-                    elif any(word in cat_word or cat_word in word for cat_word in categoria.split()):
-                        score += len(word) * 0.5
-            
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'fuzzy',
-                    'confidence': min(score / 30, 1.0),
-                    'score': score
-                }
+        scores = self.trigrams.score(self.trigrams.query_words(search_text))
+        if not scores:
+            return None
         
-        return best_match if best_match and best_match['confidence'] > 0.15 else None
+        # Highest score wins; the earliest row wins ties
+        row_id, score = min(scores.items(), key=lambda item: (-item[1], item[0]))
+        confidence = min(score / 30, 1.0)
+        if confidence <= 0.15:
+            return None
+        return self.index.build_match(row_id, match_type='fuzzy', confidence=confidence, score=round(score, 2))
     
     def get_all_categories(self) -> pd.DataFrame:
         """Return all available categories"""
@@ -1,9 +1,11 @@
-import re
 import openai
 import os
 from typing import Dict, List
 from dotenv import load_dotenv
 
+from agents.attribute_lexer import get_attribute_lexer
+from agents.title_scanner import CONSTRUCTION_VOCAB, get_title_scanner
+
 load_dotenv()
 
 class ImprovedTitleParser:
@@ -13,47 +15,10 @@ class ImprovedTitleParser:
             api_key=api_key or os.getenv('OPENAI_API_KEY')
         )
         
-        # Construction vocabulary mapping
-        self.construction_vocab = {
-            # Hardware terms
-            'CHAPA': 'cerradura/manija de puerta',
-            'CERRADURA': 'cerradura de puerta',
-            'MANIJA': 'manija de puerta',
-            'PICAPORTE': 'manija de puerta',
-            
-            # Fasteners
-            'TOR': 'tornillo',
-            'TORNILLO': 'tornillo',
-            'PERNO': 'perno',
-            'TUERCA': 'tuerca',
-            'ARANDELA': 'arandela',
-            
-            # Drill/cutting tools
-            'BROCA': 'broca para taladro',
-            'PUNTA': 'punta de herramienta',
-            'MECHA': 'broca',
-            
-            # Plumbing vs Hardware
-            'GRIFO': 'grifería',
-            'LLAVE': 'grifería o herramienta',
-            'VALVULA': 'grifería',
-            
-            # Materials
-            'GALV': 'galvanizado',
-            'INOX': 'acero inoxidable',
-            'CROMO': 'cromado',
-            'COBRE': 'cobre',
-            
-            # Tile patterns
-            'BAMBOO': 'patrón bambú',
-            'CAPRI': 'patrón capri',
-            'CLAY': 'patrón clay',
-            
-            # Locations (context, not product type)
-            'BAÑO': 'ubicación: baño',
-            'COCINA': 'ubicación: cocina',
-            'JARDIN': 'ubicación: jardín'
-        }
+        # Construction vocabulary mapping (shared with the title scanner)
+        self.construction_vocab = CONSTRUCTION_VOCAB
+        self.scanner = get_title_scanner()
+        self.lexer = get_attribute_lexer()
     
     def parse_title_to_product_data(self, raw_title: str) -> Dict:
         """Parse a raw title into structured product data"""
@@ -72,37 +37,34 @@ class ImprovedTitleParser:
             'description': title
         }
         
-        # Extract dimensions
-        dimension_patterns = [
-            r'(\d+)[xX×](\d+)',  # 21x31
-            r'(\d+)\s*[xX×]\s*(\d+)',  # 21 x 31
-        ]
+        # One pass finds every vocabulary term and tile pattern
+        scan = self.scanner.scan(title)
         
-        for pattern in dimension_patterns:
-            match = re.search(pattern, title)
-            if match:
-                data['dimensions'] = match.group(0)
-                break
-        
-        # Extract quantities
-        quantity_match = re.search(r'(\d+)\s*(pz|pzs|piezas|unidades)', title, re.IGNORECASE)
-        if quantity_match:
-            data['quantity'] = quantity_match.group(0)
+        # Dimensions, quantities and colors come from the shared lexer pass
+        tokens = self.lexer.tokenize(title)
+        for kind, field in (('dimension', 'dimensions'), ('quantity', 'quantity')):
+            token = tokens.find(kind)
+            if token:
+                data[field] = token.text
         
         # Extract colors
         colors = ['blanco', 'negro', 'azul', 'rojo', 'verde', 'gris', 'amarillo', 'naranja', 'cafe']
-        for color in colors:
-            if re.search(rf'\b{color}\b', title, re.IGNORECASE):
-                data['color'] = color.title()
-                break
+        color = tokens.first('color', colors)
+        if color:
+            data['color'] = color.title()
         
         # Detect tile patterns
         tile_patterns = ['BAMBOO', 'CAPRI', 'CLAY']
-        for pattern in tile_patterns:
-            if pattern.upper() in title.upper():
-                data['tile_pattern'] = pattern
-                data['producto_tipo'] = f'{pattern.lower()} tile pattern'
-                break
+        pattern = scan.first('tile_pattern', tile_patterns)
+        if pattern:
+            data['tile_pattern'] = pattern
+            data['producto_tipo'] = f'{pattern.lower()} tile pattern'
+        
+        # Construction vocabulary (whole words, so TOR does not fire inside MOTOR)
+        found_terms = scan.terms('vocab', whole_word=True)
+        detected_terms = {term: meaning for term, meaning in self.construction_vocab.items() if term in found_terms}
+        if detected_terms:
+            data['construction_analysis'] = {'detected_terms': detected_terms}
         
         return data
 
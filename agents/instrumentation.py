@@ -0,0 +1,205 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Seconds per title; covers cheap local lookups up to slow LLM research
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+METRIC_HELP = {
+    'pipeline_stage_duration_seconds': ('histogram', 'Time spent per title in each pipeline stage'),
+    'pipeline_stage_errors_total': ('counter', 'Pipeline stage spans that raised an exception'),
+    'pipeline_category_match_confidence': ('histogram', 'Confidence of category matches by match type'),
+    'llm_research_decisions_total': ('counter', 'Research policy decisions (research or bypass) by match type'),
+    'llm_schema_responses_total': ('counter', 'Schema-validated LLM responses by outcome (valid, repaired, failed)'),
+    'llm_schema_wasted_tokens_total': ('counter', 'Estimated completion tokens of LLM responses discarded by validation'),
+    'llm_requests_total': ('counter', 'LLM API requests by outcome (success, rate_limited, timeout, error)'),
+    'llm_concurrency_limit': ('gauge', 'Current adaptive limit on concurrent LLM requests'),
+    'llm_circuit_state': ('gauge', 'LLM circuit breaker state (0 closed, 1 half-open, 2 open)'),
+    'llm_circuit_transitions_total': ('counter', 'LLM circuit breaker state transitions by target state'),
+    'llm_circuit_short_circuited_total': ('counter', 'LLM calls rejected while the circuit was open'),
+    'title_template_total': ('counter', 'Titles tried against the nomenclatura template, by outcome'),
+    'label_collisions_total': ('counter', 'Distinct titles that shared a store label in a batch, by outcome'),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float, count: int = 1):
+        """Record value, count times"""
+        self.count += count
+        self.sum += value * count
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += count
+                break
+
+    def cumulative_counts(self) -> List[int]:
+        counts = []
+        running = 0
+        for bucket_count in self.bucket_counts:
+            running += bucket_count
+            counts.append(running)
+        return counts
+
+
+class PipelineMetrics:
+    """Thread-safe in-process registry of pipeline histograms and counters.
+
+    Stages are timed with span(), which records the time per title, so a
+    batch call over N titles adds N observations of elapsed / N. Gauges hold
+    the last value set. Everything can be rendered in the Prometheus text
+    exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    @staticmethod
+    def _label_key(labels: Optional[Dict]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((str(k), str(v)) for k, v in (labels or {}).items()))
+
+    def observe(self, name: str, value: float, labels: Dict = None, count: int = 1,
+                buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        """Add count observations of value to a histogram"""
+        key = (name, self._label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value, count)
+
+    def inc(self, name: str, amount: float = 1, labels: Dict = None):
+        """Increment a counter"""
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Dict = None):
+        """Set a gauge to its current value"""
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def span(self, stage: str, pipeline: str, items: int = 1) -> Iterator[None]:
+        """Time a block of work covering `items` titles of one pipeline stage"""
+        labels = {'pipeline': pipeline, 'stage': stage}
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('pipeline_stage_errors_total', labels=labels)
+            raise
+        finally:
+            if items > 0:
+                elapsed = time.perf_counter() - start
+                self.observe('pipeline_stage_duration_seconds', elapsed / items, labels, count=items)
+
+    def record_match(self, pipeline: str, match: Optional[Dict]):
+        """Record a category match (or a miss) under its match_type"""
+        if match:
+            match_type = match.get('match_type', 'unknown')
+            confidence = match.get('confidence', 1.0)
+        else:
+            match_type, confidence = 'none', 0.0
+        self.observe('pipeline_category_match_confidence', float(confidence),
+                     {'pipeline': pipeline, 'match_type': match_type}, buckets=CONFIDENCE_BUCKETS)
+
+    def snapshot(self) -> Dict:
+        """Plain-dict copy of every metric, for reports and debugging"""
+        with self._lock:
+            histograms = [
+                {'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum}
+                for (name, labels), h in self._histograms.items()
+            ]
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in self._counters.items()
+            ]
+            gauges = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in self._gauges.items()
+            ]
+        return {'histograms': histograms, 'counters': counters, 'gauges': gauges}
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _format_labels(self, labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = labels + extra
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{self._escape(v)}"' for k, v in pairs) + '}'
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        if value == int(value):
+            return str(int(value))
+        return repr(float(value))
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(
+                (name, labels, h.buckets, h.cumulative_counts(), h.count, h.sum)
+                for (name, labels), h in self._histograms.items()
+            )
+            counters = sorted((name, labels, value) for (name, labels), value in self._counters.items())
+            gauges = sorted((name, labels, value) for (name, labels), value in self._gauges.items())
+
+        lines = []
+        described = set()
+
+        def describe(name: str, default_type: str):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = METRIC_HELP.get(name, (default_type, name))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+
+        for name, labels, buckets, cumulative, count, total in histograms:
+            describe(name, 'histogram')
+            for bound, bucket_count in zip(buckets, cumulative):
+                lines.append(f'{name}_bucket{self._format_labels(labels, (("le", repr(float(bound))),))} {bucket_count}')
+            lines.append(f'{name}_bucket{self._format_labels(labels, (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{self._format_labels(labels)} {repr(float(total))}')
+            lines.append(f'{name}_count{self._format_labels(labels)} {count}')
+
+        for name, labels, value in counters:
+            describe(name, 'counter')
+            lines.append(f'{name}{self._format_labels(labels)} {self._format_value(value)}')
+
+        for name, labels, value in gauges:
+            describe(name, 'gauge')
+            lines.append(f'{name}{self._format_labels(labels)} {self._format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = PipelineMetrics()
+
+
+def get_metrics() -> PipelineMetrics:
+    """Process-wide metrics registry shared by every pipeline"""
+    return _metrics
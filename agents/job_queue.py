@@ -0,0 +1,373 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents.research_engine import ResearchEngine
+
+
+class JobStore:
+    """SQLite-backed storage for batch jobs and their per-title checkpoints"""
+
+    def __init__(self, path: str = "data/jobs.sqlite"):
+        self.path = path
+
+        directory = os.path.dirname(path)
+        if directory and path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    processing_type TEXT NOT NULL,
+                    filename TEXT,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    successful INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    result TEXT,
+                    PRIMARY KEY (job_id, idx)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (job_id, status, idx)"
+            )
+
+        self.recover_stale_jobs()
+
+    def recover_stale_jobs(self) -> Dict[str, int]:
+        """Clean up jobs left behind by a process that died, so none stay stuck
+
+        A job still 'creating' never finished storing its titles (and its ID was
+        never returned), so it is failed and its partial items dropped. A job
+        still 'running' lost its runner; it goes back to 'queued' to resume
+        from its last checkpoint. Safe because one process owns the database.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM job_items WHERE job_id IN (SELECT id FROM jobs WHERE status = 'creating')"
+            )
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted while the job was being created', "
+                "updated_at = ? WHERE status = 'creating'", (now,)
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (now,)
+            ).rowcount
+        if failed or requeued:
+            print(f"🧹 Recovered stale jobs: {failed} failed while creating, {requeued} requeued")
+        return {'failed': failed, 'requeued': requeued}
+
+    def create_job(self, titles: Iterable[str], processing_type: str, filename: str = None,
+                   chunk_size: int = 1000) -> str:
+        """Store a new job and all of its titles, returning the job ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, processing_type, filename, created_at, updated_at) "
+                "VALUES (?, 'creating', ?, ?, ?, ?)",
+                (job_id, processing_type, filename, now, now)
+            )
+
+        total = 0
+        chunk = []
+        try:
+            for title in titles:
+                chunk.append((job_id, total, title))
+                total += 1
+                if len(chunk) >= chunk_size:
+                    self._insert_items(chunk)
+                    chunk = []
+            if chunk:
+                self._insert_items(chunk)
+        except Exception as e:
+            # The caller never gets this job's ID, so drop what was stored of it
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (f"Creation failed: {e}", time.time(), job_id)
+                )
+            raise
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', total = ?, updated_at = ? WHERE id = ?",
+                (total, time.time(), job_id)
+            )
+        return job_id
+
+    def _insert_items(self, rows: List[Tuple]):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO job_items (job_id, idx, title) VALUES (?, ?, ?)", rows)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Return a job's status and progress counters"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, processing_type, filename, total, processed, successful, error, "
+                "created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        keys = ['job_id', 'status', 'processing_type', 'filename', 'total', 'processed', 'successful',
+                'error', 'created_at', 'updated_at']
+        job = dict(zip(keys, row))
+        job['failed'] = job['processed'] - job['successful']
+        job['progress'] = round(job['processed'] / job['total'] * 100, 1) if job['total'] else 100.0
+        return job
+
+    def set_status(self, job_id: str, status: str, error: str = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id)
+            )
+
+    def claim_job(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if someone else has it"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount == 1
+
+    def jobs_with_status(self, *statuses: str) -> List[str]:
+        """IDs of jobs in any of the given statuses, oldest first"""
+        placeholders = ', '.join('?' for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) ORDER BY created_at", statuses
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pending_items(self, job_id: str, limit: int = 500) -> List[Tuple[int, str]]:
+        """Next unprocessed (idx, title) pairs of a job, in order"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT idx, title FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?",
+                (job_id, limit)
+            ).fetchall()
+
+    def save_results(self, job_id: str, results: List[Tuple[int, Dict]]):
+        """Checkpoint finished items and bump the job's progress counters"""
+        if not results:
+            return
+        successful = sum(1 for _, result in results if result.get('success', False))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE job_items SET status = 'done', result = ? WHERE job_id = ? AND idx = ?",
+                [(json.dumps(result, ensure_ascii=False, default=str), job_id, idx) for idx, result in results]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET processed = processed + ?, successful = successful + ?, updated_at = ? WHERE id = ?",
+                (len(results), successful, time.time(), job_id)
+            )
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict]:
+        """Finished results of a job in input order, one page at a time"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, result FROM job_items WHERE job_id = ? AND status = 'done' "
+                "ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset)
+            ).fetchall()
+        return [dict(json.loads(result), index=idx) for idx, result in rows]
+
+    def labeled_results(self, job_id: str, page_size: int = 1000) -> List[Dict]:
+        """Label fields of every finished result that has label variants, for a collision pass
+
+        Only index, optimized_title, store_label and label_variants (keyed by
+        int width) are kept, so a 100k-title job does not hold every result.
+        """
+        labeled = []
+        last_idx = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT idx, result FROM job_items WHERE job_id = ? AND status = 'done' AND idx > ? "
+                    "ORDER BY idx LIMIT ?",
+                    (job_id, last_idx, page_size)
+                ).fetchall()
+            if not rows:
+                return labeled
+            for idx, result in rows:
+                result = json.loads(result)
+                if result.get('optimized_title') and result.get('label_variants'):
+                    labeled.append({
+                        'index': idx,
+                        'optimized_title': result['optimized_title'],
+                        'store_label': result.get('store_label'),
+                        'label_variants': {int(width): label for width, label in result['label_variants'].items()}
+                    })
+            last_idx = rows[-1][0]
+
+    def update_labels(self, job_id: str, labeled: List[Dict]):
+        """Write relabeled store_label and label_variants back into stored results"""
+        with self._lock, self._conn:
+            for item in labeled:
+                row = self._conn.execute(
+                    "SELECT result FROM job_items WHERE job_id = ? AND idx = ?", (job_id, item['index'])
+                ).fetchone()
+                if row is None:
+                    continue
+                result = json.loads(row[0])
+                result['store_label'] = item['store_label']
+                result['label_variants'] = item['label_variants']
+                self._conn.execute(
+                    "UPDATE job_items SET result = ? WHERE job_id = ? AND idx = ?",
+                    (json.dumps(result, ensure_ascii=False, default=str), job_id, item['index'])
+                )
+
+
+class JobQueue:
+    """Background processing of uploaded catalogs with resumable checkpoints.
+
+    Jobs are stored in a JobStore and run by a small pool of runner threads.
+    Each runner feeds a job's pending titles through process_title with
+    bounded concurrency and checkpoints results in batches, so after a
+    restart start() picks unfinished jobs up where they left off.
+    Assumes a single process owns the job database.
+    """
+
+    def __init__(self, process_title: Callable[[str, str], Dict], store: JobStore = None,
+                 max_concurrent_jobs: int = 2, max_in_flight: int = 8, checkpoint_every: int = 25,
+                 resolve_label_collisions: Callable[[List[Dict]], None] = None):
+        self.process_title = process_title
+        # Relabels a job's results in place once all of them are stored
+        self.resolve_label_collisions = resolve_label_collisions
+        self.store = store or JobStore()
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.engine = ResearchEngine(max_in_flight)
+
+        self._queue = queue.Queue()
+        self._runners: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._runners)
+
+    def start(self):
+        """Start the runner threads and requeue any unfinished jobs"""
+        with self._start_lock:
+            if self._runners:
+                return
+            self._stopping.clear()
+
+            # The store already put jobs orphaned by a dead process back to 'queued'
+            resumed = self.store.jobs_with_status('queued')
+            for job_id in resumed:
+                self._queue.put(job_id)
+            if resumed:
+                print(f"🔄 Resuming {len(resumed)} unfinished job(s)")
+
+            for i in range(self.max_concurrent_jobs):
+                runner = threading.Thread(target=self._run, name=f'job-runner-{i}', daemon=True)
+                runner.start()
+                self._runners.append(runner)
+
+    def stop(self, timeout: float = None):
+        """Ask the runners to stop after their current checkpoint"""
+        self._stopping.set()
+        for _ in self._runners:
+            self._queue.put(None)
+        for runner in self._runners:
+            runner.join(timeout)
+        self._runners = []
+
+    def submit(self, titles: Iterable[str], processing_type: str = 'messy', filename: str = None) -> str:
+        """Create a job for the titles and queue it, returning its ID"""
+        job_id = self.store.create_job(titles, processing_type, filename)
+        self._queue.put(job_id)
+        return job_id
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            try:
+                self._process_job(job_id)
+            except Exception as e:
+                print(f"   ❌ Job {job_id} failed: {e}")
+                self.store.set_status(job_id, 'failed', str(e))
+
+    def _process_job(self, job_id: str):
+        if not self.store.claim_job(job_id):
+            return
+
+        job = self.store.get_job(job_id)
+        processing_type = job['processing_type']
+        print(f"🚀 Job {job_id}: processing {job['total'] - job['processed']} remaining titles")
+
+        def process(item):
+            idx, title = item
+            return idx, self.process_title(title, processing_type)
+
+        def failed(item, error):
+            idx, title = item
+            return idx, {'input_title': title, 'success': False, 'errors': [f'Processing error: {str(error)}']}
+
+        while not self._stopping.is_set():
+            items = self.store.pending_items(job_id)
+            if not items:
+                break
+
+            checkpoint = []
+            for idx, result in self.engine.imap(process, items, fallback=failed):
+                checkpoint.append((idx, result))
+                if len(checkpoint) >= self.checkpoint_every:
+                    self.store.save_results(job_id, checkpoint)
+                    checkpoint = []
+                    if self._stopping.is_set():
+                        break
+            self.store.save_results(job_id, checkpoint)
+
+        if self._stopping.is_set():
+            # Leave it for start() to resume from the last checkpoint
+            self.store.set_status(job_id, 'queued')
+        else:
+            if self.resolve_label_collisions is not None:
+                self._resolve_label_collisions(job_id)
+            self.store.set_status(job_id, 'completed')
+            print(f"✅ Job {job_id} completed")
+
+    def _resolve_label_collisions(self, job_id: str):
+        """Disambiguate labels across the whole job, like /process does for one batch"""
+        try:
+            labeled = self.store.labeled_results(job_id)
+            before = [dict(item['label_variants']) for item in labeled]
+            self.resolve_label_collisions(labeled)
+            changed = [item for item, variants in zip(labeled, before) if item['label_variants'] != variants]
+            self.store.update_labels(job_id, changed)
+            if changed:
+                print(f"🏷️  Job {job_id}: relabeled {len(changed)} colliding label(s)")
+        except Exception as e:
+            # Labels stay as generated; the titles themselves are done
+            print(f"   ⚠️  Job {job_id}: label collision pass failed: {e}")
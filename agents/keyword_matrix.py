@@ -0,0 +1,152 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+
+def sparse_product(q_rows: List[int], q_cols: List[int], postings: List[Tuple[np.ndarray, np.ndarray]],
+                   n_titles: int, n_columns: int) -> np.ndarray:
+    """Dense (n_titles x n_columns) result of the sparse product Q @ T
+
+    Q (titles x terms) is given in coordinate form, one (q_rows[i], q_cols[i])
+    entry per term occurrence, and T (terms x columns) as one (column ids,
+    weights) posting per term, indexed by q_cols.
+    """
+    scores = np.zeros((n_titles, n_columns), dtype=np.int64)
+    if not q_rows:
+        return scores
+
+    # T in CSR form
+    lengths = np.array([len(cols) for cols, _ in postings], dtype=np.int64)
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    t_cols = np.concatenate([cols for cols, _ in postings]) if indptr[-1] else np.zeros(0, dtype=np.int64)
+    t_vals = np.concatenate([vals for _, vals in postings]) if indptr[-1] else np.zeros(0, dtype=np.int64)
+
+    # Expand each Q entry over its term's T row
+    q_rows = np.array(q_rows, dtype=np.int64)
+    q_cols = np.array(q_cols, dtype=np.int64)
+    repeats = lengths[q_cols]
+    if repeats.sum() == 0:
+        return scores
+
+    out_rows = np.repeat(q_rows, repeats)
+    starts = np.repeat(indptr[q_cols], repeats)
+    offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    positions = starts + offsets
+
+    flat = out_rows * n_columns + t_cols[positions]
+    scores += np.bincount(flat, weights=t_vals[positions],
+                          minlength=scores.size).astype(np.int64).reshape(scores.shape)
+    return scores
+
+
+class KeywordScoringMatrix:
+    """Sparse term-by-category scoring matrix for enhanced keyword matching.
+
+    Reproduces ImprovedCategoryClassifier's keyword score, where a search
+    term t contributes to category c:
+
+        2 * len(t)                  if t is a substring of the category name
+        + sum(len(k) for keyword k of c if t in k or k in t)
+
+    Substring relations against category names and keywords are indexed once
+    at build time, each distinct term's sparse row is computed once and
+    memoized, and a batch of titles is scored with a single sparse
+    (titles x terms) @ (terms x categories) product.
+    """
+
+    MAX_CACHED_TERMS = 200000
+    # Titles scored per dense result block, bounding memory for huge batches
+    BATCH_CHUNK_SIZE = 2048
+
+    def __init__(self, category_keywords: Dict[str, List[str]]):
+        """category_keywords maps each normalized categoria to its keyword list"""
+        self.categories = list(category_keywords.keys())
+        self.n_categories = len(self.categories)
+
+        # substring (within one whitespace-free token) of a categoria -> category ids
+        self._category_substrings: Dict[str, set] = {}
+        # substring of a keyword -> keyword texts containing it
+        self._keyword_substrings: Dict[str, set] = {}
+        # keyword text -> category ids that list it
+        self._keyword_categories: Dict[str, List[int]] = {}
+
+        self._term_rows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self._build(category_keywords)
+
+    @staticmethod
+    def _substrings(text: str):
+        return {text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)}
+
+    def _build(self, category_keywords: Dict[str, List[str]]):
+        for cat_id, (categoria, keywords) in enumerate(category_keywords.items()):
+            for token in categoria.upper().split():
+                for substring in self._substrings(token):
+                    self._category_substrings.setdefault(substring, set()).add(cat_id)
+
+            for keyword in set(k.upper() for k in keywords):
+                categories = self._keyword_categories.setdefault(keyword, [])
+                if not categories:
+                    for substring in self._substrings(keyword):
+                        self._keyword_substrings.setdefault(substring, set()).add(keyword)
+                categories.append(cat_id)
+
+    def _term_row(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse (category ids, scores) row for one search term, memoized"""
+        row = self._term_rows.get(term)
+        if row is not None:
+            return row
+
+        scores: Dict[int, int] = {}
+
+        # t in categoria
+        if any(ch.isspace() for ch in term):
+            # Multi-word terms (e.g. palabras_clave_categoria) can span tokens
+            name_hits = [c for c, categoria in enumerate(self.categories) if term in categoria]
+        else:
+            name_hits = self._category_substrings.get(term, ())
+        for cat_id in name_hits:
+            scores[cat_id] = scores.get(cat_id, 0) + len(term) * 2
+
+        # t in keyword, or keyword in t (each matching keyword counted once)
+        if not term:
+            # The empty string is contained in every keyword
+            matched_keywords = set(self._keyword_categories)
+        else:
+            matched_keywords = set(self._keyword_substrings.get(term, ()))
+        matched_keywords.update(s for s in self._substrings(term) if s in self._keyword_categories)
+        for keyword in matched_keywords:
+            for cat_id in self._keyword_categories[keyword]:
+                scores[cat_id] = scores.get(cat_id, 0) + len(keyword)
+
+        row = (np.fromiter(scores.keys(), dtype=np.int64, count=len(scores)),
+               np.fromiter(scores.values(), dtype=np.int64, count=len(scores)))
+
+        if len(self._term_rows) >= self.MAX_CACHED_TERMS:
+            self._term_rows.clear()
+        self._term_rows[term] = row
+        return row
+
+    def score_batch(self, term_lists: List[List[str]]) -> np.ndarray:
+        """Score every category for every title: returns an (n_titles x n_categories) array"""
+        # Query matrix Q (titles x distinct terms) in coordinate form
+        term_ids: Dict[str, int] = {}
+        q_rows, q_cols = [], []
+        for title_id, terms in enumerate(term_lists):
+            for term in terms:
+                q_rows.append(title_id)
+                q_cols.append(term_ids.setdefault(term, len(term_ids)))
+
+        return sparse_product(q_rows, q_cols, [self._term_row(term) for term in term_ids],
+                              len(term_lists), self.n_categories)
+
+    def best_matches(self, term_lists: List[List[str]]) -> List[Tuple[int, int]]:
+        """(category id, score) of the top category per title; earliest category wins ties"""
+        if self.n_categories == 0:
+            return [(-1, 0) for _ in term_lists]
+
+        matches = []
+        for start in range(0, len(term_lists), self.BATCH_CHUNK_SIZE):
+            scores = self.score_batch(term_lists[start:start + self.BATCH_CHUNK_SIZE])
+            best = scores.argmax(axis=1)
+            matches.extend((int(cat_id), int(scores[i, cat_id])) for i, cat_id in enumerate(best))
+        return matches
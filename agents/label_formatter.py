@@ -1,10 +1,35 @@
-import re
-from typing import Dict
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from agents.abbreviation_engine import get_abbreviation_engine
+from agents.attribute_lexer import Token, get_attribute_lexer
+from agents.instrumentation import get_metrics
+from agents.title_scanner import COLORS, PRODUCT_TYPE_KEYWORDS, get_title_scanner
 
 class LabelFormatter:
-    def __init__(self, max_length: int = 36):
+    # Importance an abbreviated word keeps relative to the full word
+    ABBREVIATED_WEIGHT = 0.9
+    # Words a label should not end on
+    CONNECTORS = frozenset(['y', 'de', 'para', '-'])
+    MAX_CACHED_LABELS = 100000
+    # Shelf talker, store label and POS line
+    DEFAULT_WIDTHS = (24, 36, 50)
+    # Added to attribute words that tell colliding labels apart (about a product-type word)
+    DISTINGUISHING_BONUS = 1000
+    # Repacks per colliding title, widening its rivals to whoever already holds the candidate
+    MAX_RELABEL_ATTEMPTS = 3
+    
+    def __init__(self, max_length: int = 36, abbreviations_path: str = None):
         """Initialize with maximum character limit for store labels"""
         self.max_length = max_length
+        self.scanner = get_title_scanner()
+        self.lexer = get_attribute_lexer()
+        # Compiled once per abbreviation file and shared by every formatter
+        self.abbreviations = get_abbreviation_engine(abbreviations_path)
+        # (title, width) -> label
+        self._label_cache: Dict[Tuple[str, int], str] = {}
+        self.collisions_found = 0
+        self.collisions_resolved = 0
     
     def format_store_label(self, full_title: str) -> str:
         """
@@ -17,194 +42,305 @@ class LabelFormatter:
             Truncated label optimized for 36 characters
         """
         
-        if len(full_title) <= self.max_length:
-            return full_title
-        
-        # Strategy 1: Smart abbreviation
-        abbreviated = self._smart_abbreviate(full_title)
-        if len(abbreviated) <= self.max_length:
-            return abbreviated
+        return self.format_label_variants(full_title, [self.max_length])[self.max_length]
+    
+    def format_label_variants(self, full_title: str, widths: Iterable[int] = None) -> Dict[int, str]:
+        """
+        Labels for several widths at once (e.g. 24-char shelf talkers, 36-char
+        store labels and 50-char POS lines)
         
-        # Strategy 2: Keep most important words
-        important = self._keep_important_words(full_title)
-        if len(important) <= self.max_length:
-            return important
+        The title is tokenized, abbreviated and scored once, and a single
+        packing pass at the widest budget answers every narrower width.
         
-        # Strategy 3: Simple truncation with clean cut
-        return self._clean_truncate(full_title)
-    
-    def _smart_abbreviate(self, title: str) -> str:
-        """Apply smart abbreviations to common terms"""
-        
-        abbreviations = {
-            # Common construction materials
-            'Fibra de Vidrio': 'Fibra Vid',
-            'Poliestireno': 'Poliestir',
-            'Aislamiento': 'Aisl',
-            'Térmico': 'Term',
-            'Accesorios': 'Acc',
-            'Dimensiones': 'Dim',
-            'Construcción': 'Const',
-            'Material': 'Mat',
-            'Resistencia': 'Resist',
-            
-            # Colors (Spanish)
-            'Blanco': 'Blco',
-            'Negro': 'Neg',
-            'Azul': 'Az',
-            'Rojo': 'Rj',
-            'Verde': 'Vrd',
-            'Amarillo': 'Amar',
-            'Naranja': 'Nar',
-            'Gris': 'Gris',  # Already short
+        Args:
+            full_title: Complete ecommerce title
+            widths: Target widths; defaults to DEFAULT_WIDTHS
             
-            # Measurements
-            'Pulgadas': 'in',
-            'Centímetros': 'cm',
-            'Metros': 'm',
-            'Milímetros': 'mm',
-            'Piezas': 'pz',
-            'Unidades': 'un',
+        Returns:
+            Label per width
+        """
+        widths = list(widths) if widths is not None else list(self.DEFAULT_WIDTHS)
+        labels: Dict[int, str] = {}
+        missing = []
+        for width in widths:
+            if len(full_title) <= width:
+                labels[width] = full_title
+            elif (full_title, width) in self._label_cache:
+                labels[width] = self._label_cache[(full_title, width)]
+            else:
+                missing.append(width)
+        
+        if missing:
+            # Strategy 1: Smart abbreviation
+            abbreviated = self._smart_abbreviate(full_title)
+            # Strategy 2: Keep most important words
+            too_long = [width for width in missing if len(abbreviated) > width]
+            packed = self._pack_words(self._word_options(full_title), too_long) if too_long else {}
             
-            # Common words
-            'Precio': 'P',
-            'Especial': 'Esp',
-            'Premium': 'Prem',
-            'Standard': 'Std',
-            'Professional': 'Prof'
-        }
-        
-        result = title
-        for full_word, abbrev in abbreviations.items():
-            result = re.sub(rf'\b{re.escape(full_word)}\b', abbrev, result, flags=re.IGNORECASE)
+            if len(self._label_cache) + len(missing) > self.MAX_CACHED_LABELS:
+                self._label_cache.clear()
+            for width in missing:
+                if len(abbreviated) <= width:
+                    label = abbreviated
+                else:
+                    # Strategy 3: Simple truncation with clean cut (a single word longer than the label)
+                    label = packed[width] or self._clean_truncate(full_title, width)
+                labels[width] = self._label_cache[(full_title, width)] = label
+        
+        return labels
+    
+    def format_store_labels(self, titles: Iterable[str], disambiguate: bool = True) -> List[str]:
+        """Store labels for many titles, in order; repeated titles are formatted once
         
+        With disambiguate, different titles that end up with the same label are
+        relabeled so they can be told apart (see disambiguate_labels).
+        """
+        titles = list(titles)
+        labels: Dict[str, str] = {}
+        result = []
+        for title in titles:
+            label = labels.get(title)
+            if label is None:
+                label = labels[title] = self.format_store_label(title)
+            result.append(label)
+        if disambiguate:
+            result = self.disambiguate_labels(titles, result)
         return result
     
+    def disambiguate_labels(self, titles: List[str], labels: List[str], width: int = None) -> List[str]:
+        """
+        Relabel different titles that collapsed to the same label
+        
+        Labels are indexed once (label -> titles holding it) for the whole
+        batch, with per-label word counts kept up to date as titles move, so
+        the cost grows linearly with the size of a colliding group. For every title in a colliding group, the attribute words
+        (dimension, color, quantity) that its rivals do not all share get an
+        importance bonus (any differing word, when no attribute differs) and
+        the title is packed again. A new label is only taken if no other title
+        in the batch holds it, so resolving one collision never creates
+        another. When the candidate is already held, its holders join the
+        rivals and the title is packed again, up to MAX_RELABEL_ATTEMPTS
+        times; otherwise the title keeps its label.
+        
+        Args:
+            titles: Full titles, in batch order
+            labels: Their labels at `width`, same order
+            width: Label width; defaults to max_length
+            
+        Returns:
+            Labels in the same order, with collisions resolved where the titles allow it
+        """
+        width = width or self.max_length
+        label_of: Dict[str, str] = {}
+        holders: Dict[str, Set[str]] = {}
+        for title, label in zip(titles, labels):
+            if title not in label_of:
+                label_of[title] = label
+                holders.setdefault(label, set()).add(title)
+        
+        colliding = {label: sorted(group) for label, group in holders.items() if len(group) > 1}
+        words: Dict[str, Set[str]] = {}
+        # label -> how many of its current holders contain each word
+        word_counts: Dict[str, Counter] = {}
+        
+        def word_set(title: str) -> Set[str]:
+            if title not in words:
+                words[title] = {word.lower() for word in title.split()}
+            return words[title]
+        
+        def counts_of(label: str) -> Counter:
+            if label not in word_counts:
+                word_counts[label] = Counter(word for holder in holders[label] for word in word_set(holder))
+            return word_counts[label]
+        
+        for label, group in colliding.items():
+            for title in group:
+                if len(holders[label]) < 2:
+                    break
+                # Rivals are every other holder of these labels; a word differs
+                # when fewer rivals contain it than there are rivals
+                rival_labels = {label}
+                for _ in range(self.MAX_RELABEL_ATTEMPTS):
+                    rival_count = sum(len(holders[rival]) for rival in rival_labels) - 1
+                    differing = {word for word in word_set(title)
+                                 if sum(counts_of(rival)[word] for rival in rival_labels) - 1 < rival_count}
+                    attributes = {word for word in differing if self._is_attribute_word(word)}
+                    if len(title) <= width:
+                        candidate = title
+                    else:
+                        options = self._word_options(title, distinguishing=attributes or differing)
+                        candidate = self._pack_words(options, [width])[width]
+                    taken = holders.get(candidate)
+                    if not candidate or candidate == label:
+                        break
+                    if not taken:
+                        holders[label].discard(title)
+                        counts_of(label).subtract(word_set(title))
+                        holders[candidate] = {title}
+                        word_counts[candidate] = Counter(word_set(title))
+                        label_of[title] = candidate
+                        break
+                    rival_labels.add(candidate)
+        
+        found = sum(len(group) for group in colliding.values())
+        unresolved = sum(1 for group in colliding.values() for title in group if len(holders[label_of[title]]) > 1)
+        self.collisions_found += found
+        self.collisions_resolved += found - unresolved
+        for outcome, count in (('resolved', found - unresolved), ('unresolved', unresolved)):
+            if count:
+                get_metrics().inc('label_collisions_total', count, labels={'outcome': outcome})
+        
+        return [label_of[title] for title in titles]
+    
+    @staticmethod
+    def _is_attribute_word(word: str) -> bool:
+        """Dimensions, quantities, sizes and colors"""
+        return any(ch.isdigit() for ch in word) or word.upper() in COLORS
+    
+    def get_label_stats(self) -> Dict:
+        return {
+            'label_collisions_found': self.collisions_found,
+            'label_collisions_resolved': self.collisions_resolved,
+            'labels_cached': len(self._label_cache)
+        }
+    
+    def _smart_abbreviate(self, title: str) -> str:
+        """Apply smart abbreviations to common terms (data/label_abbreviations.csv)"""
+        return self.abbreviations.abbreviate(title)
+    
     def _keep_important_words(self, title: str) -> str:
-        """Keep only the most important words for product identification"""
+        """Keep the most important words for product identification that fit in max_length
         
-        words = title.split()
+        Every word is kept, abbreviated or dropped so that the total importance
+        is as high as possible within the character budget (a 0/1 knapsack with
+        one choice per word, solved exactly by dynamic programming), and the
+        kept words stay in title order.
+        """
+        return self._pack_words(self._word_options(title), [self.max_length])[self.max_length]
+    
+    def _word_options(self, title: str, distinguishing: Set[str] = frozenset()) -> List[List[Tuple[str, int]]]:
+        """(text, importance) choices per word: the word itself and, if shorter, its abbreviation
         
-        # Analyze what type of product this is to prioritize correctly
+        Words covered by one lexer token ('30 x 30 cm', '10 PZ') form a single
+        choice, so an attribute is kept or dropped whole.
+        """
+        words = title.split()
         product_type = self._identify_product_type(title)
+        tokens = self.lexer.tokenize(title)
         
-        # Create priority scoring system
-        word_scores = {}
+        # (words, lexer tokens) per unit, merging words that share a token
+        units: List[Tuple[List[str], List[Token]]] = []
+        positions = []
+        end = 0
         for i, word in enumerate(words):
-            score = self._calculate_word_importance(word, product_type, i, len(words))
-            word_scores[word] = score
-        
-        # Debug: show scoring for troubleshooting
-        if "Grapas" in title:
-            print(f"   DEBUG - Product type: {product_type}")
-            print(f"   DEBUG - Word scores: {word_scores}")
-        
-        # Sort words by importance score (descending)
-        sorted_words = sorted(word_scores.items(), key=lambda x: x[1], reverse=True)
-        
-        # Keep adding words until we hit character limit
-        selected_words = []
-        current_length = 0
-        
-        for word, score in sorted_words:
-            word_length = len(word)
-            # Add 1 for space (except first word)
-            total_length = word_length + (1 if selected_words else 0)
-            
-            if current_length + total_length <= self.max_length:
-                selected_words.append(word)
-                current_length += total_length
-            elif score >= 800:  # Force include critical words even if tight
-                # Try abbreviating less important words we already selected
+            start = title.index(word, end)
+            end = start + len(word)
+            covering = tokens.overlapping(start, end)
+            if covering and units and any(token in units[-1][1] for token in covering):
+                units[-1][0].append(word)
+                units[-1][1].extend(token for token in covering if token not in units[-1][1])
                 continue
-        
-        if "Grapas" in title:
-            print(f"   DEBUG - Selected words: {selected_words}")
-        
-        # Rebuild in logical order (not score order)
-        result_words = []
-        for word in words:
-            if word in selected_words:
-                result_words.append(word)
-        
-        # Clean up result - remove trailing connectors
-        if result_words and result_words[-1].lower() in ['y', 'de', 'para', '-']:
-            result_words.pop()
-        
-        result = ' '.join(result_words)
-        
-        # If we're missing critical info for accessories, force a better solution
-        if product_type == 'accessory' and "Grapas" in title:
-            if not any(re.search(r'\d+pz', word) for word in result_words):
-                # We're missing the quantity! Create a forced solution
-                result = self._force_accessory_format(title)
-        
-        return result
+            units.append(([word], covering))
+            positions.append(i)
+        
+        options = []
+        seen = set()
+        for (unit_words, covering), i in zip(units, positions):
+            text = ' '.join(unit_words)
+            if not covering:
+                if text.lower() in seen:
+                    # A repeated word adds nothing to the label (repeated numbers inside an attribute do)
+                    options.append([])
+                    continue
+                seen.add(text.lower())
+            score = max(self._calculate_word_importance(word, product_type, i + j, len(words), covering)
+                        for j, word in enumerate(unit_words))
+            if any(word.lower() in distinguishing for word in unit_words):
+                score += self.DISTINGUISHING_BONUS
+            choices = [(text, score)]
+            abbreviated = self.abbreviations.abbreviate(text)
+            if len(abbreviated) < len(text):
+                choices.append((abbreviated, round(score * self.ABBREVIATED_WEIGHT)))
+            options.append(choices)
+        return options
     
-    def _force_accessory_format(self, title: str) -> str:
-        """Force a good format for accessories when automatic selection fails"""
-        words = title.split()
+    def _pack_words(self, options: List[List[Tuple[str, int]]], widths: List[int]) -> Dict[int, str]:
+        """Best in-order selection of word choices whose joined length fits in each width
         
-        # Find the critical components
-        product_type = None
-        quantity = None
-        color = None
-        
-        for word in words:
-            if any(key in word.lower() for key in ['grapas', 'accesorio', 'acc']):
-                product_type = word
-            elif re.search(r'\d+pz', word):
-                quantity = word
-            elif word.lower() in ['blanco', 'negro', 'azul', 'rojo', 'verde', 'gris', 'amarillo']:
-                color = word
-        
-        # Build the optimal short format
-        parts = []
-        if product_type:
-            parts.append(product_type)
-        if quantity:
-            parts.append(quantity)
-        if color:
-            parts.append(color)
-        
-        result = ' '.join(parts)
-        
-        # If still too long, abbreviate
-        if len(result) > self.max_length:
-            if product_type and 'Accesorios' in product_type:
-                result = result.replace('Accesorios', 'Acc')
-            if len(result) > self.max_length:
-                # Remove 'para Aislante' if present
-                result = result.replace(' para Aislante', '')
-        
-        return result if len(result) <= self.max_length else result[:self.max_length-3] + "..."
+        One pass at the widest budget serves every width: the frontier keeps the
+        best selection for each number of characters used, so the answer for a
+        narrower width is the best frontier entry within its budget.
+        """
+        # Each kept word pays for one separating space, so the budget gets one spare
+        budget = max(widths) + 1
+        # Importance first, then characters kept as the tie-break, folded into one integer
+        scale = budget + 1
+        connectors = self.CONNECTORS
+        # (characters used, ends in a connector, value, (text, previous) chain), keeping only
+        # selections that beat every cheaper one ending alike (nothing else is worth extending)
+        frontier: List[Tuple[int, bool, int, Optional[tuple]]] = [(0, False, 0, None)]
+        for choices in options:
+            if not choices:
+                continue
+            steps = [(text, score * scale + len(text), len(text) + 1, text.lower() in connectors)
+                     for text, score in choices]
+            # Dropping the word keeps every selection as it is
+            current = {(used, dangling): (value, chain) for used, dangling, value, chain in frontier}
+            for used, _, value, chain in frontier:
+                for text, gain, step, dangling in steps:
+                    cost = used + step
+                    if cost > budget:
+                        continue
+                    incumbent = current.get((cost, dangling))
+                    if incumbent is None or value + gain > incumbent[0]:
+                        current[(cost, dangling)] = (value + gain, (text, chain))
+            frontier = []
+            best_by_ending = {False: -1, True: -1}
+            for used, dangling in sorted(current):
+                value, chain = current[(used, dangling)]
+                if value > best_by_ending[dangling]:
+                    best_by_ending[dangling] = value
+                    frontier.append((used, dangling, value, chain))
+        
+        labels = {}
+        for width in widths:
+            # A label must not end on a connector ('Grapas de')
+            chain = max((state for state in frontier if not state[1] and state[0] <= width + 1),
+                        key=lambda state: state[2])[3]
+            selected = []
+            while chain is not None:
+                selected.append(chain[0])
+                chain = chain[1]
+            selected.reverse()
+            labels[width] = ' '.join(selected)
+        return labels
     
     def _identify_product_type(self, title: str) -> str:
         """Identify what type of product this is"""
-        title_lower = title.lower()
-        
-        if any(word in title_lower for word in ['grapas', 'accesorios', 'acc']):
-            return 'accessory'
-        elif any(word in title_lower for word in ['fibra', 'aislam', 'aisl']):
-            return 'insulation'
-        elif any(word in title_lower for word in ['caseton', 'poliestir']):
-            return 'panel'
-        elif any(word in title_lower for word in ['foamular', 'foam']):
-            return 'foam'
-        else:
-            return 'generic'
+        found = self.scanner.scan(title).terms('product_type')
+        
+        for product_type, keywords in PRODUCT_TYPE_KEYWORDS.items():
+            if any(word in found for word in keywords):
+                return product_type
+        return 'generic'
     
-    def _calculate_word_importance(self, word: str, product_type: str, position: int, total_words: int) -> int:
-        """Calculate importance score for a word (higher = more important)"""
+    def _calculate_word_importance(self, word: str, product_type: str, position: int, total_words: int,
+                                   tokens: List[Token] = ()) -> int:
+        """Calculate importance score for a word (higher = more important)
+        
+        tokens are the lexer tokens the word is part of, so every word of
+        '1/4 X 1 1/2' or '10 PZ' counts as the dimension or quantity it belongs to.
+        """
         
         score = 0
         word_lower = word.lower()
+        kinds = {token.kind for token in tokens}
         
         # CRITICAL: Product identification words (these MUST be included)
         if product_type == 'accessory':
             if any(key in word_lower for key in ['grapas', 'accesorio', 'acc']):
                 score += 1000  # Increased dramatically
-            if re.search(r'\d+pz', word):  # Quantity is CRITICAL for accessories
+            if 'quantity' in kinds:  # Quantity is CRITICAL for accessories
                 score += 950   # Very high priority
             # For accessories, color is also critical to distinguish products
             colors = ['blanco', 'negro', 'azul', 'rojo', 'verde', 'gris', 'amarillo', 'blco', 'neg', 'az']
@@ -214,7 +350,7 @@ class LabelFormatter:
         elif product_type == 'insulation':
             if any(key in word_lower for key in ['fibra', 'aislam', 'aisl']):
                 score += 1000
-            if re.search(r'r-\d+', word_lower):  # R-value critical for insulation
+            if 'r_value' in kinds:  # R-value critical for insulation
                 score += 950
         
         elif product_type == 'panel':
@@ -222,15 +358,15 @@ class LabelFormatter:
                 score += 1000
         
         # VERY HIGH PRIORITY: Specifications that identify the exact product
-        if re.search(r'\d+["\']?x\d+x\d+', word):  # 3D dimensions (highest)
+        if any(token.kind == 'dimension' and token.parts >= 3 for token in tokens):  # 3D dimensions (highest)
             score += 920
-        elif re.search(r'\d+["\']?x\d+', word):  # 2D dimensions
+        elif 'dimension' in kinds:  # 2D dimensions
             score += 900
         
-        if re.search(r'\d+pz', word) and product_type != 'accessory':  # Piece count (already handled above for accessories)
+        if 'quantity' in kinds and product_type != 'accessory':  # Piece count (already handled above for accessories)
             score += 880
         
-        if re.search(r'r-\d+', word_lower) and product_type != 'insulation':  # R-values (already handled above for insulation)
+        if 'r_value' in kinds and product_type != 'insulation':  # R-values (already handled above for insulation)
             score += 850
         
         # HIGH PRIORITY: Brand names (usually capitalized)
@@ -268,21 +404,22 @@ class LabelFormatter:
         
         return score
     
-    def _clean_truncate(self, title: str) -> str:
+    def _clean_truncate(self, title: str, width: int = None) -> str:
         """Truncate at word boundary, not mid-word"""
+        width = width or self.max_length
         
-        if len(title) <= self.max_length:
+        if len(title) <= width:
             return title
         
         # Find last complete word that fits
-        truncated = title[:self.max_length]
+        truncated = title[:width]
         last_space = truncated.rfind(' ')
         
         if last_space > 0:
             return title[:last_space]
         else:
             # No spaces found, hard truncate
-            return title[:self.max_length-3] + "..."
+            return title[:width-3] + "..."
     
     def test_formatter(self):
         """Test the label formatter with various title lengths"""
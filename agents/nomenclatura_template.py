@@ -0,0 +1,312 @@
+import re
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from agents.attribute_lexer import get_attribute_lexer
+from agents.title_scanner import get_title_scanner
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+# Rule label (accent-free, lower case) -> attribute keys, first present wins.
+# Labels not listed here read the attribute of the same (snake_case) name.
+SLOT_ATTRIBUTES = {
+    'tipo': ('tipo',),
+    'dimensiones': ('dimensions', 'measure'),
+    'medidas': ('dimensions', 'measure'),
+    'medida': ('dimensions', 'measure'),
+    'tamano': ('dimensions', 'measure'),
+    'formato': ('dimensions', 'measure'),
+    'largo': ('measure', 'dimensions'),
+    'longitud': ('measure', 'dimensions'),
+    'altura': ('measure', 'dimensions'),
+    'espesor': ('measure',),
+    'cantidad': ('quantity',),
+    'cantidad de piezas': ('quantity',),
+    'presentacion': ('quantity', 'weight', 'volume'),
+    'peso': ('weight',),
+    'volumen': ('volume',),
+    'capacidad': ('volume', 'weight'),
+    'color': ('color',),
+    'material': ('material',),
+    'acabado': ('finish',),
+    'recubrimiento': ('finish',),
+    'voltaje': ('voltage',),
+    'watts': ('watts',),
+    'potencia': ('watts',),
+    'amperaje': ('amperage',),
+    'modelo': ('model', 'brand'),
+    'linea': ('model', 'brand'),
+    'serie': ('model', 'brand'),
+    'nombre': ('model', 'brand'),
+    'marca': ('brand',),
+}
+
+# Misspellings found in the nomenclatura sheet
+LABEL_FIXES = {'catacteristica': 'caracteristica', 'calibe': 'calibre'}
+
+MATERIALS = ['ACERO INOXIDABLE', 'ACERO', 'ALUMINIO', 'COBRE', 'BRONCE', 'LATON', 'PVC', 'CPVC', 'MADERA',
+             'VIDRIO', 'CERAMICA', 'PORCELANATO', 'CONCRETO', 'HIERRO', 'PLASTICO', 'NYLON', 'INOX']
+FINISHES = ['MATE', 'BRILLANTE', 'SATINADO', 'CROMADO', 'PULIDO', 'NIQUELADO', 'GALVANIZADO', 'RUSTICO']
+
+# Lexer token kind (or measure, for unit tokens) -> attribute
+TOKEN_ATTRIBUTES = {
+    'r_value': 'r_value', 'dimension': 'dimensions', 'quantity': 'quantity', 'gauge': 'calibre',
+    'weight': 'weight', 'volume': 'volume', 'voltage': 'voltage', 'watts': 'watts', 'amperage': 'amperage',
+    'length': 'measure',
+}
+_WORD_LISTS = [
+    ('material', re.compile(r'\b(' + '|'.join(MATERIALS) + r')\b', re.IGNORECASE)),
+    ('finish', re.compile(r'\b(' + '|'.join(FINISHES) + r')\b', re.IGNORECASE)),
+]
+
+def _has_letter(word: str) -> bool:
+    return any(ch.isalpha() for ch in word)
+
+
+# Kept lower case inside an assembled product type
+CONNECTORS = {'de', 'del', 'para', 'con', 'sin', 'y', 'en', 'a', 'la', 'el', 'por'}
+
+
+class Slot(NamedTuple):
+    """One '+'-separated part of a rule: every group is filled ('y/o'), each from its first present key ('/')"""
+    label: str
+    groups: Tuple[Tuple[str, ...], ...]
+    optional: bool = False
+
+
+class AssembledTitle(NamedTuple):
+    title: str
+    # Attribute slots filled / counted; the Tipo slot is always filled from leftover text, so it is in neither
+    filled: int
+    slots: int
+    # Measurements and numbers in the source title that no slot kept
+    dropped: int = 0
+
+    @property
+    def coverage(self) -> float:
+        return self.filled / self.slots if self.slots else 0.0
+
+
+def _label_keys(label: str) -> Tuple[str, ...]:
+    key = ' '.join(LABEL_FIXES.get(word, word) for word in _fold(label).lower().split())
+    if key in SLOT_ATTRIBUTES:
+        return SLOT_ATTRIBUTES[key]
+    return (re.sub(r'\W+', '_', key).strip('_'),)
+
+
+def compile_rule(rule: str) -> Tuple[Slot, ...]:
+    """Parse 'Tipo + Dimensiones y/o cantidad de piezas + Color (si aplica)' into slots"""
+    slots = []
+    for part in re.split(r'\s*\+\s*', rule or ''):
+        optional = bool(re.search(r'\(\s*si aplica\s*\)', part, re.IGNORECASE))
+        part = re.sub(r'\(.*?\)', '', part).strip()
+        if not part:
+            continue
+        groups = []
+        for conjunct in re.split(r'\s+y/o\s+', part, flags=re.IGNORECASE):
+            keys = []
+            for alternative in conjunct.split('/'):
+                for attribute in _label_keys(alternative):
+                    if attribute and attribute not in keys:
+                        keys.append(attribute)
+            groups.append(tuple(keys))
+        if _fold(part).lower() == 'tipo':
+            # R-values qualify the product type (Fibra de Vidrio R-13 ...)
+            groups.append(('r_value',))
+        slots.append(Slot(part, tuple(groups), optional))
+    if slots and not any(('tipo',) in slot.groups for slot in slots):
+        # Every title still names the product (e.g. 'Material + Especie/Tratamiento + Dimensiones')
+        slots.insert(0, Slot('Tipo', (('tipo',), ('r_value',))))
+    return tuple(slots)
+
+
+def _format_value(attribute: str, value: str) -> str:
+    value = re.sub(r'\s+', ' ', value.strip())
+    if attribute in ('dimensions', 'measure', 'quantity', 'weight', 'volume'):
+        value = re.sub(r'\s*([xX×])\s*', 'x', value)
+        # 25 kg -> 25kg, but 1/4 galón keeps its space
+        value = re.sub(r'(?<=\d)\s+(?=(?:[^\W\d]{1,3}|["\'])(?!\w))', '', value)
+        return value.lower().replace('m3', 'm³')
+    if attribute == 'r_value':
+        return 'R-' + re.sub(r'\D', '', value)
+    if attribute == 'calibre':
+        return 'Cal. ' + re.sub(r'\D', '', value)
+    if attribute in ('voltage', 'watts', 'amperage'):
+        return value.replace(' ', '').upper()
+    return value.title()
+
+
+def extract_attributes(title: str) -> Tuple[Dict[str, Tuple[str, Tuple[int, int]]], List[Tuple[int, int]]]:
+    """Deterministic attributes found in a title (each with its character span), plus the
+    spans of every measurement, which never belong in the product type"""
+    found: Dict[str, Tuple[str, Tuple[int, int]]] = {}
+    measurements: List[Tuple[int, int]] = []
+
+    def free(start: int, end: int) -> bool:
+        return all(end <= s or start >= e for s, e in measurements + [span for _, span in found.values()])
+
+    tokens = get_attribute_lexer().tokenize(title)
+    for token in tokens:
+        attribute = TOKEN_ATTRIBUTES.get(token.measure if token.kind == 'unit' else token.kind)
+        if attribute is None:
+            continue
+        if attribute not in found:
+            found[attribute] = (_format_value(attribute, token.text), (token.start, token.end))
+        else:
+            measurements.append((token.start, token.end))
+    measurements.extend(span for _, span in found.values())
+
+    for attribute, pattern in _WORD_LISTS:
+        for match in pattern.finditer(title):
+            if free(match.start(), match.end()):
+                found[attribute] = (_format_value(attribute, match.group(0)), (match.start(), match.end()))
+                break
+
+    color = next((token for token in tokens.find_all('color') if free(token.start, token.end)), None)
+    if color:
+        found['color'] = (color.text.title(), (color.start, color.end))
+    for hit in get_title_scanner().scan(title):
+        if hit.kind == 'brand' and 'brand' not in found and hit.whole_word and free(hit.start, hit.end):
+            found['brand'] = (hit.term.title(), (hit.start, hit.end))
+    return found, measurements
+
+
+class NomenclaturaTemplates:
+    """Compiles nomenclatura_sugerida rules once and assembles titles from them without an LLM.
+
+    Attributes come from the product data (producto_tipo, dimensions,
+    quantity, color, brand, r_value, ...) and, where missing, from a
+    deterministic scan of the title. The product type defaults to whatever
+    is left of the title once those attributes (and a trailing taxonomy
+    path) are removed.
+    """
+
+    MAX_TYPE_WORDS = 6
+
+    def __init__(self):
+        self._compiled: Dict[str, Tuple[Slot, ...]] = {}
+        self._lock = threading.Lock()
+
+    def compile(self, rule: str) -> Tuple[Slot, ...]:
+        slots = self._compiled.get(rule)
+        if slots is None:
+            slots = compile_rule(rule)
+            with self._lock:
+                self._compiled[rule] = slots
+        return slots
+
+    def attributes(self, product_data: Dict) -> Tuple[Dict[str, Tuple[str, Optional[Tuple[int, int]]]],
+                                                      List[Tuple[int, int]]]:
+        """Attribute values (with their title span, None when given in product_data) for slot filling"""
+        found, measurements = extract_attributes(self._title(product_data))
+        for attribute, fields in (('dimensions', ('dimensions',)), ('quantity', ('quantity',)),
+                                  ('color', ('color',)), ('r_value', ('r_value',)),
+                                  ('brand', ('verified_brand', 'brand', 'potential_brand')),
+                                  ('model', ('model',)), ('material', ('material',))):
+            for field in fields:
+                value = product_data.get(field)
+                if isinstance(value, str) and value.strip():
+                    found[attribute] = (_format_value(attribute, value), found.get(attribute, (None, None))[1])
+                    break
+        return found, measurements
+
+    @staticmethod
+    def _title(product_data: Dict) -> str:
+        return product_data.get('description') or product_data.get('original_title') or ''
+
+    def _remaining_words(self, product_data: Dict, spans: List[Tuple[int, int]]) -> List[str]:
+        """Words of the title left once the given spans are blanked out"""
+        chars = list(self._title(product_data))
+        for start, end in spans:
+            chars[start:end] = ' ' * (end - start)
+        return ''.join(chars).split()
+
+    def _product_type(self, product_data: Dict, remaining: List[str], category_info: Optional[Dict]) -> str:
+        product_type = product_data.get('verified_product_type') or product_data.get('producto_tipo')
+        if isinstance(product_type, str) and product_type.strip():
+            product_type = product_type.strip()
+            return product_type[:1].upper() + product_type[1:]
+
+        # Otherwise: what is left of the title once the slotted attributes are taken out
+        words = [w for w in remaining if _has_letter(w) and (len(w) > 1 or w.lower() in CONNECTORS)]
+
+        # Messy exports glue the taxonomy path (... FAMILIA CATEGORIA) on at the end
+        if category_info:
+            for field in ('categoria', 'familia', 'departamento'):
+                path = _fold(str(category_info.get(field) or '')).upper().split()
+                tail = [_fold(word).upper() for word in words[-len(path):]] if path else []
+                if path and tail == path and len(words) > len(path):
+                    del words[-len(path):]
+        while words and words[-1].lower() in CONNECTORS:
+            words.pop()
+
+        words = words[:self.MAX_TYPE_WORDS]
+        if not words:
+            return str((category_info or {}).get('categoria') or '').title()
+        return ' '.join(
+            word.lower() if i and word.lower() in CONNECTORS
+            else word if any(c.isdigit() for c in word) else word.title()
+            for i, word in enumerate(words)
+        )
+
+    def assemble(self, rule: str, product_data: Dict, category_info: Dict = None) -> AssembledTitle:
+        """Fill the rule's slots in order; empty slots are skipped (optional ones are not counted)"""
+        slots = self.compile(rule)
+        found, measurements = self.attributes(product_data)
+
+        # Pick a value for every slot first, so the product type is whatever they leave over
+        chosen: List[List[str]] = []
+        used = set()
+        for slot in slots:
+            keys = []
+            for group in slot.groups:
+                for key in group:
+                    if key not in used and (key == 'tipo' or key in found):
+                        used.add(key)
+                        keys.append(key)
+                        break
+            chosen.append(keys)
+
+        used_spans = [found[key][1] for key in used if key != 'tipo' and found[key][1]]
+        remaining = self._remaining_words(product_data, measurements + used_spans)
+        product_type = self._product_type(product_data, remaining, category_info)
+
+        # Nothing measurable may silently disappear: unslotted measurements and bare numbers
+        dropped = len(set(measurements) - set(used_spans))
+        dropped += sum(1 for word in remaining if not _has_letter(word) and any(c.isdigit() for c in word))
+
+        parts: List[str] = []
+        filled = 0
+        counted = 0
+        for slot, keys in zip(slots, chosen):
+            values = [product_type if key == 'tipo' else found[key][0] for key in keys]
+            values = [value for value in values if value]
+            parts.extend(values)
+            if ('tipo',) in slot.groups:
+                continue
+            if values:
+                filled += 1
+            if values or not slot.optional:
+                counted += 1
+
+        title = re.sub(r'\s+', ' ', ' '.join(parts)).strip()
+        return AssembledTitle(title, filled, counted, dropped)
+
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def get_nomenclatura_templates() -> NomenclaturaTemplates:
+    """Process-wide compiled rule cache"""
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = NomenclaturaTemplates()
+    return _templates
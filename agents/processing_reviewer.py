@@ -6,6 +6,9 @@ import pandas as pd
 class ProcessingReviewer:
     """Review and validate processing results before download"""
     
+    # Failed items kept in full; the rest are only counted
+    MAX_QUALITY_ISSUES = 10
+    
     def __init__(self):
         self.quality_thresholds = {
             'min_title_length': 5,
@@ -24,6 +27,7 @@ class ProcessingReviewer:
             'web_search_used': 0,
             'web_search_failed': 0,
             'quality_issues': [],
+            'quality_issue_count': 0,
             'recommendations': [],
             'detailed_stats': {}
         }
@@ -53,12 +57,14 @@ class ProcessingReviewer:
                 
             else:
                 analysis['failed'] += 1
-                analysis['quality_issues'].append({
-                    'item': i,
-                    'title': result.get('input_title', 'Unknown'),
-                    'issue': 'Processing failed',
-                    'errors': result.get('errors', [])
-                })
+                analysis['quality_issue_count'] += 1
+                if len(analysis['quality_issues']) < self.MAX_QUALITY_ISSUES:
+                    analysis['quality_issues'].append({
+                        'item': i,
+                        'title': result.get('input_title', 'Unknown'),
+                        'issue': 'Processing failed',
+                        'errors': result.get('errors', [])
+                    })
         
         # Calculate averages
         if quality_scores:
@@ -188,11 +194,12 @@ class ProcessingReviewer:
             report += f"""
 ⚠️  QUALITY ISSUES FOUND:
 """
-            for issue in analysis['quality_issues'][:10]:  # Show first 10 issues
+            for issue in analysis['quality_issues']:  # Only the first MAX_QUALITY_ISSUES are kept
                 report += f"• Item {issue['item']}: {issue['title'][:40]}... - {issue['issue']}\n"
             
-            if len(analysis['quality_issues']) > 10:
-                report += f"... and {len(analysis['quality_issues']) - 10} more issues.\n"
+            more = analysis['quality_issue_count'] - len(analysis['quality_issues'])
+            if more > 0:
+                report += f"... and {more} more issues.\n"
         
         report += f"""
 {'=' * 50}
@@ -239,6 +246,10 @@ class ProcessingReviewer:
                 'errors': '; '.join(result.get('errors', []))
             }
             
+            # One column per extra label width, e.g. store_label_24char for shelf talkers
+            for width, label in sorted(result.get('label_variants', {}).items()):
+                row[f'store_label_{width}char'] = label
+            
             export_data.append(row)
         
         df = pd.DataFrame(export_data)
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+def normalize_cache_text(value) -> str:
+    """Normalize free text so trivially different titles share a cache entry"""
+    if value is None:
+        return ''
+    return re.sub(r'\s+', ' ', str(value)).strip().upper()
+
+
+class ResearchCache:
+    """On-disk cache for parsed LLM research responses.
+
+    Entries live in a local SQLite file and are keyed by the normalized title,
+    brand, product type, prompt version and model name. Expired entries
+    (older than ttl_seconds) count as misses, and once max_entries is exceeded
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = "data/research_cache.sqlite", ttl_seconds: float = 30 * 24 * 3600,
+                 max_entries: int = 100000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory and path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS research_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_research_cache_access ON research_cache (last_access)"
+            )
+
+    @staticmethod
+    def make_key(title: str, brand: str = '', product_type: str = '', prompt_version: str = '',
+                 model: str = '') -> str:
+        """Build a stable cache key from normalized inputs"""
+        parts = [normalize_cache_text(title), normalize_cache_text(brand), normalize_cache_text(product_type),
+                 str(prompt_version), str(model)]
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM research_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM research_cache WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE research_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return json.loads(value)
+
+    def put(self, key: str, value: Dict):
+        """Store a JSON-serializable value and evict LRU entries over the size bound"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO research_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+
+            if self.max_entries is not None:
+                count = self._conn.execute("SELECT COUNT(*) FROM research_cache").fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM research_cache WHERE key IN "
+                        "(SELECT key FROM research_cache ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM research_cache").fetchone()[0]
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM research_cache")
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters for reporting"""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups > 0 else 0
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': f"{hit_rate:.1f}%",
+            'cache_expired': self.expired,
+            'cache_evictions': self.evictions
+        }
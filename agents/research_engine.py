@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        """rate = tokens added per second, capacity = maximum burst size"""
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until tokens are available, returning the time spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.total_wait += waited
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class ResearchEngine:
+    """Bounded-parallelism executor for blocking LLM research calls.
+
+    A shared thread pool caps the number of calls in flight and an optional
+    token bucket paces request starts. map() always returns results in input
+    order; a failing item is resolved through its own fallback.
+    """
+
+    def __init__(self, max_in_flight: int = 8, requests_per_second: Optional[float] = None):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_in_flight,
+                        thread_name_prefix='research'
+                    )
+        return self._executor
+
+    def throttle(self) -> float:
+        """Wait for the rate limiter (no-op when unlimited)"""
+        if self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.acquire()
+
+    def map(self, func: Callable, items: List, fallback: Callable = None) -> List:
+        """Run func over items concurrently, preserving input order"""
+        if not items:
+            return []
+
+        if self.max_in_flight == 1 or len(items) == 1:
+            futures = None
+        else:
+            executor = self._get_executor()
+            futures = [executor.submit(func, item) for item in items]
+
+        results = []
+        for i, item in enumerate(items):
+            try:
+                results.append(futures[i].result() if futures else func(item))
+            except Exception as e:
+                if fallback is None:
+                    raise
+                results.append(fallback(item, e))
+        return results
+
+    def imap(self, func: Callable, items: Iterable, fallback: Callable = None) -> Iterator:
+        """Lazily run func over items, yielding results in input order as they finish
+        
+        At most 2 * max_in_flight items are pulled from the iterable ahead of the
+        consumer, so memory stays flat no matter how many items there are.
+        """
+        executor = self._get_executor()
+        window = deque()
+
+        def resolve(item, future):
+            try:
+                return future.result()
+            except Exception as e:
+                if fallback is None:
+                    raise
+                return fallback(item, e)
+
+        for item in items:
+            window.append((item, executor.submit(func, item)))
+            if len(window) >= self.max_in_flight * 2:
+                yield resolve(*window.popleft())
+
+        while window:
+            yield resolve(*window.popleft())
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
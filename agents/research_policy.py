@@ -0,0 +1,97 @@
+import threading
+from typing import Dict, Optional
+
+from agents.instrumentation import get_metrics
+
+
+# Product fields the title generator can use without research
+DESCRIPTIVE_FIELDS = ('producto_tipo', 'brand', 'especificaciones', 'specifications', 'color',
+                      'size', 'dimensions', 'model', 'material')
+
+
+class ResearchPolicy:
+    """Decides per item whether LLM research is worth a call.
+
+    Research is skipped when the category match is deterministic enough:
+    its match_type has a bypass threshold and the confidence reaches it, or
+    the confidence reaches min_confidence and the parser already extracted
+    at least min_fields descriptive fields. Everything else is researched.
+    Policies are disabled unless enabled=True is passed (app.py opts in), and
+    a disabled policy researches every item, as before.
+    """
+
+    # match_type -> minimum confidence to skip research
+    DEFAULT_BYPASS_THRESHOLDS = {
+        'exact_structured': 0.95,
+        'exact': 0.95,
+        'tile_pattern_match': 0.9,
+        'construction_aware': 0.9,
+    }
+
+    def __init__(self, enabled: bool = False, bypass_thresholds: Dict[str, float] = None,
+                 min_confidence: float = 0.8, min_fields: int = 3):
+        self.enabled = enabled
+        self.bypass_thresholds = dict(self.DEFAULT_BYPASS_THRESHOLDS if bypass_thresholds is None
+                                      else bypass_thresholds)
+        self.min_confidence = min_confidence
+        self.min_fields = min_fields
+
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.researched = 0
+        self.bypassed = 0
+        self.bypassed_by_match_type: Dict[str, int] = {}
+
+    @staticmethod
+    def count_fields(product_data: Dict) -> int:
+        """Number of non-empty descriptive fields in the product data"""
+        return sum(1 for field in DESCRIPTIVE_FIELDS if str(product_data.get(field) or '').strip())
+
+    def bypass_reason(self, product_data: Dict, category_info: Optional[Dict]) -> Optional[str]:
+        """Why research can be skipped for this item, or None if it is needed"""
+        if not self.enabled or not category_info:
+            return None
+
+        match_type = category_info.get('match_type', '')
+        try:
+            confidence = float(category_info.get('confidence', 0.0))
+        except (TypeError, ValueError):
+            return None
+
+        threshold = self.bypass_thresholds.get(match_type)
+        if threshold is not None and confidence >= threshold:
+            return f'{match_type}>={threshold}'
+        if confidence >= self.min_confidence and self.count_fields(product_data) >= self.min_fields:
+            return f'fields>={self.min_fields}'
+        return None
+
+    def needs_research(self, product_data: Dict, category_info: Optional[Dict]) -> bool:
+        """Decide and count; True means the item should go to the LLM"""
+        reason = self.bypass_reason(product_data, category_info)
+        match_type = (category_info or {}).get('match_type', 'none')
+
+        with self._lock:
+            self.evaluated += 1
+            if reason is None:
+                self.researched += 1
+            else:
+                self.bypassed += 1
+                self.bypassed_by_match_type[match_type] = self.bypassed_by_match_type.get(match_type, 0) + 1
+
+        get_metrics().inc('llm_research_decisions_total', labels={
+            'decision': 'research' if reason is None else 'bypass',
+            'match_type': match_type
+        })
+        return reason is None
+
+    def get_stats(self) -> Dict:
+        """Decision counters; every bypass is one research call saved"""
+        with self._lock:
+            return {
+                'research_policy_enabled': self.enabled,
+                'research_evaluated': self.evaluated,
+                'research_required': self.researched,
+                'research_calls_saved': self.bypassed,
+                'research_saved_rate': f"{(self.bypassed / self.evaluated * 100) if self.evaluated else 0:.1f}%",
+                'research_saved_by_match_type': dict(self.bypassed_by_match_type)
+            }
@@ -0,0 +1,196 @@
+import json
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from agents.instrumentation import get_metrics
+
+
+class Field(NamedTuple):
+    """One declared property of an LLM JSON response"""
+    type: type
+    required: bool = False
+    nullable: bool = False
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+
+_JSON_TYPES = {str: 'string', bool: 'boolean', float: 'number', int: 'integer', list: 'array'}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough completion-token count (~4 characters per token)"""
+    return max(1, len(text or '') // 4)
+
+
+def parse_json(text: str) -> Tuple[Any, Optional[str]]:
+    """Strict parse: the whole response must be JSON (an optional ``` fence is tolerated)"""
+    if not text:
+        return None, 'empty response'
+    cleaned = text.strip()
+    if cleaned.startswith('```'):
+        cleaned = cleaned.split('\n', 1)[1] if '\n' in cleaned else ''
+        if cleaned.rstrip().endswith('```'):
+            cleaned = cleaned.rstrip()[:-3]
+    try:
+        return json.loads(cleaned), None
+    except ValueError as e:
+        return None, f'invalid JSON: {e}'
+
+
+class ResponseSchema:
+    """Declared shape of a JSON response, with a strict validator.
+
+    validate() never guesses: wrong types, empty required strings and
+    out-of-range numbers are errors, and undeclared keys are dropped. The
+    same declaration is sent to the API as a strict json_schema response
+    format, and spelled out in repair prompts.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, Field]):
+        self.name = name
+        self.fields = fields
+
+    def _check(self, key: str, spec: Field, value) -> Optional[str]:
+        if value is None:
+            return None if spec.nullable else f'{key} must not be null'
+        if spec.type is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif spec.type is list:
+            valid = isinstance(value, list) and all(isinstance(item, str) for item in value)
+        else:
+            valid = isinstance(value, spec.type)
+        if not valid:
+            return f'{key} must be {_JSON_TYPES[spec.type]}' + (' of strings' if spec.type is list else '')
+        if spec.type is str and spec.required and not value.strip():
+            return f'{key} must not be empty'
+        if spec.minimum is not None and value < spec.minimum:
+            return f'{key} must be >= {spec.minimum}'
+        if spec.maximum is not None and value > spec.maximum:
+            return f'{key} must be <= {spec.maximum}'
+        return None
+
+    def validate(self, data) -> Tuple[Optional[Dict], List[str]]:
+        """(cleaned data, []) when valid, otherwise (None, errors)"""
+        if not isinstance(data, dict):
+            return None, ['response must be a JSON object']
+        errors = []
+        cleaned = {}
+        for key, spec in self.fields.items():
+            if key not in data:
+                if spec.required:
+                    errors.append(f'{key} is required')
+                continue
+            error = self._check(key, spec, data[key])
+            if error:
+                errors.append(error)
+            else:
+                cleaned[key] = data[key]
+        return (None, errors) if errors else (cleaned, [])
+
+    def parse(self, text: str) -> Tuple[Optional[Dict], List[str]]:
+        """Strict parse and validate a raw response"""
+        data, error = parse_json(text)
+        if error:
+            return None, [error]
+        return self.validate(data)
+
+    def json_schema(self) -> Dict:
+        properties = {}
+        for key, spec in self.fields.items():
+            json_type = _JSON_TYPES[spec.type]
+            prop = {'type': [json_type, 'null'] if spec.nullable else json_type}
+            if spec.type is list:
+                prop['items'] = {'type': 'string'}
+            properties[key] = prop
+        # Strict structured outputs need every property listed as required
+        return {'type': 'object', 'properties': properties, 'required': list(self.fields),
+                'additionalProperties': False}
+
+    def response_format(self) -> Dict:
+        """OpenAI response_format declaring this schema"""
+        return {'type': 'json_schema', 'json_schema': {'name': self.name, 'strict': True, 'schema': self.json_schema()}}
+
+    def repair_prompt(self, response_text: str, errors: List[str]) -> str:
+        """Targeted follow-up asking the model to fix only the listed problems"""
+        return f"""Your previous answer did not match the required JSON schema.
+
+PREVIOUS ANSWER:
+{(response_text or '')[:1500]}
+
+PROBLEMS:
+{chr(10).join('- ' + error for error in errors)}
+
+Return ONLY the corrected JSON object (no other text), matching this schema:
+{json.dumps(self.json_schema(), ensure_ascii=False)}"""
+
+
+class SchemaStats:
+    """Thread-safe outcome counters for schema-validated LLM responses"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.valid_first_try = 0
+        self.repaired = 0
+        self.failed = 0
+        self.parse_errors = 0
+        self.validation_errors = 0
+        self.wasted_tokens = 0
+
+    def record(self, outcome: str, errors: List[str] = (), wasted_text: str = None):
+        """outcome is 'valid', 'repaired' or 'failed'; errors/wasted_text describe a discarded response"""
+        wasted = estimate_tokens(wasted_text) if wasted_text else 0
+        with self._lock:
+            self.responses += 1
+            if outcome == 'valid':
+                self.valid_first_try += 1
+            elif outcome == 'repaired':
+                self.repaired += 1
+            else:
+                self.failed += 1
+            if errors:
+                if any(error.startswith(('invalid JSON', 'empty response')) for error in errors):
+                    self.parse_errors += 1
+                else:
+                    self.validation_errors += 1
+            self.wasted_tokens += wasted
+
+        metrics = get_metrics()
+        metrics.inc('llm_schema_responses_total', labels={'schema': self.name, 'outcome': outcome})
+        if wasted:
+            metrics.inc('llm_schema_wasted_tokens_total', wasted, labels={'schema': self.name})
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            failure_rate = (self.failed / self.responses * 100) if self.responses else 0
+            return {
+                f'{self.name}_responses': self.responses,
+                f'{self.name}_valid_first_try': self.valid_first_try,
+                f'{self.name}_repaired': self.repaired,
+                f'{self.name}_schema_failures': self.failed,
+                f'{self.name}_parse_errors': self.parse_errors,
+                f'{self.name}_validation_errors': self.validation_errors,
+                f'{self.name}_failure_rate': f"{failure_rate:.1f}%",
+                f'{self.name}_wasted_tokens': self.wasted_tokens
+            }
+
+
+# Research answer (RobustEnhancedTitleGenerator._enhance_with_web_search)
+RESEARCH_SCHEMA = ResponseSchema('research', {
+    'verified_product_type': Field(str, required=True),
+    'product_category': Field(str),
+    'is_construction_hardware': Field(bool),
+    'confidence': Field(float, minimum=0.0, maximum=1.0),
+})
+
+# AI parsing answer (TitleParser._ai_enhanced_parsing)
+PARSING_SCHEMA = ResponseSchema('parsing', {
+    'departamento_guess': Field(str, nullable=True),
+    'producto_tipo': Field(str, required=True),
+    'brand': Field(str, nullable=True),
+    'color': Field(str, nullable=True),
+    'specifications': Field(str, nullable=True),
+    'uso': Field(str, nullable=True),
+    'categoria_keywords': Field(list),
+})
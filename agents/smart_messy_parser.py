@@ -1,8 +1,15 @@
+import os
 import re
 import pandas as pd
 from typing import Dict, Optional, List
 
-class SmartMessyParser:
+from agents.batch_classifier import BatchCategoryMatcher
+from agents.taxonomy_registry import get_taxonomy
+
+class SmartMessyParser(BatchCategoryMatcher):
+    # Product lines exported without structure that belong to LISTELOS
+    TILE_PATTERNS = ['BAMBOO', 'CAPRI', 'CLAY']
+    
     def __init__(self, csv_path: str = None):
         """Initialize with the nomenclatura database for intelligent parsing"""
         if csv_path is None:
@@ -13,8 +20,7 @@ class SmartMessyParser:
             else:
                 raise FileNotFoundError("Cannot find nomenclatura CSV")
                 
-        self.df = pd.read_csv(csv_path)
-        self.df.columns = self.df.columns.str.strip()
+        self.df = get_taxonomy(csv_path).df
         
         # Build keyword mappings for intelligent parsing
         self.department_keywords = set()
@@ -32,6 +38,15 @@ class SmartMessyParser:
             cat_words = row['Categoria'].upper().split()
             self.category_keywords.update(cat_words)
         
+        # (DEPARTAMENTO, FAMILIA, CATEGORIA) -> first row, for structured lookups
+        self._structured_rows = {}
+        for row_id, (dept, fam, cat) in enumerate(zip(self.df['Departamento'], self.df['Familia'], self.df['Categoria'])):
+            self._structured_rows.setdefault((dept.upper(), fam.upper(), cat.upper()), row_id)
+        
+        # First LISTELOS row, used by the tile pattern fallback
+        listelos = self.df['Categoria'].str.upper().str.contains('LISTELOS').to_numpy().nonzero()[0]
+        self._listelos_row = int(listelos[0]) if len(listelos) else None
+        
         print(f"Smart parser initialized with {len(self.df)} categories")
     
     def parse_messy_title(self, messy_input: str) -> Dict:
@@ -145,44 +160,55 @@ class SmartMessyParser:
     
     def find_best_category_match(self, product_data: Dict) -> Optional[Dict]:
         """Find the best category match using extracted structure or intelligent fallback"""
+        return self._match_batch([product_data])[0]
+    
+    def _match_batch(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Structured lookups over the whole group, then tile patterns over what is left"""
+        matches = [None] * len(products)
         
         # If we have structured data, use it
-        if all(k in product_data for k in ['departamento', 'familia', 'categoria']):
-            for _, row in self.df.iterrows():
-                if (row['Departamento'].upper() == product_data['departamento'].upper() and
-                    row['Familia'].upper() == product_data['familia'].upper() and
-                    row['Categoria'].upper() == product_data['categoria'].upper()):
-                    
-                    return {
-                        'departamento': row['Departamento'],
-                        'familia': row['Familia'],
-                        'categoria': row['Categoria'],
-                        'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                        'ejemplo_aplicado': row['Ejemplo aplicado'],
-                        'match_type': 'intelligent_structured',
-                        'confidence': product_data.get('confidence', 1.0)
-                    }
-        
-        # Fallback to tile pattern detection
-        title = product_data.get('original_title', '').upper()
-        
-        # Tile patterns
-        if any(pattern in title for pattern in ['BAMBOO', 'CAPRI', 'CLAY']):
-            # Look for LISTELOS category (since your data suggests these are listelos)
-            listelos_match = self.df[self.df['Categoria'].str.upper().str.contains('LISTELOS')]
-            if not listelos_match.empty:
-                row = listelos_match.iloc[0]
-                return {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'],
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'intelligent_tile_pattern',
-                    'confidence': 0.8
-                }
-        
-        return None
+        pattern_items = []
+        for i, product_data in enumerate(products):
+            if all(k in product_data for k in ['departamento', 'familia', 'categoria']):
+                row_id = self._structured_rows.get((
+                    product_data['departamento'].upper(),
+                    product_data['familia'].upper(),
+                    product_data['categoria'].upper()
+                ))
+                if row_id is not None:
+                    matches[i] = self._row_match(row_id, 'intelligent_structured', product_data.get('confidence', 1.0))
+                    continue
+            pattern_items.append(i)
+        
+        # Fallback to tile pattern detection. Look for LISTELOS category
+        # (since your data suggests these are listelos)
+        if self._listelos_row is None:
+            return matches
+        for i in pattern_items:
+            title = products[i].get('original_title', '').upper()
+            if any(pattern in title for pattern in self.TILE_PATTERNS):
+                matches[i] = self._row_match(self._listelos_row, 'intelligent_tile_pattern', 0.8)
+        
+        return matches
+    
+    def find_best_category_matches(self, products) -> List[Optional[Dict]]:
+        """Batch form of find_best_category_match (list of dicts or DataFrame)"""
+        return self.find_category_matches(products)
+    
+    def find_category_match(self, product_data: Dict) -> Optional[Dict]:
+        return self._match_batch([product_data])[0]
+    
+    def _row_match(self, row_id: int, match_type: str, confidence: float) -> Dict:
+        row = self.df.iloc[row_id]
+        return {
+            'departamento': row['Departamento'],
+            'familia': row['Familia'],
+            'categoria': row['Categoria'],
+            'nomenclatura_sugerida': row['Nomenclatura sugerida'],
+            'ejemplo_aplicado': row['Ejemplo aplicado'],
+            'match_type': match_type,
+            'confidence': confidence
+        }
 
 if __name__ == "__main__":
     parser = SmartMessyParser()
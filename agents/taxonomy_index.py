@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, List, Tuple
+
+from agents.keyword_matrix import sparse_product
+
+
+class TaxonomyIndex:
+    """Precompiled lookup structures over the nomenclatura taxonomy.
+
+    Built once from the category DataFrame so classifiers can answer exact,
+    family and keyword lookups without walking every row per title.
+    """
+
+    MAX_CACHED_TERMS = 200000
+    # Titles scored per dense result block, bounding memory for huge batches
+    BATCH_CHUNK_SIZE = 2048
+
+    def __init__(self, df: pd.DataFrame):
+        """Build all indexes from a nomenclatura DataFrame"""
+        self.df = df
+
+        # Prebuilt match payloads, one per CSV row (in file order)
+        self.rows: List[Dict] = []
+
+        # (departamento, familia, categoria) -> row id, first row wins
+        self.exact_index: Dict[Tuple[str, str, str], int] = {}
+
+        # (departamento, familia) -> row ids in file order
+        self.family_index: Dict[Tuple[str, str], List[int]] = {}
+
+        # Normalized categoria per row, kept for substring checks
+        self.categoria_upper: List[str] = []
+
+        # Any substring of a categoria token -> row ids containing it.
+        # Search terms never contain whitespace, so "term in categoria"
+        # is equivalent to "term is a substring of one categoria token".
+        self.token_index: Dict[str, List[int]] = {}
+
+        self._contains_cache: Dict[Tuple[str, str, str], Optional[int]] = {}
+
+        # Search term -> (row ids whose categoria contains it, weights), for batch scoring
+        self._term_postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self._build()
+
+    @staticmethod
+    def normalize(value) -> str:
+        """Normalize a taxonomy field for lookups"""
+        if value is None or (isinstance(value, float) and pd.isna(value)):
+            return ''
+        return str(value).strip().upper()
+
+    def _build(self):
+        """Populate row payloads, hash maps and the inverted index"""
+        substrings_by_token: Dict[str, set] = {}
+
+        for row_id, (dept, fam, cat, rule, example) in enumerate(zip(
+                self.df['Departamento'], self.df['Familia'], self.df['Categoria'],
+                self.df['Nomenclatura sugerida'], self.df['Ejemplo aplicado'])):
+
+            self.rows.append({
+                'departamento': dept,
+                'familia': fam,
+                'categoria': cat.strip(),
+                'nomenclatura_sugerida': rule,
+                'ejemplo_aplicado': example
+            })
+
+            dept_key, fam_key, cat_key = self.normalize(dept), self.normalize(fam), self.normalize(cat)
+            self.categoria_upper.append(cat_key)
+            self.exact_index.setdefault((dept_key, fam_key, cat_key), row_id)
+            self.family_index.setdefault((dept_key, fam_key), []).append(row_id)
+
+            seen_in_row = set()
+            for token in cat_key.split():
+                if token not in substrings_by_token:
+                    substrings_by_token[token] = {
+                        token[i:j] for i in range(len(token)) for j in range(i + 1, len(token) + 1)
+                    }
+                for substring in substrings_by_token[token]:
+                    if substring not in seen_in_row:
+                        seen_in_row.add(substring)
+                        self.token_index.setdefault(substring, []).append(row_id)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def build_match(self, row_id: int, **extra) -> Dict:
+        """Return a fresh match dict for a row, merged with extra fields"""
+        match = dict(self.rows[row_id])
+        match.update(extra)
+        return match
+
+    def find_exact(self, departamento, familia, categoria) -> Optional[int]:
+        """O(1) lookup of a (departamento, familia, categoria) triple"""
+        key = (self.normalize(departamento), self.normalize(familia), self.normalize(categoria))
+        return self.exact_index.get(key)
+
+    def find_in_family(self, departamento, familia, categoria_contains: str) -> Optional[int]:
+        """First row of a family whose categoria contains the given text"""
+        key = (self.normalize(departamento), self.normalize(familia), self.normalize(categoria_contains))
+        if key not in self._contains_cache:
+            found = None
+            for row_id in self.family_index.get(key[:2], []):
+                if key[2] in self.categoria_upper[row_id]:
+                    found = row_id
+                    break
+            self._contains_cache[key] = found
+        return self._contains_cache[key]
+
+    def score_keywords(self, search_terms: List[str]) -> Dict[int, int]:
+        """Score rows by summed length of search terms found in their categoria"""
+        scores: Dict[int, int] = {}
+        for term in search_terms:
+            for row_id in self.token_index.get(term, ()):
+                scores[row_id] = scores.get(row_id, 0) + len(term)
+        return scores
+
+    def score_substrings(self, search_terms: List[str]) -> Dict[int, int]:
+        """score_keywords for terms that may contain spaces (matched against whole names)"""
+        scores: Dict[int, int] = {}
+        for term in search_terms:
+            if not term:
+                continue
+            if any(ch.isspace() for ch in term):
+                # Multi-word terms can span categoria tokens
+                rows = [r for r, categoria in enumerate(self.categoria_upper) if term in categoria]
+            else:
+                rows = self.token_index.get(term, ())
+            for row_id in rows:
+                scores[row_id] = scores.get(row_id, 0) + len(term)
+        return scores
+
+    def best_keyword_match(self, search_terms: List[str]) -> Tuple[Optional[int], int]:
+        """Highest scoring row for the terms (earliest row wins ties)"""
+        scores = self.score_keywords(search_terms)
+        if not scores:
+            return None, 0
+        row_id = min(scores, key=lambda r: (-scores[r], r))
+        return row_id, scores[row_id]
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(row ids whose categoria contains the term, its weight per row), memoized
+
+        Matches score_substrings: a term counts len(term) toward every such row.
+        """
+        posting = self._term_postings.get(term)
+        if posting is None:
+            if any(ch.isspace() for ch in term):
+                rows = np.array([r for r, categoria in enumerate(self.categoria_upper) if term in categoria],
+                                dtype=np.int64)
+            else:
+                rows = np.array(self.token_index.get(term, ()), dtype=np.int64)
+            posting = (rows, np.full(len(rows), len(term), dtype=np.int64))
+            if len(self._term_postings) >= self.MAX_CACHED_TERMS:
+                self._term_postings.clear()
+            self._term_postings[term] = posting
+        return posting
+
+    def score_batch(self, term_lists: List[List[str]]) -> np.ndarray:
+        """score_substrings for many titles at once: an (n_titles x n_rows) array
+
+        Each distinct term is looked up once, and the whole batch is scored with
+        one sparse (titles x terms) @ (terms x rows) product.
+        """
+        term_ids: Dict[str, int] = {}
+        q_rows, q_cols = [], []
+        for title_id, terms in enumerate(term_lists):
+            for term in terms:
+                if term:
+                    q_rows.append(title_id)
+                    q_cols.append(term_ids.setdefault(term, len(term_ids)))
+        return sparse_product(q_rows, q_cols, [self._postings(term) for term in term_ids],
+                              len(term_lists), len(self.rows))
+
+    def best_keyword_matches(self, term_lists: List[List[str]]) -> List[Tuple[Optional[int], int]]:
+        """best_keyword_match for many titles at once (terms may contain spaces)"""
+        matches = []
+        for start in range(0, len(term_lists), self.BATCH_CHUNK_SIZE):
+            scores = self.score_batch(term_lists[start:start + self.BATCH_CHUNK_SIZE])
+            best = scores.argmax(axis=1) if len(self.rows) else np.zeros(len(scores), dtype=np.int64)
+            for i, row_id in enumerate(best):
+                score = int(scores[i, row_id]) if len(self.rows) else 0
+                matches.append((int(row_id), score) if score > 0 else (None, 0))
+        return matches
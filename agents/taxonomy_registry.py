@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+import pandas as pd
+from typing import Callable, Dict, Optional
+
+from agents.bm25_ranker import BM25Ranker
+from agents.taxonomy_index import TaxonomyIndex
+from agents.trigram_index import TrigramIndex
+
+
+def resolve_csv_path(csv_path: str = None) -> str:
+    """Find the nomenclatura CSV when no explicit path is given"""
+    if csv_path is not None:
+        return csv_path
+    if os.path.exists("data/nomenclatura_gorila.csv"):
+        return "data/nomenclatura_gorila.csv"
+    elif os.path.exists("../data/nomenclatura_gorila.csv"):
+        return "../data/nomenclatura_gorila.csv"
+    elif os.path.exists("nomenclatura_gorila2.csv"):
+        return "nomenclatura_gorila2.csv"
+    raise FileNotFoundError("Cannot find nomenclatura_gorila.csv")
+
+
+class TaxonomySnapshot:
+    """An immutable, loaded view of one version of the nomenclatura CSV"""
+
+    def __init__(self, csv_path: str, df: pd.DataFrame, mtime: float, content_hash: str):
+        self.csv_path = csv_path
+        self.df = df
+        self.mtime = mtime
+        self.content_hash = content_hash
+        self.index = TaxonomyIndex(df)
+        self.ranker = BM25Ranker(self.index)
+        self.trigrams = TrigramIndex(self.index.categoria_upper)
+
+    @property
+    def version(self) -> str:
+        return self.content_hash
+
+
+class TaxonomyRegistry:
+    """Process-wide cache of the taxonomy and objects built from it.
+
+    The CSV is parsed once and shared by every request. It is only reloaded
+    when its mtime changes *and* its content hash differs, and every access
+    is guarded by a re-entrant lock so it is safe under threaded servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshots: Dict[str, TaxonomySnapshot] = {}
+        # name -> (taxonomy version, built object)
+        self._components: Dict[str, tuple] = {}
+        self.reload_count = 0
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_taxonomy(self, csv_path: str = None) -> TaxonomySnapshot:
+        """Return the current snapshot, reloading only if the file changed"""
+        path = os.path.abspath(resolve_csv_path(csv_path))
+        mtime = os.path.getmtime(path)
+
+        with self._lock:
+            snapshot = self._snapshots.get(path)
+            if snapshot is not None and snapshot.mtime == mtime:
+                return snapshot
+
+            content_hash = self._hash_file(path)
+            if snapshot is not None and snapshot.content_hash == content_hash:
+                # Touched but unchanged: keep the parsed data
+                snapshot.mtime = mtime
+                return snapshot
+
+            df = pd.read_csv(path)
+            df.columns = df.columns.str.strip()
+            snapshot = TaxonomySnapshot(path, df, mtime, content_hash)
+            if path in self._snapshots:
+                self.reload_count += 1
+                print(f"🔄 Taxonomy reloaded from {path} ({len(df)} rows)")
+            self._snapshots[path] = snapshot
+            return snapshot
+
+    def get_or_build(self, name: str, factory: Callable, csv_path: str = None):
+        """Return a shared object built by factory, rebuilt when the taxonomy changes"""
+        with self._lock:
+            version = self.get_taxonomy(csv_path).version
+            cached = self._components.get(name)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            component = factory()
+            self._components[name] = (version, component)
+            return component
+
+    def clear(self):
+        """Drop all cached snapshots and components"""
+        with self._lock:
+            self._snapshots.clear()
+            self._components.clear()
+
+
+_registry: Optional[TaxonomyRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TaxonomyRegistry:
+    """Return the process-wide taxonomy registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TaxonomyRegistry()
+    return _registry
+
+
+def get_taxonomy(csv_path: str = None) -> TaxonomySnapshot:
+    """Shortcut for get_registry().get_taxonomy()"""
+    return get_registry().get_taxonomy(csv_path)
@@ -1,23 +1,26 @@
 import pandas as pd
-import os
-import re
 from typing import Dict, Optional, List
 
-class TileFixedCategoryClassifier:
+from agents.attribute_lexer import get_attribute_lexer
+from agents.batch_classifier import BatchCategoryMatcher
+from agents.taxonomy_registry import get_taxonomy
+from agents.title_scanner import TILE_PATTERN_CATEGORIES, get_title_scanner
+
+class TileFixedCategoryClassifier(BatchCategoryMatcher):
+    # Ranked BM25 alternatives attached to keyword matches for review
+    CANDIDATES_K = 5
+    
     def __init__(self, csv_path: str = None):
         """Initialize with tile-aware category matching logic"""
-        if csv_path is None:
-            if os.path.exists("data/nomenclatura_gorila.csv"):
-                csv_path = "data/nomenclatura_gorila.csv"
-            elif os.path.exists("../data/nomenclatura_gorila.csv"):
-                csv_path = "../data/nomenclatura_gorila.csv"
-            elif os.path.exists("nomenclatura_gorila2.csv"):
-                csv_path = "nomenclatura_gorila2.csv"
-            else:
-                raise FileNotFoundError("Cannot find nomenclatura_gorila.csv")
-                
-        self.df = pd.read_csv(csv_path)
-        self.df.columns = self.df.columns.str.strip()
+        # Shared, loaded-once taxonomy (reloaded only when the CSV changes)
+        taxonomy = get_taxonomy(csv_path)
+        self.df = taxonomy.df
+        
+        # Precompiled lookups, built once instead of scanning rows per title
+        self.index = taxonomy.index
+        self.ranker = taxonomy.ranker
+        self.scanner = get_title_scanner()
+        self.lexer = get_attribute_lexer()
         
         print(f"Loaded {len(self.df)} category mappings with tile classification")
     
@@ -27,34 +30,26 @@ class TileFixedCategoryClassifier:
         title = product_data.get('original_title', '').upper()
         description = product_data.get('description', '').upper()
         
-        # Tile pattern names that are commonly misclassified
-        tile_patterns = {
-            'BAMBOO': 'MADERAS',      # Wood-look tiles
-            'CAPRI': 'MONOCOLOR',     # Solid color tiles  
-            'CLAY': 'RUSTICO',        # Rustic tiles
-            'WOOD': 'MADERAS',
-            'STONE': 'PIEDRA',
-            'MARBLE': 'MARMOL',
-            'CEMENT': 'CEMENTO'
-        }
+        # Tile pattern names that are commonly misclassified (one scan finds them all)
+        found_patterns = self.scanner.scan(title).terms('tile_pattern')
         
-        # Tile size patterns (dimensions in cm)
-        tile_size_pattern = re.search(r'(\d+)[xX×](\d+)', title)
+        # Tile size (dimensions in cm), from the lexer pass the parsers already made over this title
+        tile_size = self.lexer.tokenize(product_data.get('original_title', '')).find('dimension')
         
         # Check if this looks like a tile product
         is_likely_tile = False
         detected_pattern = None
         
         # Pattern-based detection
-        for pattern, category_type in tile_patterns.items():
-            if pattern in title:
+        for pattern, category_type in TILE_PATTERN_CATEGORIES.items():
+            if pattern in found_patterns:
                 is_likely_tile = True
                 detected_pattern = category_type
                 break
         
         # Size-based detection (common tile sizes)
-        if tile_size_pattern:
-            width, height = int(tile_size_pattern.group(1)), int(tile_size_pattern.group(2))
+        if tile_size:
+            width, height = tile_size.numbers()[:2]
             common_tile_sizes = [
                 (20, 20), (21, 31), (25, 40), (30, 30), (29, 36), (33, 33),
                 (40, 40), (45, 45), (60, 60), (80, 80), (20, 120)
@@ -76,108 +71,89 @@ class TileFixedCategoryClassifier:
         target_familia = 'CERAMICA DE PISOS'
         target_categoria = detected_pattern or 'MONOCOLOR'
         
-        for _, row in self.df.iterrows():
-            if (row['Departamento'].upper() == target_departamento and
-                row['Familia'].upper() == target_familia and
-                row['Categoria'].upper() == target_categoria):
-                
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'tile_pattern_match',
-                    'confidence': 0.95,
-                    'detected_pattern': detected_pattern
-                }
-                break
+        row_id = self.index.find_exact(target_departamento, target_familia, target_categoria)
+        if row_id is not None:
+            best_match = self.index.build_match(
+                row_id,
+                match_type='tile_pattern_match',
+                confidence=0.95,
+                detected_pattern=detected_pattern
+            )
         
         # If no exact pattern match, try generic ceramic floor
         if not best_match:
-            for _, row in self.df.iterrows():
-                if (row['Departamento'].upper() == target_departamento and
-                    row['Familia'].upper() == target_familia and
-                    'BALDOSA' in row['Categoria'].upper()):
-                    
-                    best_match = {
-                        'departamento': row['Departamento'],
-                        'familia': row['Familia'],
-                        'categoria': row['Categoria'].strip(),
-                        'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                        'ejemplo_aplicado': row['Ejemplo aplicado'],
-                        'match_type': 'tile_generic_match',
-                        'confidence': 0.85,
-                        'detected_pattern': 'GENERIC_TILE'
-                    }
-                    break
+            row_id = self.index.find_in_family(target_departamento, target_familia, 'BALDOSA')
+            if row_id is not None:
+                best_match = self.index.build_match(
+                    row_id,
+                    match_type='tile_generic_match',
+                    confidence=0.85,
+                    detected_pattern='GENERIC_TILE'
+                )
         
         return best_match
     
     def find_category_match(self, product_data: Dict) -> Optional[Dict]:
         """Enhanced category matching with structured data priority"""
+        return self._match_batch([product_data])[0]
+    
+    def _match_batch(self, products: List[Dict]) -> List[Optional[Dict]]:
+        """Run each matching strategy over the whole group of products still unmatched"""
+        matches = [None] * len(products)
         
         # FIRST: Try exact structured data match if available
-        if (product_data.get('departamento') and 
-            product_data.get('familia') and 
-            product_data.get('categoria')):
-            
-            print(f"   📋 Using structured data: {product_data.get('departamento')} > {product_data.get('familia')} > {product_data.get('categoria')}")
-            
-            for _, row in self.df.iterrows():
-                if (product_data.get('departamento', '').upper() == row['Departamento'].upper() and
-                    product_data.get('familia', '').upper() == row['Familia'].upper() and
-                    product_data.get('categoria', '').upper() == row['Categoria'].strip().upper()):
-                    
-                    return {
-                        'departamento': row['Departamento'],
-                        'familia': row['Familia'], 
-                        'categoria': row['Categoria'].strip(),
-                        'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                        'ejemplo_aplicado': row['Ejemplo aplicado'],
-                        'match_type': 'exact_structured',
-                        'confidence': 1.0
-                    }
-            
-            print(f"   ⚠️  No exact match found for structured data")
+        unstructured = []
+        for i, product_data in enumerate(products):
+            if (product_data.get('departamento') and 
+                product_data.get('familia') and 
+                product_data.get('categoria')):
+                
+                print(f"   📋 Using structured data: {product_data.get('departamento')} > {product_data.get('familia')} > {product_data.get('categoria')}")
+                
+                row_id = self.index.find_exact(
+                    product_data.get('departamento'),
+                    product_data.get('familia'),
+                    product_data.get('categoria')
+                )
+                if row_id is not None:
+                    matches[i] = self.index.build_match(row_id, match_type='exact_structured', confidence=1.0)
+                    continue
+                
+                print(f"   ⚠️  No exact match found for structured data")
+            unstructured.append(i)
         
         # SECOND: Try tile pattern detection for unstructured data
-        tile_match = self._classify_tile_products(product_data)
-        if tile_match:
-            print(f"   🎯 Tile pattern detected: {tile_match['detected_pattern']}")
-            return tile_match
-        
-        # THIRD: Try keyword matching as fallback
+        keyword_items = []
+        for i in unstructured:
+            tile_match = self._classify_tile_products(products[i])
+            if tile_match:
+                print(f"   🎯 Tile pattern detected: {tile_match['detected_pattern']}")
+                matches[i] = tile_match
+            else:
+                keyword_items.append(i)
+        
+        # THIRD: Try keyword matching as fallback, scoring the group together
+        term_lists = [self._keyword_search_terms(products[i]) for i in keyword_items]
+        keyword_matches = self.index.best_keyword_matches(term_lists)
+        for i, search_terms, (row_id, best_score) in zip(keyword_items, term_lists, keyword_matches):
+            if row_id is not None and min(best_score / 30, 1.0) > 0.2:
+                matches[i] = self.index.build_match(
+                    row_id,
+                    match_type='keyword',
+                    confidence=min(best_score / 30, 1.0),
+                    score=best_score,
+                    candidates=self.ranker.candidates(search_terms, self.CANDIDATES_K)
+                )
+        
+        return matches
+    
+    def _keyword_search_terms(self, product_data: Dict) -> List[str]:
+        """Upper-cased words of the free-text fields"""
         search_terms = []
         for field in ['description', 'original_title']:
             if field in product_data and product_data[field]:
                 search_terms.extend(product_data[field].upper().split())
-        
-        best_match = None
-        best_score = 0
-        
-        for _, row in self.df.iterrows():
-            categoria = row['Categoria'].strip().upper()
-            score = 0
-            
-            for term in search_terms:
-                if term in categoria:
-                    score += len(term)
-            
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'keyword',
-                    'confidence': min(score / 30, 1.0),
-                    'score': score
-                }
-        
-        return best_match if best_match and best_match['confidence'] > 0.2 else None
+        return search_terms
     
     def get_all_categories(self) -> pd.DataFrame:
         """Return all available categories"""
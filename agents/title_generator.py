@@ -3,14 +3,20 @@ import os
 from typing import Dict, Optional
 from dotenv import load_dotenv
 
+from agents.circuit_breaker import get_circuit_breaker
+from agents.concurrency_controller import call_with_retries, get_concurrency_controller
+
 load_dotenv()
 
 class TitleGenerator:
     def __init__(self, api_key: str = None):
         """Initialize OpenAI client"""
         self.client = openai.OpenAI(
-            api_key=api_key or os.getenv('OPENAI_API_KEY')
+            api_key=api_key or os.getenv('OPENAI_API_KEY'),
+            max_retries=0  # Rate limits and retries are handled by the shared concurrency controller
         )
+        self.concurrency = get_concurrency_controller()
+        self.breaker = get_circuit_breaker()
     
     def generate_ecommerce_title(self, product_data: Dict, category_info: Dict) -> str:
         """
@@ -52,7 +58,7 @@ INSTRUCTIONS:
 Generate ONE optimized ecommerce title that follows the naming rule exactly."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = call_with_retries(lambda: self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are an expert ecommerce title writer who creates titles that convert. You follow format rules exactly and optimize for search and sales."},
@@ -60,7 +66,7 @@ Generate ONE optimized ecommerce title that follows the naming rule exactly."""
                 ],
                 temperature=0.3,
                 max_tokens=200
-            )
+            ), self.concurrency, self.breaker)
             
             title = response.choices[0].message.content.strip()
             
@@ -71,7 +77,8 @@ Generate ONE optimized ecommerce title that follows the naming rule exactly."""
             
         except Exception as e:
             print(f"Error generating title: {e}")
-            # Fallback: create basic title from available data
+            # Fallback: create basic title from available data, to be regenerated later
+            product_data['needs_reenrichment'] = True
             return self._create_fallback_title(product_data, category_info)
     
     def _format_product_data(self, product_data: Dict) -> str:
@@ -1,17 +1,38 @@
-import re
 import openai
 import os
 from typing import Dict, List
 from dotenv import load_dotenv
 
+from agents.attribute_lexer import get_attribute_lexer
+from agents.circuit_breaker import get_circuit_breaker
+from agents.concurrency_controller import call_with_retries, get_concurrency_controller
+from agents.research_cache import ResearchCache
+from agents.response_schema import PARSING_SCHEMA, SchemaStats
+
 load_dotenv()
 
 class TitleParser:
-    def __init__(self, api_key: str = None):
+    # Bump whenever the parsing prompt changes so cached answers are not reused
+    PARSING_PROMPT_VERSION = 'parsing-v1'
+    
+    def __init__(self, api_key: str = None, cache: ResearchCache = None):
         """Initialize with OpenAI for intelligent parsing"""
         self.client = openai.OpenAI(
-            api_key=api_key or os.getenv('OPENAI_API_KEY')
+            api_key=api_key or os.getenv('OPENAI_API_KEY'),
+            max_retries=0  # Rate limits and retries are handled by the shared concurrency controller
         )
+        self.concurrency = get_concurrency_controller()
+        self.breaker = get_circuit_breaker()
+        self.model = "gpt-4o-mini"
+        
+        # Optional persistent cache of parsed AI responses
+        self.cache = cache
+        
+        # Shared tokenizer for dimensions, quantities, R-values and colors
+        self.lexer = get_attribute_lexer()
+        
+        # Outcomes of schema validation and repair of AI parsing responses
+        self.schema_stats = SchemaStats(PARSING_SCHEMA.name)
     
     def parse_title_to_product_data(self, raw_title: str) -> Dict:
         """
@@ -40,36 +61,19 @@ class TitleParser:
             'description': title  # Keep original as description
         }
         
-        # Extract dimensions (various formats)
-        dimension_patterns = [
-            r'(\d+)["\']?\s*x\s*(\d+)["\']?\s*x\s*(\d+)["\']?',  # 3D: 15x93x3.5
-            r'(\d+)["\']?\s*x\s*(\d+)["\']?',  # 2D: 60x60
-            r'(\d+)\s*cm\s*x\s*(\d+)\s*cm',   # with cm
-            r'(\d+)\s*mm\s*x\s*(\d+)\s*mm',   # with mm
-        ]
-        
-        for pattern in dimension_patterns:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                data['dimensions'] = match.group(0)
-                break
-        
-        # Extract quantities
-        quantity_match = re.search(r'(\d+)\s*(pz|pzs|piezas|unidades|un)', title, re.IGNORECASE)
-        if quantity_match:
-            data['quantity'] = quantity_match.group(0)
+        # One lexer pass finds the dimensions, quantities, R-values and colors
+        tokens = self.lexer.tokenize(title)
         
-        # Extract R-values  
-        r_value_match = re.search(r'R-?\s*(\d+)', title, re.IGNORECASE)
-        if r_value_match:
-            data['r_value'] = r_value_match.group(0)
+        for kind, field in (('dimension', 'dimensions'), ('quantity', 'quantity'), ('r_value', 'r_value')):
+            token = tokens.find(kind)
+            if token:
+                data[field] = token.text
         
         # Extract colors (Spanish)
         colors = ['blanco', 'negro', 'azul', 'rojo', 'verde', 'gris', 'amarillo', 'naranja', 'rosa', 'café', 'marrón']
-        for color in colors:
-            if re.search(rf'\b{color}\b', title, re.IGNORECASE):
-                data['color'] = color.title()
-                break
+        color = tokens.first('color', colors)
+        if color:
+            data['color'] = color.title()
         
         # Extract potential brands (capitalized words at the beginning)
         words = title.split()
@@ -112,19 +116,40 @@ Respond in this EXACT JSON format:
 
 Be precise and concise. Only include information you're confident about."""
 
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResearchCache.make_key(title, '', '', self.PARSING_PROMPT_VERSION, self.model)
+            cached_data = self.cache.get(cache_key)
+            if cached_data is not None:
+                final_data = rule_data.copy()
+                final_data.update(cached_data)
+                return final_data
+        
+        if self.breaker.is_open():
+            # Provider is down: keep the rule-based extraction and enrich later
+            final_data = rule_data.copy()
+            final_data['needs_reenrichment'] = True
+            return final_data
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert at extracting structured product data from Spanish construction material titles. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=300
-            )
+            response_text = self._complete(prompt)
+            ai_data, errors = PARSING_SCHEMA.parse(response_text)
+            
+            if ai_data is None:
+                # One targeted repair call, then give up on the AI fields
+                print(f"Repairing AI parsing response: {'; '.join(errors)[:60]}")
+                repaired_text = self._complete(PARSING_SCHEMA.repair_prompt(response_text, errors))
+                ai_data, repair_errors = PARSING_SCHEMA.parse(repaired_text)
+                if ai_data is None:
+                    self.schema_stats.record('failed', errors, wasted_text=response_text + repaired_text)
+                    print(f"AI parsing failed: {'; '.join(repair_errors)[:80]}")
+                    return rule_data
+                self.schema_stats.record('repaired', errors, wasted_text=response_text)
+            else:
+                self.schema_stats.record('valid')
             
-            import json
-            ai_data = json.loads(response.choices[0].message.content)
+            if cache_key is not None:
+                self.cache.put(cache_key, ai_data)
             
             # Merge AI results with rule-based extraction
             final_data = rule_data.copy()
@@ -134,8 +159,28 @@ Be precise and concise. Only include information you're confident about."""
             
         except Exception as e:
             print(f"AI parsing failed: {e}")
-            # Fallback to rule-based only
-            return rule_data
+            # Fallback to rule-based only, to be enriched once the API is back
+            final_data = rule_data.copy()
+            final_data['needs_reenrichment'] = True
+            return final_data
+    
+    def _complete(self, prompt: str) -> str:
+        """One chat completion declaring the parsing response schema"""
+        response = call_with_retries(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are an expert at extracting structured product data from Spanish construction material titles. Always respond with valid JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=300,
+            response_format=PARSING_SCHEMA.response_format()
+        ), self.concurrency, self.breaker)
+        return response.choices[0].message.content or ''
+    
+    def get_parsing_stats(self) -> Dict:
+        """Schema validation outcomes of AI parsing responses"""
+        return self.schema_stats.get_stats()
     
     def batch_parse_titles(self, titles: List[str]) -> List[Dict]:
         """Parse multiple titles at once"""
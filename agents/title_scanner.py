@@ -0,0 +1,242 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+# Shared dictionaries. Everything is upper case because titles are matched
+# case-insensitively against an upper-cased copy.
+
+# Construction vocabulary -> meaning (ImprovedTitleParser)
+CONSTRUCTION_VOCAB = {
+    # Hardware terms
+    'CHAPA': 'cerradura/manija de puerta',
+    'CERRADURA': 'cerradura de puerta',
+    'MANIJA': 'manija de puerta',
+    'PICAPORTE': 'manija de puerta',
+
+    # Fasteners
+    'TOR': 'tornillo',
+    'TORNILLO': 'tornillo',
+    'PERNO': 'perno',
+    'TUERCA': 'tuerca',
+    'ARANDELA': 'arandela',
+
+    # Drill/cutting tools
+    'BROCA': 'broca para taladro',
+    'PUNTA': 'punta de herramienta',
+    'MECHA': 'broca',
+
+    # Plumbing vs Hardware
+    'GRIFO': 'grifería',
+    'LLAVE': 'grifería o herramienta',
+    'VALVULA': 'grifería',
+
+    # Materials
+    'GALV': 'galvanizado',
+    'INOX': 'acero inoxidable',
+    'CROMO': 'cromado',
+    'COBRE': 'cobre',
+
+    # Tile patterns
+    'BAMBOO': 'patrón bambú',
+    'CAPRI': 'patrón capri',
+    'CLAY': 'patrón clay',
+
+    # Locations (context, not product type)
+    'BAÑO': 'ubicación: baño',
+    'COCINA': 'ubicación: cocina',
+    'JARDIN': 'ubicación: jardín'
+}
+
+# Tile pattern name -> ceramic categoria, in priority order (TileFixedCategoryClassifier)
+TILE_PATTERN_CATEGORIES = {
+    'BAMBOO': 'MADERAS',      # Wood-look tiles
+    'CAPRI': 'MONOCOLOR',     # Solid color tiles
+    'CLAY': 'RUSTICO',        # Rustic tiles
+    'WOOD': 'MADERAS',
+    'STONE': 'PIEDRA',
+    'MARBLE': 'MARMOL',
+    'CEMENT': 'CEMENTO'
+}
+
+# Spanish colors, in priority order (TitleParser); also covers the other parsers' spellings
+COLORS = ['BLANCO', 'NEGRO', 'AZUL', 'ROJO', 'VERDE', 'GRIS', 'AMARILLO', 'NARANJA', 'ROSA', 'CAFÉ', 'MARRÓN',
+          'CAFE', 'MARRON']
+
+# Common brand patterns in construction/hardware (RobustEnhancedTitleGenerator)
+KNOWN_BRANDS = ['BOSCH', 'MAKITA', 'DEWALT', 'MILWAUKEE', 'STANLEY', 'BLACK+DECKER',
+                'RYOBI', 'CRAFTSMAN', 'KOBALT', 'HUSKY', 'RIDGID', 'PORTER-CABLE']
+
+# Quantity and measurement units
+UNITS = ['PZ', 'PZS', 'PIEZAS', 'UNIDADES', 'UN', 'CM', 'MM', 'MTS', 'KG', 'LT', 'ML', 'GAL', 'PULG', 'IN']
+
+# Label product type -> keywords, in priority order (LabelFormatter)
+PRODUCT_TYPE_KEYWORDS = {
+    'accessory': ['GRAPAS', 'ACCESORIOS', 'ACC'],
+    'insulation': ['FIBRA', 'AISLAM', 'AISL'],
+    'panel': ['CASETON', 'POLIESTIR'],
+    'foam': ['FOAMULAR', 'FOAM'],
+}
+
+
+class Hit(NamedTuple):
+    """One dictionary term found in a title"""
+    kind: str
+    term: str
+    start: int
+    end: int
+    whole_word: bool
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same notion of a word character as the re module's \b
+    return ch.isalnum() or ch == '_'
+
+
+def fold_case(text: str) -> str:
+    """Upper-case text without changing its length, so hit offsets stay valid"""
+    folded = text.upper()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. ß) expand when upper-cased; leave those as they are
+    return ''.join(ch.upper() if len(ch.upper()) == 1 else ch for ch in text)
+
+
+class ScanResult:
+    """Every typed hit found in one title"""
+
+    def __init__(self, text: str, hits: List[Hit]):
+        self.text = text
+        self.hits = hits
+
+    def terms(self, kind: str, whole_word: bool = False) -> Set[str]:
+        """Distinct terms of one kind; whole_word=True keeps only \\b-delimited hits"""
+        return {hit.term for hit in self.hits if hit.kind == kind and (hit.whole_word or not whole_word)}
+
+    def first(self, kind: str, candidates: Iterable[str], whole_word: bool = False) -> Optional[str]:
+        """First candidate (in the caller's priority order) that was found"""
+        found = self.terms(kind, whole_word)
+        for candidate in candidates:
+            if candidate.upper() in found:
+                return candidate
+        return None
+
+    def __iter__(self):
+        return iter(self.hits)
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+
+class TitleScanner:
+    """Aho-Corasick automaton over every title dictionary.
+
+    One linear pass over the upper-cased title reports all occurrences of
+    every term of every kind (vocab, tile_pattern, color, brand, unit,
+    product_type), including overlapping ones. Each hit says whether it is
+    delimited like a regex \\b...\\b word, so callers can choose substring
+    or whole-word semantics without rescanning.
+    """
+
+    MAX_CACHED_TITLES = 50000
+
+    def __init__(self, dictionaries: Dict[str, Iterable[str]]):
+        """dictionaries maps a hit kind to the terms of that kind"""
+        # Goto function, fully resolved through failure links at build time
+        self._delta: List[Dict[str, int]] = [{}]
+        self._outputs: List[Tuple[Tuple[str, str, int], ...]] = [()]
+        self._cache: Dict[str, ScanResult] = {}
+
+        self._build(dictionaries)
+
+    def _build(self, dictionaries: Dict[str, Iterable[str]]):
+        trie: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[str, str, int]]] = [[]]
+
+        for kind, terms in dictionaries.items():
+            for term in terms:
+                pattern = fold_case(term)
+                if not pattern:
+                    continue
+                state = 0
+                for ch in pattern:
+                    next_state = trie[state].get(ch)
+                    if next_state is None:
+                        next_state = len(trie)
+                        trie[state][ch] = next_state
+                        trie.append({})
+                        outputs.append([])
+                    state = next_state
+                entry = (kind, pattern, len(pattern))
+                if entry not in outputs[state]:
+                    outputs[state].append(entry)
+
+        # Breadth-first: failure links, merged outputs and a complete goto table
+        fail = [0] * len(trie)
+        delta: List[Dict[str, int]] = [dict(trie[0])] + [{} for _ in trie[1:]]
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state].extend(e for e in outputs[fail[state]] if e not in outputs[state])
+            delta[state] = dict(delta[fail[state]])
+            for ch, child in trie[state].items():
+                delta[state][ch] = child
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = [tuple(o) for o in outputs]
+
+    def scan(self, title: str) -> ScanResult:
+        """Find every dictionary term in the title in a single pass"""
+        if not title:
+            return ScanResult('', [])
+
+        cached = self._cache.get(title)
+        if cached is not None:
+            return cached
+
+        text = fold_case(title)
+        delta = self._delta
+        outputs = self._outputs
+        length = len(text)
+        hits = []
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                end = i + 1
+                for kind, term, term_length in outputs[state]:
+                    start = end - term_length
+                    # \b on both sides: word-ness flips across each edge of the hit
+                    before = start > 0 and _is_word_char(text[start - 1])
+                    after = end < length and _is_word_char(text[end])
+                    whole_word = before != _is_word_char(term[0]) and after != _is_word_char(term[-1])
+                    hits.append(Hit(kind, term, start, end, whole_word))
+
+        result = ScanResult(text, hits)
+        if len(self._cache) >= self.MAX_CACHED_TITLES:
+            self._cache.clear()
+        self._cache[title] = result
+        return result
+
+
+_scanner = None
+_scanner_lock = threading.Lock()
+
+
+def get_title_scanner() -> TitleScanner:
+    """Process-wide scanner built from the shared dictionaries"""
+    global _scanner
+    if _scanner is None:
+        with _scanner_lock:
+            if _scanner is None:
+                _scanner = TitleScanner({
+                    'vocab': CONSTRUCTION_VOCAB.keys(),
+                    'tile_pattern': TILE_PATTERN_CATEGORIES.keys(),
+                    'color': COLORS,
+                    'brand': KNOWN_BRANDS,
+                    'unit': UNITS,
+                    'product_type': [k for keywords in PRODUCT_TYPE_KEYWORDS.values() for k in keywords],
+                })
+    return _scanner
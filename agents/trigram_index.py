@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from typing import Dict, List, Set, Tuple
+
+
+def fold_token_text(text: str) -> str:
+    """Upper-case and strip accents so POLIÉSTIRENO and POLIESTIRENO compare equal"""
+    text = unicodedata.normalize('NFKD', text.upper())
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+class TrigramIndex:
+    """Character-trigram posting index over the words of category names.
+
+    Words are padded with '$' so prefixes and suffixes get their own
+    trigrams. A query word retrieves candidate tokens through shared
+    trigrams and is scored with the Dice coefficient, which absorbs typos and
+    accent differences. A query word that is a prefix of a token (ERP
+    abbreviations such as TOR., GALV) scores at least PREFIX_SIMILARITY.
+    """
+
+    MIN_SIMILARITY = 0.5
+    PREFIX_SIMILARITY = 0.8
+    MAX_CACHED_WORDS = 100000
+
+    def __init__(self, names: List[str]):
+        """names: one category name per row, in row order"""
+        self.tokens: List[str] = []
+        self._token_ids: Dict[str, int] = {}
+        self._token_trigrams: List[Set[str]] = []
+        # token id -> row ids whose name contains the token
+        self._token_rows: List[List[int]] = []
+        # trigram -> token ids
+        self._postings: Dict[str, List[int]] = {}
+        self._word_cache: Dict[str, List[Tuple[int, float]]] = {}
+
+        for row_id, name in enumerate(names):
+            for token in set(re.findall(r'[A-Z0-9]+', fold_token_text(name or ''))):
+                token_id = self._token_ids.get(token)
+                if token_id is None:
+                    token_id = self._add_token(token)
+                self._token_rows[token_id].append(row_id)
+
+    @staticmethod
+    def trigrams(word: str) -> Set[str]:
+        """Trigrams of the word padded as $$WORD$"""
+        padded = f"$${word}$"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _add_token(self, token: str) -> int:
+        token_id = len(self.tokens)
+        self.tokens.append(token)
+        self._token_ids[token] = token_id
+        self._token_trigrams.append(self.trigrams(token))
+        self._token_rows.append([])
+        for trigram in self._token_trigrams[token_id]:
+            self._postings.setdefault(trigram, []).append(token_id)
+        return token_id
+
+    @staticmethod
+    def query_words(text: str) -> List[str]:
+        """Meaningful words of a free-text query: 3+ characters, or 2 with a trailing dot (AR.)"""
+        return [
+            word for word, dot in re.findall(r'([A-Z0-9]+)(\.?)', fold_token_text(text or ''))
+            if len(word) > 2 or (dot and len(word) == 2)
+        ]
+
+    def similar_tokens(self, word: str) -> List[Tuple[int, float]]:
+        """(token id, similarity) of every indexed token close enough to word"""
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+
+        query = self.trigrams(word)
+        # Every prefix of a token shares its leading $$X and $XY trigrams,
+        # so abbreviations are always among the candidates
+        shared: Dict[int, int] = {}
+        for trigram in query:
+            for token_id in self._postings.get(trigram, ()):
+                shared[token_id] = shared.get(token_id, 0) + 1
+
+        similar = []
+        for token_id, overlap in shared.items():
+            similarity = 2 * overlap / (len(query) + len(self._token_trigrams[token_id]))
+            if self.tokens[token_id].startswith(word):
+                similarity = max(similarity, self.PREFIX_SIMILARITY)
+            if similarity >= self.MIN_SIMILARITY:
+                similar.append((token_id, similarity))
+
+        if len(self._word_cache) >= self.MAX_CACHED_WORDS:
+            self._word_cache.clear()
+        self._word_cache[word] = similar
+        return similar
+
+    def score(self, words: List[str]) -> Dict[int, float]:
+        """Per row: sum over query words of len(word) * best token similarity in that row"""
+        scores: Dict[int, float] = {}
+        for word in words:
+            best: Dict[int, float] = {}
+            for token_id, similarity in self.similar_tokens(word):
+                for row_id in self._token_rows[token_id]:
+                    if similarity > best.get(row_id, 0.0):
+                        best[row_id] = similarity
+            for row_id, similarity in best.items():
+                scores[row_id] = scores.get(row_id, 0.0) + len(word) * similarity
+        return scores
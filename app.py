@@ -3,16 +3,24 @@ from flask_cors import CORS
 import os
 import sys
 import traceback
-import time
 import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
+import io
+import json
+import shutil
+import tempfile
+import threading
 # Add this near the top of app.py after imports
 from dotenv import load_dotenv
 load_dotenv()  # This loads the .env file
 # Add this import at the top
 from processing_reviewer import ProcessingReviewer
+from agents.taxonomy_registry import get_registry
+from agents.instrumentation import get_metrics
+from agents.research_engine import ResearchEngine
+from agents.job_queue import JobQueue, JobStore
 
 # Add the current directory to Python path so we can import our modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -36,6 +44,29 @@ class SafeEnhancedTitleGenerator:
             # Create a safe fallback title
             return self._create_safe_fallback_title(product_data, category_info)
 
+    def generate_ecommerce_titles(self, batch: List[Tuple[Dict, Dict]]) -> List[str]:
+        """Safe wrapper for concurrent batch generation, validated per item"""
+        try:
+            titles = self.original_generator.generate_ecommerce_titles(batch)
+        except Exception as e:
+            print(f"   ⚠️  Batch generation failed ({e}), generating items one by one")
+            return [self.generate_ecommerce_title(product_data, category_info) for product_data, category_info in batch]
+
+        safe_titles = []
+        for (product_data, category_info), title in zip(batch, titles):
+            if title and isinstance(title, str) and len(title.strip()) > 0:
+                safe_titles.append(title.strip())
+            else:
+                print("   ⚠️  Enhanced generation returned an empty title, using fallback")
+                safe_titles.append(self._create_safe_fallback_title(product_data, category_info))
+        return safe_titles
+
+    def get_processing_stats(self) -> Dict:
+        """Expose the wrapped generator's API and cache statistics"""
+        if hasattr(self.original_generator, 'get_processing_stats'):
+            return self.original_generator.get_processing_stats()
+        return {}
+
     def _create_safe_fallback_title(self, product_data: Dict, category_info: Dict) -> str:
         """Create a safe fallback title when enhanced generation fails"""
         parts = []
@@ -83,6 +114,8 @@ try:
     from agents.tile_fixed_classifier import TileFixedCategoryClassifier
     from agents.enhanced_title_generator import EnhancedTitleGenerator
     from agents.label_formatter import LabelFormatter
+    from agents.research_cache import ResearchCache
+    from agents.research_policy import ResearchPolicy
     
     class SimpleTilePipeline:
         def __init__(self):
@@ -90,7 +123,19 @@ try:
             
             # Wrap the enhanced generator with safety
             try:
-                original_generator = EnhancedTitleGenerator(os.getenv('OPENAI_API_KEY'))
+                original_generator = EnhancedTitleGenerator(
+                    os.getenv('OPENAI_API_KEY'),
+                    max_in_flight=int(os.getenv('RESEARCH_MAX_IN_FLIGHT', '8')),
+                    requests_per_second=float(os.getenv('RESEARCH_REQUESTS_PER_SECOND', '5')),
+                    cache=ResearchCache(os.getenv('RESEARCH_CACHE_PATH', 'data/research_cache.sqlite')),
+                    research_policy=ResearchPolicy(
+                        enabled=os.getenv('RESEARCH_BYPASS_ENABLED', '1') != '0',
+                        min_confidence=float(os.getenv('RESEARCH_BYPASS_MIN_CONFIDENCE', '0.8'))
+                    ),
+                    pack_size=int(os.getenv('RESEARCH_PACK_SIZE', '10')),
+                    template_min_coverage=(float(os.environ['TEMPLATE_MIN_COVERAGE'])
+                                           if os.getenv('TEMPLATE_MIN_COVERAGE') else None)
+                )
                 self.generator = SafeEnhancedTitleGenerator(original_generator)
                 print("✓ Using Enhanced TitleGenerator with safety wrapper")
             except Exception as e:
@@ -101,33 +146,109 @@ try:
                 print("✓ Using basic TitleGenerator as fallback")
             
             self.formatter = LabelFormatter()
+            # Extra label widths exported alongside the store label (shelf talkers, POS lines)
+            self.label_widths = [int(width) for width in os.getenv('LABEL_WIDTHS', '24,36,50').split(',') if width.strip()]
+            self.metrics = get_metrics()
         
         def process_raw_title(self, title):
+            return self.process_raw_titles([title])[0]
+        
+        def process_raw_titles(self, titles: List[str]) -> List[Dict]:
+            """Process many titles; research for all matched titles runs concurrently"""
+            results = [None] * len(titles)
+            pending = []
+            
+            products = [{'description': title, 'original_title': title} for title in titles]
+            for i, (title, product_data, category_match) in enumerate(zip(titles, products, self.classify_products(products))):
+                if isinstance(category_match, Exception):
+                    print(f"   ⚠️  Processing error for '{title}': {category_match}")
+                    results[i] = {'success': False, 'errors': [str(category_match)], 'input_title': title}
+                elif not category_match:
+                    results[i] = {'success': False, 'errors': ['No category found'], 'input_title': title}
+                else:
+                    pending.append((i, product_data, category_match))
+            
+            # This will now use the safe wrapper
+            optimized_titles = self.generate_titles([(product_data, category_match) for _, product_data, category_match in pending])
+            
+            for (i, product_data, category_match), optimized_title in zip(pending, optimized_titles):
+                title = titles[i]
+                try:
+                    if not optimized_title:
+                        results[i] = {'success': False, 'errors': ['Title generation failed'], 'input_title': title}
+                        continue
+                    
+                    label_variants = self.format_label_variants(optimized_title)
+                    
+                    results[i] = {
+                        'success': True,
+                        'input_title': title,
+                        'optimized_title': optimized_title,
+                        'store_label': label_variants[self.formatter.max_length],
+                        'label_variants': label_variants,
+                        'category_match': category_match,
+                        'needs_reenrichment': bool(product_data.get('needs_reenrichment'))
+                    }
+                except Exception as e:
+                    print(f"   ⚠️  Processing error for '{title}': {e}")
+                    results[i] = {'success': False, 'errors': [str(e)], 'input_title': title}
+            
+            self.resolve_label_collisions(results)
+            return results
+        
+        def classify_products(self, products: List[Dict]) -> List:
+            """Batch-classify products; if the batch fails, retry one by one so only bad items fail
+            
+            Each entry is a category match, None, or the exception raised for that product.
+            """
             try:
-                product_data = {'description': title, 'original_title': title}
-                
-                category_match = self.classifier.find_category_match(product_data)
-                if not category_match:
-                    return {'success': False, 'errors': ['No category found'], 'input_title': title}
-                
-                # This will now use the safe wrapper
-                optimized_title = self.generator.generate_ecommerce_title(product_data, category_match)
-                
-                if not optimized_title:
-                    return {'success': False, 'errors': ['Title generation failed'], 'input_title': title}
-                
-                store_label = self.formatter.format_store_label(optimized_title)
-                
-                return {
-                    'success': True,
-                    'input_title': title,
-                    'optimized_title': optimized_title,
-                    'store_label': store_label,
-                    'category_match': category_match
-                }
+                with self.metrics.span('classify', 'simple_tile', items=len(products)):
+                    matches = self.classifier.find_category_matches(products)
             except Exception as e:
-                print(f"   ⚠️  Processing error for '{title}': {e}")
-                return {'success': False, 'errors': [str(e)], 'input_title': title}
+                print(f"   ⚠️  Batch classification failed, retrying per title: {e}")
+                matches = []
+                for product_data in products:
+                    try:
+                        with self.metrics.span('classify', 'simple_tile'):
+                            matches.append(self.classifier.find_category_match(product_data))
+                    except Exception as item_error:
+                        matches.append(item_error)
+            
+            for match in matches:
+                if not isinstance(match, Exception):
+                    self.metrics.record_match('simple_tile', match)
+            return matches
+        
+        def generate_titles(self, batch: List[Tuple[Dict, Dict]]) -> List[str]:
+            """Generate titles for (product_data, category_match) pairs, in order"""
+            with self.metrics.span('generate', 'simple_tile', items=len(batch)):
+                if hasattr(self.generator, 'generate_ecommerce_titles'):
+                    return self.generator.generate_ecommerce_titles(batch)
+                return [self.generator.generate_ecommerce_title(product_data, category_match) for product_data, category_match in batch]
+        
+        def format_store_label(self, optimized_title: str) -> str:
+            with self.metrics.span('label', 'simple_tile'):
+                return self.formatter.format_store_label(optimized_title)
+        
+        def format_label_variants(self, optimized_title: str) -> Dict[int, str]:
+            """Store label plus every LABEL_WIDTHS variant, from one formatting pass"""
+            with self.metrics.span('label', 'simple_tile'):
+                widths = sorted(set(self.label_widths) | {self.formatter.max_length})
+                return self.formatter.format_label_variants(optimized_title, widths)
+        
+        def resolve_label_collisions(self, results: List[Dict]):
+            """Relabel different titles that share a label, separately for every label width"""
+            labeled = [result for result in results if result and result.get('label_variants')]
+            with self.metrics.span('label_collisions', 'simple_tile', items=len(labeled)):
+                for width in sorted({width for result in labeled for width in result['label_variants']}):
+                    batch = [result for result in labeled if width in result['label_variants']]
+                    labels = self.formatter.disambiguate_labels([result['optimized_title'] for result in batch],
+                                                                [result['label_variants'][width] for result in batch],
+                                                                width)
+                    for result, label in zip(batch, labels):
+                        result['label_variants'][width] = label
+                        if width == self.formatter.max_length:
+                            result['store_label'] = label
     
     CompletePipeline = SimpleTilePipeline
     print("✓ Tile-aware pipeline loaded successfully")
@@ -157,6 +278,18 @@ except FileNotFoundError:
 def index():
     return html_content
 
+def _processing_error_result(title: str, error: Exception) -> Dict:
+    """Result entry for a title that raised during processing"""
+    print(f"Error processing title '{title}': {str(error)}")
+    return {
+        'input_title': title,
+        'success': False,
+        'category_match': None,
+        'optimized_title': None,
+        'store_label': None,
+        'errors': [f'Processing error: {str(error)}']
+    }
+
 @app.route('/process', methods=['POST'])
 def process_file():
     try:
@@ -192,7 +325,7 @@ def process_file():
                 if processing_type == 'messy':
                     try:
                         from agents.smart_messy_parser import SmartMessyParser
-                        messy_parser = SmartMessyParser()
+                        messy_parser = get_registry().get_or_build('smart_messy_parser', SmartMessyParser)
                         products = []
                         for line in lines:
                             if line.strip():
@@ -239,67 +372,68 @@ def process_file():
             }), 400
         print(f"Found {len(titles)} titles to process")
 
-        # Initialize pipeline
+        # Get the shared pipeline (built once, rebuilt only if the taxonomy CSV changes)
         try:
-            pipeline = CompletePipeline()
+            pipeline = get_registry().get_or_build('pipeline', CompletePipeline)
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': f'Error initializing pipeline: {str(e)}'
             }), 500
 
-        # Process titles
-        results = []
-        successful = 0
-        for i, title in enumerate(titles):
-            print(f"Processing title {i+1}/{len(titles)}: {title}")
-            try:
-                if processing_type == 'messy':
-                    result = pipeline.process_raw_title(title)
+        # Process titles: classification is local, then title research for the
+        # whole upload runs concurrently through the generator's batch API
+        if processing_type == 'messy':
+            results = pipeline.process_raw_titles(titles)
+        else:
+            results = [None] * len(titles)
+            pending = []
+            products = []
+            for i, title in enumerate(titles):
+                if 'structured_products' in locals() and structured_products and i < len(structured_products):
+                    products.append(structured_products[i])
                 else:
-                    if 'structured_products' in locals() and structured_products and i < len(structured_products):
-                        product_data = structured_products[i]
-                        print(f"   Using structured data: Dept={product_data.get('departamento', 'N/A')}, Cat={product_data.get('categoria', 'N/A')}")
-                    else:
-                        product_data = {
-                            'description': title,
-                            'original_title': title
-                        }
-                    category_match = pipeline.classifier.find_category_match(product_data)
-                    if category_match:
-                        optimized_title = pipeline.generator.generate_ecommerce_title(product_data, category_match)
-                        store_label = pipeline.formatter.format_store_label(optimized_title) if optimized_title else None
-                        result = {
-                            'input_title': title,
-                            'success': bool(optimized_title and store_label),
-                            'category_match': category_match,
-                            'optimized_title': optimized_title,
-                            'store_label': store_label,
-                            'errors': [] if optimized_title and store_label else ['Failed to generate title or label']
-                        }
-                    else:
-                        result = {
-                            'input_title': title,
-                            'success': False,
-                            'category_match': None,
-                            'optimized_title': None,
-                            'store_label': None,
-                            'errors': ['No category match found']
-                        }
-                results.append(result)
-                if result.get('success', False):
-                    successful += 1
-                time.sleep(0.1)
-            except Exception as e:
-                print(f"Error processing title '{title}': {str(e)}")
-                results.append({
-                    'input_title': title,
-                    'success': False,
-                    'category_match': None,
-                    'optimized_title': None,
-                    'store_label': None,
-                    'errors': [f'Processing error: {str(e)}']
-                })
+                    products.append({
+                        'description': title,
+                        'original_title': title
+                    })
+            
+            print(f"Classifying {len(products)} titles")
+            for i, (title, product_data, category_match) in enumerate(zip(titles, products, pipeline.classify_products(products))):
+                if isinstance(category_match, Exception):
+                    results[i] = _processing_error_result(title, category_match)
+                elif category_match:
+                    pending.append((i, product_data, category_match))
+                else:
+                    results[i] = {
+                        'input_title': title,
+                        'success': False,
+                        'category_match': None,
+                        'optimized_title': None,
+                        'store_label': None,
+                        'errors': ['No category match found']
+                    }
+
+            optimized_titles = pipeline.generate_titles([(product_data, category_match) for _, product_data, category_match in pending])
+            for (i, product_data, category_match), optimized_title in zip(pending, optimized_titles):
+                title = titles[i]
+                try:
+                    label_variants = pipeline.format_label_variants(optimized_title) if optimized_title else {}
+                    store_label = label_variants.get(pipeline.formatter.max_length)
+                    results[i] = {
+                        'input_title': title,
+                        'success': bool(optimized_title and store_label),
+                        'category_match': category_match,
+                        'optimized_title': optimized_title,
+                        'store_label': store_label,
+                        'label_variants': label_variants,
+                        'errors': [] if optimized_title and store_label else ['Failed to generate title or label'],
+                        'needs_reenrichment': bool(product_data.get('needs_reenrichment'))
+                    }
+                except Exception as e:
+                    results[i] = _processing_error_result(title, e)
+            pipeline.resolve_label_collisions(results)
+        successful = sum(1 for result in results if result.get('success', False))
 # Add processing review and quality analysis
         print(f"\n📊 ANALYZING PROCESSING QUALITY...")
         reviewer = ProcessingReviewer()
@@ -336,6 +470,293 @@ def process_file():
             'success': False,
             'error': f'Server error: {str(e)}'
         }), 500
+def _iter_upload_lines(stream) -> Iterator[str]:
+    """Yield stripped, non-empty lines of a binary text stream without loading it whole"""
+    stream.seek(0)
+    reader = io.TextIOWrapper(stream, encoding='utf-8', newline=None)
+    try:
+        for line in reader:
+            if line.strip():
+                yield line.strip()
+    finally:
+        reader.detach()  # Leave the underlying stream open
+
+def _open_title_stream(file, processing_type: str) -> Tuple[Iterator[str], Optional[int]]:
+    """Return a lazy title iterator for an upload plus its title count"""
+    filename = file.filename.lower()
+    if filename.endswith('.csv') or filename.endswith('.txt'):
+        # Own a disk-backed copy: Flask may close the upload once the view returns
+        upload = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        shutil.copyfileobj(file.stream, upload)
+
+        # Counting pass also surfaces encoding errors before any output is sent
+        total = sum(1 for _ in _iter_upload_lines(upload))
+        lines = _iter_upload_lines(upload)
+        if filename.endswith('.csv') and processing_type == 'messy':
+            try:
+                from agents.smart_messy_parser import SmartMessyParser
+                messy_parser = get_registry().get_or_build('smart_messy_parser', SmartMessyParser)
+                return (messy_parser.parse_messy_title(line)['original_title'] for line in lines), total
+            except ImportError:
+                print("SmartMessyParser not available, falling back to simple parsing")
+        return lines, total
+    elif filename.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file)
+        titles = df[df.columns[0]].dropna().astype(str).tolist() if not df.empty else []
+        return iter(titles), len(titles)
+    raise ValueError('Unsupported file format. Please use CSV, Excel, or TXT files. Please use UTF-8 encoded files.')
+
+def _process_single_title(pipeline, title: str, processing_type: str) -> Dict:
+    """Process one title the same way /process does"""
+    if processing_type == 'messy':
+        return pipeline.process_raw_title(title)
+
+    product_data = {'description': title, 'original_title': title}
+    category_match = pipeline.classify_products([product_data])[0]
+    if isinstance(category_match, Exception):
+        raise category_match
+    if not category_match:
+        return {
+            'input_title': title,
+            'success': False,
+            'category_match': None,
+            'optimized_title': None,
+            'store_label': None,
+            'errors': ['No category match found']
+        }
+
+    optimized_title = pipeline.generate_titles([(product_data, category_match)])[0]
+    label_variants = pipeline.format_label_variants(optimized_title) if optimized_title else {}
+    store_label = label_variants.get(pipeline.formatter.max_length)
+    return {
+        'input_title': title,
+        'success': bool(optimized_title and store_label),
+        'category_match': category_match,
+        'optimized_title': optimized_title,
+        'store_label': store_label,
+        'label_variants': label_variants,
+        'errors': [] if optimized_title and store_label else ['Failed to generate title or label'],
+        'needs_reenrichment': bool(product_data.get('needs_reenrichment'))
+    }
+
+def _stream_event(event: str, payload: Dict, use_sse: bool) -> str:
+    """Encode one streamed event as an SSE frame or an NDJSON line"""
+    if use_sse:
+        return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+    return json.dumps(dict(payload, type=event), ensure_ascii=False, default=str) + '\n'
+
+# Item-level workers for streamed uploads (title research has its own pool)
+_stream_engine = ResearchEngine(max_in_flight=int(os.getenv('STREAM_MAX_IN_FLIGHT', '8')))
+
+@app.route('/process/stream', methods=['POST'])
+def process_file_stream():
+    """Stream each result as soon as it is ready, then a quality summary
+    
+    Emits NDJSON by default, or Server-Sent Events when the client sends
+    Accept: text/event-stream or ?format=sse. Results are never collected
+    server side, so memory stays flat regardless of upload size.
+    """
+    if CompletePipeline is None:
+        return jsonify({
+            'success': False,
+            'error': 'Pipeline not available. Check imports and dependencies.'
+        }), 500
+
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No file uploaded'
+        }), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'No file selected'
+        }), 400
+
+    processing_type = request.form.get('type', 'messy')
+    use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    print(f"Streaming file: {file.filename}, Type: {processing_type}")
+
+    try:
+        titles, total = _open_title_stream(file, processing_type)
+    except UnicodeDecodeError:
+        return jsonify({
+            'success': False,
+            'error': 'File encoding error. Please use UTF-8 encoded files.'
+        }), 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'File parsing error: {str(e)}'
+        }), 400
+
+    try:
+        pipeline = get_registry().get_or_build('pipeline', CompletePipeline)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error initializing pipeline: {str(e)}'
+        }), 500
+
+    def generate():
+        reviewer = ProcessingReviewer()
+        analysis = reviewer.start_analysis()
+        yield _stream_event('start', {'total': total, 'processing_type': processing_type}, use_sse)
+
+        results = _stream_engine.imap(
+            lambda title: _process_single_title(pipeline, title, processing_type),
+            titles,
+            fallback=_processing_error_result
+        )
+        for index, result in enumerate(results):
+            reviewer.add_result_to_analysis(analysis, result, index + 1)
+            yield _stream_event('result', {'index': index, 'result': result}, use_sse)
+
+        analysis = reviewer.finish_analysis(analysis)
+        summary = {
+            'success': True,
+            'total': analysis['total_processed'],
+            'successful': analysis['successful'],
+            'errors': analysis['failed'],
+            'analysis': analysis
+        }
+        if hasattr(pipeline.generator, 'get_processing_stats'):
+            summary['api_stats'] = pipeline.generator.get_processing_stats()
+        yield _stream_event('summary', summary, use_sse)
+
+    mimetype = 'text/event-stream' if use_sse else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
+
+# Background jobs for large uploads, started on the first request
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Return the shared job queue, starting its workers (and resuming jobs) once"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                lambda title, processing_type: _process_single_title(
+                    get_registry().get_or_build('pipeline', CompletePipeline), title, processing_type),
+                store=JobStore(os.getenv('JOB_DB_PATH', 'data/jobs.sqlite')),
+                resolve_label_collisions=lambda results: get_registry().get_or_build(
+                    'pipeline', CompletePipeline).resolve_label_collisions(results),
+                max_concurrent_jobs=int(os.getenv('JOB_MAX_CONCURRENT', '2')),
+                max_in_flight=int(os.getenv('JOB_MAX_IN_FLIGHT', '8'))
+            )
+        _job_queue.start()
+    return _job_queue
+
+@app.before_request
+def resume_jobs():
+    """Resume unfinished jobs on the first request of any kind, not just the first /jobs call"""
+    if _job_queue is None and CompletePipeline is not None:
+        get_job_queue()
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue an uploaded file for background processing"""
+    if CompletePipeline is None:
+        return jsonify({
+            'success': False,
+            'error': 'Pipeline not available. Check imports and dependencies.'
+        }), 500
+
+    if 'file' not in request.files:
+        return jsonify({
+            'success': False,
+            'error': 'No file uploaded'
+        }), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({
+            'success': False,
+            'error': 'No file selected'
+        }), 400
+
+    processing_type = request.form.get('type', 'messy')
+
+    try:
+        titles, total = _open_title_stream(file, processing_type)
+        job_id = get_job_queue().submit(titles, processing_type, file.filename)
+    except UnicodeDecodeError:
+        return jsonify({
+            'success': False,
+            'error': 'File encoding error. Please use UTF-8 encoded files.'
+        }), 400
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Error creating job: {str(e)}'
+        }), 500
+
+    print(f"Queued job {job_id}: {file.filename} ({total} titles, type: {processing_type})")
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total': total,
+        'status_url': f'/jobs/{job_id}',
+        'results_url': f'/jobs/{job_id}/results'
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Progress of a background job"""
+    job = get_job_queue().store.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(dict(job, success=True))
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Paginated results of a background job (?offset=0&limit=100)"""
+    store = get_job_queue().store
+    job = store.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(1000, max(1, int(request.args.get('limit', 100))))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'offset and limit must be integers'}), 400
+
+    results = store.get_results(job_id, offset, limit)
+    next_offset = offset + len(results)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'offset': offset,
+        'limit': limit,
+        'results': results,
+        'next_offset': next_offset if next_offset < job['processed'] else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage timings and match-type histograms in Prometheus text format"""
+    return Response(get_metrics().render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -357,4 +778,8 @@ if __name__ == '__main__':
     print(f"Frontend available: {os.path.exists('frontend.html')}")
     print(f"Pipeline available: {CompletePipeline is not None}")
     
+    # Resume unfinished jobs right away (only in the reloader's serving process)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and CompletePipeline is not None:
+        get_job_queue()
+    
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,380 @@
+# benchmark_pipeline.py - Throughput/latency benchmark for the title pipeline
+"""
+Runs every pipeline stage over synthetic catalogs built from
+data/nomenclatura_gorila.csv and prints a JSON report with titles/sec,
+p50/p95/p99 latency and peak RSS per stage.
+
+LLM research goes through FakeOpenAIClient, a deterministic offline stand-in
+with configurable latency and error rate, so runs are free and repeatable.
+
+Usage:
+    python benchmark_pipeline.py --sizes 1000,10000,100000 --output bench.json
+    python benchmark_pipeline.py --sizes 1000 --llm-latency 0.05 --llm-error-rate 0.1
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from agents.category_classifier import CategoryClassifier
+from agents.circuit_breaker import CircuitBreaker
+from agents.enhanced_title_generator import RobustEnhancedTitleGenerator
+from agents.improved_category_classifier import ImprovedCategoryClassifier
+from agents.label_formatter import LabelFormatter
+from agents.research_policy import ResearchPolicy
+from agents.smart_messy_parser import SmartMessyParser
+from agents.tile_fixed_classifier import TileFixedCategoryClassifier
+
+CSV_PATH = "data/nomenclatura_gorila.csv"
+
+COLORS = ['BLANCO', 'NEGRO', 'GRIS', 'AZUL', 'ROJO', 'BEIGE', 'CAFE', 'AMARILLO', 'VERDE', 'PLATA']
+SIZES = ['10X10', '20X20', '21X31', '30X60', '45X45', '60X60', '1/4', '3/8', '1/2', '100PZ', '2M', '50M']
+BRANDS = ['TRUPER', 'BOSCH', 'MAKITA', 'DEWALT', 'STANLEY', 'URREA', 'INTERCERAMIC', 'VITROMEX']
+
+
+class FakeOpenAIClient:
+    """Deterministic stand-in for openai.OpenAI used by the research calls.
+
+    Mimics client.chat.completions.create(). Every call sleeps for `latency`
+    seconds (plus up to `jitter`), and whether it fails is decided by hashing
+    the prompt, its attempt number and the seed, so the same catalog fails on
+    the same calls on every run regardless of thread scheduling. Successful
+    calls return the research JSON the prompt asks for; packed prompts get a
+    JSON array, costing `item_latency` more per product, from which
+    `drop_rate` of the items are left out.
+    """
+
+    def __init__(self, latency: float = 0.02, error_rate: float = 0.0, jitter: float = 0.0, seed: int = 0,
+                 item_latency: float = 0.0, drop_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.jitter = jitter
+        self.seed = seed
+        self.item_latency = item_latency
+        self.drop_rate = drop_rate
+        self.calls = 0
+        self.errors = 0
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _fraction(self, text: str, salt: str) -> float:
+        digest = hashlib.sha1(f"{self.seed}:{salt}:{text}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+    def _create(self, model: str = None, messages: List[Dict] = None, **kwargs):
+        prompt = messages[-1]['content'] if messages else ''
+        with self._lock:
+            self.calls += 1
+            # Per-prompt attempt number, so retries of a failing prompt can succeed
+            attempt = self._attempts.get(prompt, 0)
+            self._attempts[prompt] = attempt + 1
+
+        packed = re.findall(r'^\[(\d+)\] (.+)$', prompt, re.MULTILINE)
+        delay = self.latency + self.jitter * self._fraction(f"{prompt}:{attempt}", 'jitter')
+        delay += self.item_latency * max(1, len(packed))
+        if delay > 0:
+            time.sleep(delay)
+
+        if self._fraction(f"{prompt}:{attempt}", 'error') < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise RuntimeError("Fake API error (simulated)")
+
+        if packed:
+            content = json.dumps([
+                dict(self._research(product), id=item_id) for item_id, product in packed
+                if self._fraction(f"{product}:{attempt}", 'drop') >= self.drop_rate
+            ])
+        else:
+            match = re.search(r'product:\s*(.+)', prompt)
+            content = json.dumps(self._research(match.group(1) if match else 'Producto'))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+    @staticmethod
+    def _research(product: str) -> Dict:
+        return {
+            'verified_product_type': product.strip().split('  ')[0][:40].title(),
+            'product_category': 'CONSTRUCCION',
+            'is_construction_hardware': True,
+            'confidence': 0.8
+        }
+
+
+def generate_catalog(size: int, csv_path: str = CSV_PATH, seed: int = 42) -> List[str]:
+    """Build `size` synthetic raw titles from the taxonomy's example titles.
+
+    About half the titles carry the taxonomy path glued on at the end
+    (as messy exports do), the rest are plain product titles.
+    """
+    rng = random.Random(seed)
+    df = pd.read_csv(csv_path, encoding='utf-8-sig')
+    df.columns = df.columns.str.strip()
+    df = df.dropna(subset=['Departamento', 'Familia', 'Categoria', 'Ejemplo aplicado'])
+
+    rows = list(zip(df['Departamento'], df['Familia'], df['Categoria'], df['Ejemplo aplicado']))
+    titles = []
+    for _ in range(size):
+        dept, family, category, example = rng.choice(rows)
+        words = re.sub(r'[^A-Z0-9\s/]', ' ', example.upper()).split()[:4]
+        words.append(rng.choice(COLORS))
+        if rng.random() < 0.5:
+            words.append(rng.choice(SIZES))
+        if rng.random() < 0.3:
+            words.append(rng.choice(BRANDS))
+        title = ' '.join(words)
+
+        if rng.random() < 0.5:
+            title = f"{title}{dept.strip()} {family.strip()} {category.strip()}"
+        titles.append(title)
+    return titles
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(name: str, count: int, elapsed: float, latencies: List[float] = None, **extra) -> Dict:
+    """Stage report: throughput over wall time plus per-title latency percentiles"""
+    report = {
+        'stage': name,
+        'titles': count,
+        'seconds': round(elapsed, 4),
+        'titles_per_sec': round(count / elapsed, 1) if elapsed > 0 else None,
+    }
+    if latencies:
+        ordered = sorted(latencies)
+        report.update({
+            'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        })
+    report['peak_rss_mb'] = peak_rss_mb()
+    report.update(extra)
+    return report
+
+
+def time_each(func: Callable, items: List) -> Dict:
+    """Call func on every item, recording per-item latency and wall time"""
+    results = []
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - t0)
+    return {'results': results, 'latencies': latencies, 'elapsed': time.perf_counter() - start}
+
+
+def bench_catalog(titles: List[str], components: Dict, args) -> List[Dict]:
+    """Run every stage over one catalog and return the stage reports"""
+    stages = []
+    with open(os.devnull, 'w') as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        # Stage 1: messy parsing
+        run = time_each(components['parser'].parse_messy_title, titles)
+        parsed = run['results']
+        stages.append(summarize('parse:SmartMessyParser', len(titles), run['elapsed'], run['latencies']))
+
+        # Stage 2: every classifier, one title at a time and as a single batch
+        matches = None
+        for name in ['CategoryClassifier', 'ImprovedCategoryClassifier', 'TileFixedCategoryClassifier']:
+            classifier = components[name]
+            run = time_each(lambda p: classifier.find_category_match(dict(p)), parsed)
+            stages.append(summarize(f'classify:{name}', len(parsed), run['elapsed'], run['latencies'],
+                                    matched=sum(1 for m in run['results'] if m)))
+
+            start = time.perf_counter()
+            batch_matches = classifier.find_category_matches([dict(p) for p in parsed])
+            stages.append(summarize(f'classify_batch:{name}', len(parsed), time.perf_counter() - start,
+                                    matched=sum(1 for m in batch_matches if m)))
+            if name == 'TileFixedCategoryClassifier':
+                matches = batch_matches
+
+        # Stage 3: research + title generation against the fake LLM
+        generator = components['generator']
+        pairs = [(p, m) for p, m in zip(parsed, matches) if m]
+        if args.llm_limit is not None:
+            pairs = pairs[:args.llm_limit]
+
+        latencies = []
+
+        def timed_generate(pair):
+            t0 = time.perf_counter()
+            title = generator.generate_ecommerce_title(pair[0], pair[1])
+            latencies.append(time.perf_counter() - t0)
+            return title
+
+        client = generator.client
+        calls_before, errors_before = client.calls, client.errors
+        saved_before = generator.research_policy.bypassed
+        short_circuited_before = generator.short_circuited
+        templated_before = generator.template_titles
+        start = time.perf_counter()
+        if generator.pack_size > 1:
+            # Packed research resolves whole packs at once, so only wall time is meaningful
+            generated = generator.generate_ecommerce_titles(pairs)
+        else:
+            generated = generator.research_engine.map(
+                timed_generate, pairs,
+                fallback=lambda pair, e: pair[0].get('original_title', 'Product')
+            )
+        stages.append(summarize('generate:RobustEnhancedTitleGenerator', len(pairs), time.perf_counter() - start,
+                                latencies, llm_calls=client.calls - calls_before,
+                                llm_errors=client.errors - errors_before,
+                                research_calls_saved=generator.research_policy.bypassed - saved_before,
+                                pack_size=generator.pack_size,
+                                short_circuited=generator.short_circuited - short_circuited_before,
+                                template_titles=generator.template_titles - templated_before,
+                                max_in_flight=generator.research_engine.max_in_flight))
+
+        # Stage 4: store labels
+        run = time_each(components['formatter'].format_store_label, generated)
+        stages.append(summarize('label:LabelFormatter', len(generated), run['elapsed'], run['latencies']))
+
+        formatter = components['formatter']
+        collisions_before = formatter.collisions_found
+        resolved_before = formatter.collisions_resolved
+        start = time.perf_counter()
+        formatter.format_store_labels(generated)
+        stages.append(summarize('label_batch:LabelFormatter', len(generated), time.perf_counter() - start,
+                                label_collisions=formatter.collisions_found - collisions_before,
+                                label_collisions_resolved=formatter.collisions_resolved - resolved_before))
+
+    return stages
+
+
+def build_components(args) -> Dict:
+    """Create each stage once, outside the timed sections"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        generator = RobustEnhancedTitleGenerator(
+            api_key=None, max_in_flight=args.max_in_flight,
+            research_policy=ResearchPolicy(enabled=args.research_policy == 'gated'),
+            pack_size=args.pack_size,
+            breaker=CircuitBreaker(failure_threshold=args.breaker_failures),
+            template_min_coverage=args.template_min_coverage
+        )
+        generator.client = FakeOpenAIClient(args.llm_latency, args.llm_error_rate, args.llm_jitter, args.seed,
+                                            args.llm_item_latency, args.llm_drop_rate)
+        generator.web_search_enabled = True
+        # Keep retry backoff proportional to the fake latency
+        generator.base_delay = args.llm_latency
+
+        return {
+            'parser': SmartMessyParser(args.csv),
+            'CategoryClassifier': CategoryClassifier(args.csv),
+            'ImprovedCategoryClassifier': ImprovedCategoryClassifier(args.csv),
+            'TileFixedCategoryClassifier': TileFixedCategoryClassifier(args.csv),
+            'generator': generator,
+            'formatter': LabelFormatter(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the title pipeline on synthetic catalogs")
+    parser.add_argument('--sizes', default='1000', help="Comma-separated catalog sizes, e.g. 1000,10000,100000")
+    parser.add_argument('--csv', default=CSV_PATH, help="Nomenclatura CSV used for the taxonomy and catalogs")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--llm-latency', type=float, default=0.02, help="Seconds per fake LLM call")
+    parser.add_argument('--llm-jitter', type=float, default=0.0, help="Extra random seconds per fake LLM call")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help="Fraction of fake LLM calls that fail")
+    parser.add_argument('--llm-limit', type=int, default=None, help="Only generate titles for the first N matches")
+    parser.add_argument('--llm-item-latency', type=float, default=0.0,
+                        help="Extra seconds per product in a fake LLM call (output tokens)")
+    parser.add_argument('--llm-drop-rate', type=float, default=0.0,
+                        help="Fraction of products a fake packed response leaves out")
+    parser.add_argument('--pack-size', type=int, default=1, help="Titles researched per LLM call")
+    parser.add_argument('--breaker-failures', type=int, default=5,
+                        help="Consecutive LLM failures that open the circuit breaker")
+    parser.add_argument('--template-min-coverage', type=float, default=None,
+                        help="Share of rule attribute slots a nomenclatura template must fill to skip research "
+                             "(off unless given)")
+    parser.add_argument('--max-in-flight', type=int, default=8, help="Concurrent research calls")
+    parser.add_argument('--research-policy', choices=['gated', 'always'], default='gated',
+                        help="'gated' skips research for high-confidence matches, 'always' researches every item")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's own progress output")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    print("⏱️  Building pipeline components...", file=sys.stderr)
+    components = build_components(args)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'seed': args.seed,
+            'llm_latency': args.llm_latency,
+            'llm_jitter': args.llm_jitter,
+            'llm_error_rate': args.llm_error_rate,
+            'llm_limit': args.llm_limit,
+            'max_in_flight': args.max_in_flight,
+            'llm_item_latency': args.llm_item_latency,
+            'llm_drop_rate': args.llm_drop_rate,
+            'pack_size': args.pack_size,
+            'breaker_failures': args.breaker_failures,
+            'template_min_coverage': args.template_min_coverage,
+            'research_policy': args.research_policy,
+        },
+        'runs': []
+    }
+
+    for size in sizes:
+        print(f"🚀 Benchmarking catalog of {size} titles...", file=sys.stderr)
+        titles = generate_catalog(size, args.csv, args.seed)
+        start = time.perf_counter()
+        stages = bench_catalog(titles, components, args)
+        report['runs'].append({
+            'catalog_size': size,
+            'total_seconds': round(time.perf_counter() - start, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages
+        })
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"💾 Report saved to: {args.output}", file=sys.stderr)
+
+    components['generator'].research_engine.shutdown()
+
+
+if __name__ == "__main__":
+    main()
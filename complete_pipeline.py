@@ -1,7 +1,9 @@
 from agents.title_parser import TitleParser
 from agents.category_classifier import CategoryClassifier
 from agents.enhanced_title_generator import EnhancedTitleGenerator 
+from agents.instrumentation import get_metrics
 from agents.label_formatter import LabelFormatter
+from agents.research_cache import ResearchCache
 from typing import Dict, List
 import json
 import pandas as pd
@@ -9,10 +11,12 @@ import pandas as pd
 class CompletePipeline:
     def __init__(self, openai_api_key: str = None):
         """Initialize the complete 4-agent pipeline"""
-        self.parser = TitleParser(openai_api_key)                   # NEW: Extract info from raw titles
-        self.classifier = CategoryClassifier()                      # Agent 1: Find category
-        self.generator = EnhancedTitleGenerator(openai_api_key)     # Agent 2: Generate titles
-        self.formatter = LabelFormatter()                           # Agent 3: Create labels
+        self.cache = ResearchCache()                                                # Persistent LLM response cache
+        self.parser = TitleParser(openai_api_key, cache=self.cache)                 # NEW: Extract info from raw titles
+        self.classifier = CategoryClassifier()                                      # Agent 1: Find category
+        self.generator = EnhancedTitleGenerator(openai_api_key, cache=self.cache)   # Agent 2: Generate titles
+        self.formatter = LabelFormatter()                                           # Agent 3: Create labels
+        self.metrics = get_metrics()                                                # Per-stage timings for /metrics
         
         print("✓ Complete pipeline initialized with 4 agents (Enhanced Title Generator)")
     
@@ -27,31 +31,26 @@ class CompletePipeline:
             Dict with all processing results
         """
         
-        result = {
-            'input_title': raw_title,
-            'parsed_data': None,
-            'category_match': None,
-            'optimized_title': None,
-            'store_label': None,
-            'success': False,
-            'errors': []
-        }
+        result = self._new_result(raw_title)
         
         try:
             # Step 1: Parse raw title into structured data
             print(f"🔍 Parsing: {raw_title}")
-            parsed_data = self.parser.parse_title_to_product_data(raw_title)
+            with self.metrics.span('parse', 'complete'):
+                parsed_data = self.parser.parse_title_to_product_data(raw_title)
             result['parsed_data'] = parsed_data
             
             print(f"   ✓ Extracted: {parsed_data.get('producto_tipo', 'Unknown type')}")
             
             # Step 2: Find category match
             print("📂 Finding category...")
-            category_match = self.classifier.find_category_match(parsed_data)
-            
-            if not category_match:
-                # Try fuzzy matching with keywords
-                category_match = self._fuzzy_category_search(parsed_data)
+            with self.metrics.span('classify', 'complete'):
+                category_match = self.classifier.find_category_match(parsed_data)
+                
+                if not category_match:
+                    # Try fuzzy matching with keywords
+                    category_match = self._fuzzy_category_search(parsed_data)
+            self.metrics.record_match('complete', category_match)
             
             if not category_match:
                 result['errors'].append("No category match found")
@@ -62,7 +61,8 @@ class CompletePipeline:
             
             # Step 3: Generate optimized ecommerce title
             print("📝 Generating optimized title...")
-            optimized_title = self.generator.generate_ecommerce_title(parsed_data, category_match)
+            with self.metrics.span('generate', 'complete'):
+                optimized_title = self.generator.generate_ecommerce_title(parsed_data, category_match)
             
             if not optimized_title:
                 result['errors'].append("Failed to generate optimized title")
@@ -73,7 +73,8 @@ class CompletePipeline:
             
             # Step 4: Create store label
             print("🏷️  Creating store label...")
-            store_label = self.formatter.format_store_label(optimized_title)
+            with self.metrics.span('label', 'complete'):
+                store_label = self.formatter.format_store_label(optimized_title)
             
             result['store_label'] = store_label
             result['success'] = True
@@ -85,6 +86,17 @@ class CompletePipeline:
         
         return result
     
+    def _new_result(self, raw_title: str) -> Dict:
+        return {
+            'input_title': raw_title,
+            'parsed_data': None,
+            'category_match': None,
+            'optimized_title': None,
+            'store_label': None,
+            'success': False,
+            'errors': []
+        }
+    
     def _fuzzy_category_search(self, parsed_data: Dict) -> Dict:
         """Try to find category match using keywords"""
         
@@ -97,49 +109,109 @@ class CompletePipeline:
             if 'description' in parsed_data:
                 keywords.extend(parsed_data['description'].split()[:5])  # First 5 words
         
-        # Search categories that contain these keywords
-        df = self.classifier.get_all_categories()
+        # Search categories that contain these keywords (indexed, no full scan)
+        search_terms = [keyword.upper() for keyword in keywords]
+        scores = self.classifier.index.score_substrings(search_terms)
+        if not scores:
+            return None
         
-        best_match = None
-        best_score = 0
-        
-        for _, row in df.iterrows():
-            score = 0
-            categoria = row['Categoria'].upper()
-            
-            for keyword in keywords:
-                if keyword.upper() in categoria:
-                    score += len(keyword)
-            
-            if score > best_score:
-                best_score = score
-                best_match = {
-                    'departamento': row['Departamento'],
-                    'familia': row['Familia'],
-                    'categoria': row['Categoria'].strip(),
-                    'nomenclatura_sugerida': row['Nomenclatura sugerida'],
-                    'ejemplo_aplicado': row['Ejemplo aplicado'],
-                    'match_type': 'fuzzy_keyword',
-                    'score': score
-                }
-        
-        return best_match if best_score > 0 else None
+        row_id = min(scores, key=lambda r: (-scores[r], r))
+        return self.classifier.index.build_match(
+            row_id,
+            match_type='fuzzy_keyword',
+            score=scores[row_id],
+            candidates=self.classifier.ranker.candidates(search_terms, self.classifier.CANDIDATES_K)
+        )
     
     def process_title_list(self, titles: List[str]) -> List[Dict]:
-        """Process multiple raw titles"""
+        """Process multiple raw titles
+        
+        Titles are parsed one by one, then classified with a single batch call
+        and their ecommerce titles researched concurrently as one batch.
+        """
         
         results = []
+        parsed = []
         print(f"\n🚀 Processing {len(titles)} raw titles through complete pipeline...\n")
         
+        # Step 1: Parse every raw title into structured data
         for i, title in enumerate(titles, 1):
             print(f"--- Title {i}/{len(titles)} ---")
-            result = self.process_raw_title(title)
+            result = self._new_result(title)
             results.append(result)
+            try:
+                print(f"🔍 Parsing: {title}")
+                with self.metrics.span('parse', 'complete'):
+                    parsed_data = self.parser.parse_title_to_product_data(title)
+                result['parsed_data'] = parsed_data
+                parsed.append(result)
+                print(f"   ✓ Extracted: {parsed_data.get('producto_tipo', 'Unknown type')}")
+            except Exception as e:
+                result['errors'].append(f"Pipeline error: {str(e)}")
+                print(f"   ✗ Error: {e}")
+        
+        # Step 2: Find category matches for the whole batch
+        print(f"\n📂 Finding categories for {len(parsed)} titles...")
+        try:
+            with self.metrics.span('classify', 'complete', items=len(parsed)):
+                category_matches = self.classifier.find_category_matches([result['parsed_data'] for result in parsed])
+        except Exception as e:
+            print(f"   ⚠️  Batch classification failed, retrying per title: {e}")
+            category_matches = []
+            for result in parsed:
+                try:
+                    category_matches.append(self.classifier.find_category_match(result['parsed_data']))
+                except Exception as item_error:
+                    result['errors'].append(f"Pipeline error: {str(item_error)}")
+                    category_matches.append(None)
+        
+        matched = []
+        for result, category_match in zip(parsed, category_matches):
+            if result['errors']:
+                continue
+            try:
+                if not category_match:
+                    # Try fuzzy matching with keywords
+                    with self.metrics.span('classify', 'complete'):
+                        category_match = self._fuzzy_category_search(result['parsed_data'])
+            except Exception as e:
+                result['errors'].append(f"Pipeline error: {str(e)}")
+                continue
+            self.metrics.record_match('complete', category_match)
+            
+            if not category_match:
+                result['errors'].append("No category match found")
+                continue
+            
+            result['category_match'] = category_match
+            matched.append(result)
+        
+        # Step 3: Generate optimized ecommerce titles (research runs concurrently)
+        print(f"📝 Generating optimized titles for {len(matched)} titles...")
+        with self.metrics.span('generate', 'complete', items=len(matched)):
+            optimized_titles = self.generator.generate_ecommerce_titles(
+                [(result['parsed_data'], result['category_match']) for result in matched]
+            )
+        
+        # Step 4: Create store labels
+        for result, optimized_title in zip(matched, optimized_titles):
+            if not optimized_title:
+                result['errors'].append("Failed to generate optimized title")
+                continue
             
+            result['optimized_title'] = optimized_title
+            try:
+                with self.metrics.span('label', 'complete'):
+                    result['store_label'] = self.formatter.format_store_label(optimized_title)
+                result['success'] = True
+            except Exception as e:
+                result['errors'].append(f"Pipeline error: {str(e)}")
+        
+        for i, result in enumerate(results, 1):
             if result['success']:
-                print("✅ Success!\n")
+                print(f"✅ {i}. {result['optimized_title']} -> {result['store_label']}")
             else:
-                print(f"❌ Failed: {', '.join(result['errors'])}\n")
+                print(f"❌ {i}. Failed: {', '.join(result['errors'])}")
         
         return results
     
@@ -0,0 +1,205 @@
+# fake_llm_server.py - Local OpenAI-compatible server with scripted rate limits
+"""
+Serves POST /v1/chat/completions on 127.0.0.1 so the real OpenAI client,
+the AIMD concurrency controller and the retry paths can be exercised
+offline against genuine HTTP 429 responses.
+
+Rate limiting is either scripted (--script 200,429,429,200 is replayed in
+order, then everything succeeds) or capacity based: a request arriving while
+--capacity requests are already in flight gets a 429 with Retry-After.
+
+Usage:
+    python fake_llm_server.py --port 8089 --capacity 8
+    python fake_llm_server.py --demo 300 --capacity 12 --latency 0.05
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeLLMServer:
+    """Threaded HTTP server answering chat completions with research JSON"""
+
+    def __init__(self, port: int = 0, capacity: int = 8, latency: float = 0.05, retry_after: float = 0.5,
+                 script: Optional[List[int]] = None):
+        self.capacity = capacity
+        self.latency = latency
+        self.retry_after = retry_after
+        self.script = list(script or [])
+        self.requests = 0
+        self.rejected = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                status = server._admit()
+                try:
+                    if status == 429:
+                        self._send(429, {'error': {'message': 'Rate limit reached (fake server)',
+                                                   'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                                   {'Retry-After': f'{server.retry_after:g}',
+                                    'retry-after-ms': str(int(server.retry_after * 1000))})
+                    elif status != 200:
+                        self._send(status, {'error': {'message': f'Scripted {status}', 'type': 'server_error'}})
+                    else:
+                        time.sleep(server.latency)
+                        self._send(200, server._completion(body))
+                finally:
+                    server._leave(status)
+
+            def _send(self, status: int, payload: Dict, headers: Dict = None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+
+    def _admit(self) -> int:
+        with self._lock:
+            self.requests += 1
+            if self.script:
+                status = self.script.pop(0)
+            else:
+                status = 429 if self.active >= self.capacity else 200
+            if status == 200:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            else:
+                self.rejected += 1
+            return status
+
+    def _leave(self, status: int):
+        if status == 200:
+            with self._lock:
+                self.active -= 1
+
+    @staticmethod
+    def _completion(body: Dict) -> Dict:
+        prompt = body.get('messages', [{}])[-1].get('content', '')
+        match = re.search(r'product:\s*(.+)', prompt)
+        product = match.group(1).strip() if match else 'Producto'
+        content = json.dumps({
+            'verified_product_type': product.split('  ')[0][:40].title(),
+            'product_category': 'CONSTRUCCION',
+            'is_construction_hardware': True,
+            'confidence': 0.8
+        })
+        return {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                      'total_tokens': (len(prompt) + len(content)) // 4}
+        }
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {'requests': self.requests, 'rejected_429': self.rejected, 'max_concurrent': self.max_active}
+
+
+def run_demo(server: FakeLLMServer, count: int, max_in_flight: int) -> Dict:
+    """Research `count` titles through the real OpenAI client against the fake server"""
+    import contextlib
+    from openai import OpenAI
+    from agents.concurrency_controller import AIMDController
+    from agents.enhanced_title_generator import RobustEnhancedTitleGenerator
+    from agents.research_policy import ResearchPolicy
+
+    controller = AIMDController(initial_limit=2, max_limit=max_in_flight)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        generator = RobustEnhancedTitleGenerator(api_key=None, max_in_flight=max_in_flight,
+                                                 research_policy=ResearchPolicy(enabled=False),
+                                                 concurrency=controller)
+        generator.client = OpenAI(api_key='sk-fake', base_url=server.base_url, max_retries=0)
+        generator.web_search_enabled = True
+        generator.base_delay = 0.05
+
+        batch = [({'original_title': f'TORNILLO GALV {i}'}, {}) for i in range(count)]
+        start = time.perf_counter()
+        titles = generator.generate_ecommerce_titles(batch)
+        elapsed = time.perf_counter() - start
+
+    return {
+        'titles': len(titles),
+        'seconds': round(elapsed, 3),
+        'titles_per_sec': round(len(titles) / elapsed, 1),
+        'server': server.get_stats(),
+        'controller': controller.get_stats(),
+        'generator': {k: v for k, v in generator.get_processing_stats().items()
+                      if k in ('total_api_calls', 'failed_requests', 'success_rate')}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible server with scripted 429s")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--capacity', type=int, default=8, help="Concurrent requests served before answering 429")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds per successful completion")
+    parser.add_argument('--retry-after', type=float, default=0.5, help="Retry-After seconds sent with each 429")
+    parser.add_argument('--script', help="Comma-separated status codes to replay first, e.g. 429,429,200,500")
+    parser.add_argument('--demo', type=int, default=0,
+                        help="Instead of serving, research this many titles against the server and report")
+    parser.add_argument('--max-in-flight', type=int, default=32, help="Worker threads (and AIMD ceiling) for --demo")
+    args = parser.parse_args()
+
+    script = [int(code) for code in args.script.split(',')] if args.script else None
+    server = FakeLLMServer(0 if args.demo else args.port, args.capacity, args.latency, args.retry_after, script)
+
+    if args.demo:
+        server.start()
+        try:
+            print(json.dumps(run_demo(server, args.demo, args.max_in_flight), indent=2))
+        finally:
+            server.stop()
+        return
+
+    print(f"🧪 Fake LLM server on {server.base_url} (capacity {args.capacity})")
+    print(f"   export OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
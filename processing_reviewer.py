@@ -6,6 +6,9 @@ import pandas as pd
 class ProcessingReviewer:
     """Review and validate processing results before download"""
     
+    # Failed items kept in full; the rest are only counted
+    MAX_QUALITY_ISSUES = 10
+    
     def __init__(self):
         self.quality_thresholds = {
             'min_title_length': 5,
@@ -17,56 +20,84 @@ class ProcessingReviewer:
     def analyze_batch_results(self, results: List[Dict]) -> Dict:
         """Analyze batch processing results and provide quality metrics"""
         
-        analysis = {
-            'total_processed': len(results),
+        analysis = self.start_analysis()
+        for i, result in enumerate(results, 1):
+            self.add_result_to_analysis(analysis, result, i)
+        
+        return self.finish_analysis(analysis)
+    
+    def start_analysis(self) -> Dict:
+        """Create an empty analysis that results can be added to one at a time"""
+        return {
+            'total_processed': 0,
             'successful': 0,
             'failed': 0,
             'web_search_used': 0,
             'web_search_failed': 0,
             'quality_issues': [],
+            'quality_issue_count': 0,
             'recommendations': [],
-            'detailed_stats': {}
+            'detailed_stats': {},
+            # Running totals, so streamed batches never keep per-item scores
+            '_running': {
+                'scored': 0,
+                'quality_sum': 0.0,
+                'confidence_sum': 0.0,
+                'high_quality_count': 0,
+                'low_quality_count': 0
+            }
         }
-        
-        quality_scores = []
-        confidence_scores = []
-        
-        for i, result in enumerate(results, 1):
-            # Basic success tracking
-            if result.get('success', False):
-                analysis['successful'] += 1
-                
-                # Check web search usage
-                if 'web_research' in result.get('parsed_data', {}):
-                    analysis['web_search_used'] += 1
-                    web_research = result['parsed_data']['web_research']
-                    if 'error' in web_research:
-                        analysis['web_search_failed'] += 1
-                
-                # Quality assessment
-                quality_score = self._assess_result_quality(result, i)
-                quality_scores.append(quality_score)
-                
-                # Track confidence
-                confidence = result.get('parsed_data', {}).get('research_confidence', 0.5)
-                confidence_scores.append(confidence)
-                
-            else:
-                analysis['failed'] += 1
+    
+    def add_result_to_analysis(self, analysis: Dict, result: Dict, item_num: int):
+        """Fold a single processing result into a running analysis"""
+        running = analysis['_running']
+        analysis['total_processed'] += 1
+        
+        # Basic success tracking
+        if result.get('success', False):
+            analysis['successful'] += 1
+            
+            # Check web search usage
+            if 'web_research' in result.get('parsed_data', {}):
+                analysis['web_search_used'] += 1
+                web_research = result['parsed_data']['web_research']
+                if 'error' in web_research:
+                    analysis['web_search_failed'] += 1
+            
+            # Quality assessment
+            quality_score = self._assess_result_quality(result, item_num)
+            running['scored'] += 1
+            running['quality_sum'] += quality_score
+            if quality_score >= 0.8:
+                running['high_quality_count'] += 1
+            if quality_score < 0.5:
+                running['low_quality_count'] += 1
+            
+            # Track confidence
+            running['confidence_sum'] += result.get('parsed_data', {}).get('research_confidence', 0.5)
+            
+        else:
+            analysis['failed'] += 1
+            analysis['quality_issue_count'] += 1
+            if len(analysis['quality_issues']) < self.MAX_QUALITY_ISSUES:
                 analysis['quality_issues'].append({
-                    'item': i,
+                    'item': item_num,
                     'title': result.get('input_title', 'Unknown'),
                     'issue': 'Processing failed',
                     'errors': result.get('errors', [])
                 })
+    
+    def finish_analysis(self, analysis: Dict) -> Dict:
+        """Compute averages and recommendations for a running analysis"""
+        running = analysis.pop('_running')
         
         # Calculate averages
-        if quality_scores:
+        if running['scored']:
             analysis['detailed_stats'] = {
-                'average_quality_score': sum(quality_scores) / len(quality_scores),
-                'average_confidence': sum(confidence_scores) / len(confidence_scores),
-                'high_quality_count': len([s for s in quality_scores if s >= 0.8]),
-                'low_quality_count': len([s for s in quality_scores if s < 0.5])
+                'average_quality_score': running['quality_sum'] / running['scored'],
+                'average_confidence': running['confidence_sum'] / running['scored'],
+                'high_quality_count': running['high_quality_count'],
+                'low_quality_count': running['low_quality_count']
             }
         
         # Generate recommendations
@@ -204,11 +235,12 @@ class ProcessingReviewer:
             report += f"""
 ⚠️  QUALITY ISSUES FOUND:
 """
-            for issue in analysis['quality_issues'][:10]:  # Show first 10 issues
+            for issue in analysis['quality_issues']:  # Only the first MAX_QUALITY_ISSUES are kept
                 report += f"• Item {issue['item']}: {issue['title'][:40]}... - {issue['issue']}\n"
             
-            if len(analysis['quality_issues']) > 10:
-                report += f"... and {len(analysis['quality_issues']) - 10} more issues.\n"
+            more = analysis['quality_issue_count'] - len(analysis['quality_issues'])
+            if more > 0:
+                report += f"... and {more} more issues.\n"
         
         report += f"""
 {'=' * 50}
@@ -255,6 +287,10 @@ class ProcessingReviewer:
                 'errors': '; '.join(result.get('errors', []))
             }
             
+            # One column per extra label width, e.g. store_label_24char for shelf talkers
+            for width, label in sorted(result.get('label_variants', {}).items()):
+                row[f'store_label_{width}char'] = label
+            
             export_data.append(row)
         
         df = pd.DataFrame(export_data)
@@ -1,6 +1,7 @@
 from agents.improved_title_parser import ImprovedTitleParser
 from agents.improved_category_classifier import ImprovedCategoryClassifier
 from agents.enhanced_title_generator import EnhancedTitleGenerator 
+from agents.instrumentation import get_metrics
 from agents.label_formatter import LabelFormatter
 from typing import Dict, List
 import json
@@ -13,6 +14,7 @@ class UpdatedCompletePipeline:
         self.classifier = ImprovedCategoryClassifier()                  # NEW: Improved classifier
         self.generator = EnhancedTitleGenerator(openai_api_key)         # Agent 2: Generate titles
         self.formatter = LabelFormatter()                               # Agent 3: Create labels
+        self.metrics = get_metrics()                                    # Per-stage timings for /metrics
         
         print("✓ Updated pipeline initialized with Enhanced Title Generator")
     
@@ -35,7 +37,8 @@ class UpdatedCompletePipeline:
         try:
             # Step 1: Parse with improved construction vocabulary
             print(f"🔍 Parsing: {raw_title}")
-            parsed_data = self.parser.parse_title_to_product_data(raw_title)
+            with self.metrics.span('parse', 'updated_complete'):
+                parsed_data = self.parser.parse_title_to_product_data(raw_title)
             result['parsed_data'] = parsed_data
             
             detected_type = parsed_data.get('producto_tipo', 'Unknown')
@@ -47,7 +50,9 @@ class UpdatedCompletePipeline:
             
             # Step 2: Find category with improved matching
             print("📂 Finding category with construction context...")
-            category_match = self.classifier.find_category_match(parsed_data)
+            with self.metrics.span('classify', 'updated_complete'):
+                category_match = self.classifier.find_category_match(parsed_data)
+            self.metrics.record_match('updated_complete', category_match)
             
             if not category_match:
                 result['errors'].append("No category match found even with improved parsing")
@@ -68,7 +73,8 @@ class UpdatedCompletePipeline:
                 'construction_context': parsed_data.get('construction_analysis', {})
             })
             
-            optimized_title = self.generator.generate_ecommerce_title(enhanced_product_data, category_match)
+            with self.metrics.span('generate', 'updated_complete'):
+                optimized_title = self.generator.generate_ecommerce_title(enhanced_product_data, category_match)
             
             if not optimized_title:
                 result['errors'].append("Failed to generate optimized title")
@@ -79,7 +85,8 @@ class UpdatedCompletePipeline:
             
             # Step 4: Create store label
             print("🏷️  Creating store label...")
-            store_label = self.formatter.format_store_label(optimized_title)
+            with self.metrics.span('label', 'updated_complete'):
+                store_label = self.formatter.format_store_label(optimized_title)
             
             result['store_label'] = store_label
             result['success'] = True